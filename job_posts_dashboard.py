@@ -1,9 +1,12 @@
 import streamlit as st
-import json
 import pandas as pd
 from pathlib import Path
 from typing import List, Dict, Any
 
+from utils.job_frame import PAGE_SIZE, DashboardData, build_dashboard_data, job_details, job_page
+from utils.job_records import JobRecordIndex
+from utils.job_store import job_store_path, read_jobs_frame, store_signature
+
 # Set page config
 st.set_page_config(
     page_title="LinkedIn Job Posts Dashboard",
@@ -11,35 +14,55 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_job_record_index(directory: str) -> JobRecordIndex:
+    """One index per directory, kept across reruns and sessions."""
+    return JobRecordIndex(Path(directory))
+
+
 def load_job_data() -> List[Dict[str, Any]]:
-    """Load all job data from JSON files in linked_job_posts directory."""
+    """Load all job data from JSON files in linked_job_posts directory.
+
+    Only files added or changed since the previous rerun are parsed again.
+    """
     job_posts_dir = Path("linked_job_posts")
-    job_data = []
 
     if not job_posts_dir.exists():
         st.error(f"Directory 'linked_job_posts' not found!")
         return []
 
-    # Find all JSON files
-    json_files = list(job_posts_dir.glob("*.json"))
+    index = get_job_record_index(str(job_posts_dir.resolve()))
+    job_data = index.load()
+
+    for path, error in index.errors.items():
+        st.error(f"Error loading {path}: {error}")
 
-    if not json_files:
+    if not job_data and not index.errors:
         st.warning("No job data files found in linked_job_posts directory!")
-        return []
 
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+    return job_data
 
-            # Add filename for reference (optional)
-            data['filename'] = json_file.name
-            job_data.append(data)
 
-        except Exception as e:
-            st.error(f"Error loading {json_file}: {e}")
+@st.cache_resource(max_entries=1, show_spinner=False)
+def read_job_store(db_path: str, signature: tuple) -> DashboardData:
+    """Read and prepare the job store; ``signature`` changes on every write, so reruns only re-read after one.
 
-    return job_data
+    Shared across reruns without copying, so the frames must not be modified.
+    """
+    return build_dashboard_data(read_jobs_frame(Path(db_path)))
+
+
+def load_dashboard_data() -> DashboardData:
+    """Load all jobs, from the job store when there is one."""
+    store_path = job_store_path(Path("linked_job_posts"))
+    if store_path.exists():
+        return read_job_store(str(store_path.resolve()), store_signature(store_path))
+
+    st.info(
+        "No job store found; reading JSON files. "
+        "Run `python scripts/import_job_posts.py` to import them."
+    )
+    return build_dashboard_data(pd.DataFrame(load_job_data()))
 
 
 def main():
@@ -48,152 +71,108 @@ def main():
 
     # Load job data
     with st.spinner("Loading job data..."):
-        job_data = load_job_data()
+        data = load_dashboard_data()
 
-    if not job_data:
+    if data.jobs.empty:
         st.info("No job data available. Please run the job extraction workflow first.")
         return
 
-    st.success(f"Loaded {len(job_data)} job postings")
+    st.success(f"Loaded {len(data.jobs)} job postings")
 
-    # Convert to DataFrame for better table display
-    df = pd.DataFrame(job_data)
-
-    # Select and reorder columns for display
-    display_columns = [
-        'jobId', 'job_name', 'original_job_title', 'location', 'job_status',
-        'posted_when', 'amount_spent', 'views', 'apply_clicks', 'jobDetailUrl', 'apply_url'
-    ]
-
-    # Filter to only columns that exist in the data
-    available_columns = [col for col in display_columns if col in df.columns]
-
-    # Reorder columns with apply_url last, jobDetailUrl second to last
-    final_columns = [col for col in available_columns if col not in ['jobDetailUrl', 'apply_url']]
-    if 'jobDetailUrl' in available_columns:
-        final_columns.append('jobDetailUrl')
-    if 'apply_url' in available_columns:
-        final_columns.append('apply_url')
-
-    df_display = df[final_columns].copy()
-
-    # Format URL columns for LinkColumn display
-    if 'jobDetailUrl' in df_display.columns:
-        df_display['jobDetailUrl'] = df_display['jobDetailUrl'].apply(
-            lambda url: f'{url}#LinkedIn Job' if url else ''
-        )
-
-    if 'apply_url' in df_display.columns:
-        df_display['apply_url'] = df_display['apply_url'].apply(
-            lambda url: f'{url}#Apply Url' if url else ''
-        )
-
-    # Rename columns for better display
-    column_rename_map = {
-        'jobId': 'Job ID',
-        'job_name': 'Job Name',
-        'original_job_title': 'Original Title',
-        'location': 'Location',
-        'job_status': 'Status',
-        'posted_when': 'Posted',
-        'amount_spent': 'Amount Spent',
-        'views': 'Views',
-        'apply_clicks': 'Apply Clicks',
-        'jobDetailUrl': 'LinkedIn URL',
-        'apply_url': 'Apply Url'
-    }
-
-    df_display = df_display.rename(columns=column_rename_map)
-
-    # Display the table
+    # Display the table, one page of the matching jobs at a time
     st.subheader("📋 Job Postings Summary")
 
-    if not df_display.empty:
-        st.dataframe(
-            df_display,
-            use_container_width=True,
-            hide_index=True,
-            column_config={
-                "Job ID": st.column_config.TextColumn(
-                    "Job ID",
-                    help="LinkedIn Job ID",
-                    width="small"
-                ),
-                "Amount Spent": st.column_config.TextColumn(
-                    "Amount Spent",
-                    help="Amount spent on job promotion",
-                    width="small"
-                ),
-                "Views": st.column_config.TextColumn(
-                    "Views",
-                    help="Number of job views",
-                    width="small"
-                ),
-                "Apply Clicks": st.column_config.TextColumn(
-                    "Apply Clicks",
-                    help="Number of apply clicks",
-                    width="small"
-                ),
-                "LinkedIn URL": st.column_config.LinkColumn(
-                    "LinkedIn URL",
-                    help="View the original LinkedIn job posting",
-                    width="small",
-                    display_text=r"#(.*)$"
-                ),
-                "Apply Url": st.column_config.LinkColumn(
-                    "Apply Url",
-                    help="Apply for this position",
-                    width="small",
-                    display_text=r"#(.*)$"
-                )
-            }
+    search_col, page_col = st.columns([3, 1])
+    with search_col:
+        query = st.text_input("Search jobs", placeholder="Job ID, name, title, location or status")
+    with page_col:
+        page_number = st.number_input("Page", min_value=1, value=1, step=1)
+    page = job_page(data, query, int(page_number))
+
+    if page.matches:
+        st.caption(
+            f"Showing {page.start + 1}-{page.start + len(page.table)} of {page.matches} "
+            f"matching jobs (page {page.page} of {page.pages}, {PAGE_SIZE} per page)"
         )
     else:
-        st.info("No job data available to display.")
+        st.info("No jobs match the search.")
+
+    st.dataframe(
+        page.table,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Job ID": st.column_config.TextColumn(
+                "Job ID",
+                help="LinkedIn Job ID",
+                width="small"
+            ),
+            "Amount Spent": st.column_config.TextColumn(
+                "Amount Spent",
+                help="Amount spent on job promotion",
+                width="small"
+            ),
+            "Views": st.column_config.TextColumn(
+                "Views",
+                help="Number of job views",
+                width="small"
+            ),
+            "Apply Clicks": st.column_config.TextColumn(
+                "Apply Clicks",
+                help="Number of apply clicks",
+                width="small"
+            ),
+            "LinkedIn URL": st.column_config.LinkColumn(
+                "LinkedIn URL",
+                help="View the original LinkedIn job posting",
+                width="small",
+                display_text=r"#(.*)$"
+            ),
+            "Apply Url": st.column_config.LinkColumn(
+                "Apply Url",
+                help="Apply for this position",
+                width="small",
+                display_text=r"#(.*)$"
+            )
+        }
+    )
 
     # Add summary statistics
     st.markdown("---")
     st.subheader("📈 Summary Statistics")
 
+    metrics = data.metrics
     col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
-        total_jobs = len(job_data)
-        st.metric("Total Jobs", total_jobs)
+        st.metric("Total Jobs", metrics["total_jobs"])
 
     with col2:
-        active_jobs = len([job for job in job_data if job.get('job_status') == 'Active'])
-        st.metric("Active Jobs", active_jobs)
+        st.metric("Active Jobs", metrics["active_jobs"])
 
     with col3:
-        total_amount = sum(float(job.get('amount_spent', 0)) for job in job_data if job.get('amount_spent') is not None)
-        st.metric("Total Amount Spent", f"₹{total_amount:.2f}")
+        st.metric("Total Amount Spent", f"₹{metrics['total_amount']:.2f}")
 
     with col4:
-        total_views = sum(int(job.get('views', 0)) for job in job_data if job.get('views'))
-        st.metric("Total Views", total_views)
+        st.metric("Total Views", metrics["total_views"])
 
     with col5:
-        total_applies = sum(int(job.get('apply_clicks', 0)) for job in job_data if job.get('apply_clicks'))
-        st.metric("Total Apply Clicks", total_applies)
+        st.metric("Total Apply Clicks", metrics["total_applies"])
 
     # Show detailed view toggle
     st.markdown("---")
-    if st.checkbox("Show Detailed JSON Data", value=False):
+    if st.checkbox("Show Detailed JSON Data", value=False) and page.labels:
         st.subheader("🔍 Detailed Job Data")
 
-        selected_job = st.selectbox(
-            "Select a job to view details:",
-            options=[f"{job.get('jobId', 'Unknown')} - {job.get('job_name', 'Unknown')}" for job in job_data],
-            index=0 if job_data else None
+        job_id = st.selectbox(
+            "Select a job on this page to view details:",
+            options=page.labels,
+            format_func=page.labels.__getitem__,
+            index=0
         )
 
-        if selected_job:
-            # Extract job ID from selection
-            job_id = selected_job.split(' - ')[0]
-
-            # Find the matching job data
-            selected_job_data = next((job for job in job_data if job.get('jobId') == job_id), None)
+        if job_id:
+            selected_job_data = job_details(data.jobs, job_id)
 
             if selected_job_data:
                 st.json(selected_job_data)
@@ -201,4 +180,4 @@ def main():
                 st.error("Job data not found")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Benchmark dashboard rerun latency against the number of job postings.
+
+A rerun is timed end to end: picking the page, reading the totals, looking
+up the selected job, and serializing what Streamlit sends to the browser,
+i.e. the table, the selectbox labels and the job's JSON. ``st.dataframe``
+serializes with pyarrow; ``DataFrame.to_json`` stands in for it here, so
+the absolute numbers are indicative, but it scales with rows the same way.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Add the repo root to the Python path
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import pandas as pd
+
+from utils.job_frame import DashboardData, build_dashboard_data, job_details, job_page
+
+STATUSES = ("Active", "Active", "Active", "In review", "Closed")
+
+
+def synthetic_jobs(rows: int, seed: int) -> pd.DataFrame:
+    """A frame shaped like ``read_jobs_frame`` output."""
+    rng = random.Random(seed)
+    ids = [str(4300000000 + i) for i in range(rows)]
+    return pd.DataFrame(
+        {
+            "jobId": ids,
+            "job_name": [rng.choice(("AI Trainer", "AI Evaluator", "Python Developer")) for _ in ids],
+            "original_job_title": "Generalist Evaluator Expert",
+            "location": "United States (Remote)",
+            "job_status": [rng.choice(STATUSES) for _ in ids],
+            "posted_when": "Posted 6 hours ago",
+            "amount_spent": [round(rng.random() * 500, 2) for _ in ids],
+            "views": [rng.randint(0, 900) for _ in ids],
+            "apply_clicks": [rng.randint(0, 300) for _ in ids],
+            "jobDetailUrl": [f"https://www.linkedin.com/hiring/jobs/{i}/detail/" for i in ids],
+            "apply_url": [rng.choice(("", "https://work.mercor.com/jobs/list_x")) for _ in ids],
+        }
+    )
+
+
+def legacy_rerun(df: pd.DataFrame, selected: int) -> None:
+    """What every rerun used to do: list-of-dicts totals, row-wise URLs, linear lookup."""
+    job_data = [
+        {key: value for key, value in row.items() if value is not None}
+        for row in df.astype(object).where(df.notna(), None).to_dict("records")
+    ]
+    df_display = df.copy()
+    df_display["jobDetailUrl"] = df_display["jobDetailUrl"].apply(
+        lambda url: f"{url}#LinkedIn Job" if url else ""
+    )
+    df_display["apply_url"] = df_display["apply_url"].apply(
+        lambda url: f"{url}#Apply Url" if url else ""
+    )
+    len([job for job in job_data if job.get("job_status") == "Active"])
+    sum(float(job.get("amount_spent", 0)) for job in job_data if job.get("amount_spent") is not None)
+    sum(int(job.get("views", 0)) for job in job_data if job.get("views"))
+    sum(int(job.get("apply_clicks", 0)) for job in job_data if job.get("apply_clicks"))
+    options = [f"{job.get('jobId', 'Unknown')} - {job.get('job_name', 'Unknown')}" for job in job_data]
+    job_id = options[selected].split(" - ")[0]
+    next((job for job in job_data if job.get("jobId") == job_id), None)
+
+
+def send(table: pd.DataFrame, labels: Dict[str, str], metrics: Dict[str, float], job_id: str, jobs) -> None:
+    """Serialize the table, selectbox labels, totals and job details, as a rerun sends them."""
+    table.to_json(orient="split")
+    json.dumps([labels[option] for option in labels])
+    json.dumps(metrics)
+    json.dumps(job_details(jobs, job_id), default=str)
+
+
+def unpaged_rerun(data: DashboardData, job_id: str) -> None:
+    """A rerun on cached data that shows every row and every option."""
+    send(data.table, data.labels, data.metrics, job_id, data.jobs)
+
+
+def rerun(data: DashboardData, query: str, page_number: int) -> None:
+    """A rerun on cached data that shows one page of the rows matching ``query``."""
+    page = job_page(data, query, page_number)
+    send(page.table, page.labels, data.metrics, next(iter(page.labels)), data.jobs)
+
+
+def new_search_rerun(data: DashboardData, query: str) -> None:
+    """A rerun right after the search box changed: the search itself scans every row."""
+    data.search.cache_clear()
+    rerun(data, query, 1)
+
+
+def time_ms(call: Callable[[], Any], repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard reruns at growing row counts")
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="*",
+        default=[1_000, 10_000, 100_000],
+        help="Row counts to measure (default: 1000 10000 100000)"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Runs per measurement; the median is reported (default: 5)"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument(
+        "--query",
+        default="python",
+        help="Search box text for the search measurements (default: python)"
+    )
+    args = parser.parse_args()
+
+    results: List[Dict[str, float]] = []
+    for rows in args.rows:
+        df = synthetic_jobs(rows, args.seed)
+        data = build_dashboard_data(df)
+        # The last job is the worst case for a linear scan
+        selected = rows - 1
+        selected_id = data.jobs.index[selected]
+        last_page = job_page(data).pages
+        # Warm the search cache for "search rerun"
+        job_page(data, args.query)
+        results.append(
+            {
+                "rows": rows,
+                "legacy rerun": time_ms(lambda: legacy_rerun(df, selected), args.repeats),
+                "build": time_ms(lambda: build_dashboard_data(df), args.repeats),
+                "unpaged rerun": time_ms(lambda: unpaged_rerun(data, selected_id), args.repeats),
+                "page rerun": time_ms(lambda: rerun(data, "", last_page), args.repeats * 20),
+                "search rerun": time_ms(lambda: rerun(data, args.query, 2), args.repeats * 20),
+                "new search": time_ms(lambda: new_search_rerun(data, args.query), args.repeats),
+            }
+        )
+
+    # "build" runs once per store write and "new search" once per change to the
+    # search box; every other rerun pays "page rerun" or "search rerun"
+    columns = ["legacy rerun", "build", "unpaged rerun", "page rerun", "search rerun", "new search"]
+    print(f"{'rows':>8}  " + "  ".join(f"{column + ' ms':>15}" for column in columns))
+    for row in results:
+        print(f"{row['rows']:>8}  " + "  ".join(f"{row[column]:>15.2f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
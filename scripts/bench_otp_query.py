@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Benchmark the OTP lookup against a synthetic Messages ``chat.db``."""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Add the repo root to the Python path
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils.otp_fetcher import HDFC_SENDER_PATTERN, OtpSource
+
+# Apple's epoch (2001-01-01) in nanoseconds, as stored in message.date
+APPLE_EPOCH_OFFSET = 978307200
+BANK_HANDLES = ("VM-HDFCBK", "AD-HDFCBK", "JD-HDFCBK")
+
+
+def build_chat_db(path: str, messages: int, handles: int, otp_share: float, seed: int) -> None:
+    """Create a ``chat.db`` with the ``handle``/``message`` layout and indexes Messages uses."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE handle (ROWID INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL);
+        CREATE TABLE message (
+            ROWID INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle_id INTEGER DEFAULT 0,
+            text TEXT,
+            date INTEGER
+        );
+        CREATE INDEX message_idx_handle ON message (handle_id, date);
+        CREATE INDEX message_idx_date ON message (date);
+        """
+    )
+    senders = [f"+91{9000000000 + i}" for i in range(handles - len(BANK_HANDLES))]
+    senders.extend(BANK_HANDLES)
+    conn.executemany("INSERT INTO handle (id) VALUES (?)", ((s,) for s in senders))
+    bank_ids = list(range(len(senders) - len(BANK_HANDLES) + 1, len(senders) + 1))
+
+    def rows():
+        date = (int(time.time()) - APPLE_EPOCH_OFFSET - messages * 30) * 1_000_000_000
+        for _ in range(messages):
+            date += rng.randint(1, 60) * 1_000_000_000
+            if rng.random() < otp_share:
+                otp = rng.randint(100000, 999999)
+                text = f"{otp} is the OTP for txn of INR {rng.randint(100, 9999)}.00 at LinkedIn. Do not share."
+                yield rng.choice(bank_ids), text, date
+            else:
+                yield rng.randint(1, len(senders) - len(BANK_HANDLES)), "See you at 5?", date
+
+    conn.executemany("INSERT INTO message (handle_id, text, date) VALUES (?, ?, ?)", rows())
+    conn.commit()
+    conn.close()
+
+
+def legacy_latest_otp(db_path: str, max_rows: int = 20) -> Optional[Tuple[str, str]]:
+    """The previous lookup: new connection and a ``LIKE`` join on every call."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT h.id, m.text, m.date FROM message m JOIN handle h ON m.handle_id = h.ROWID"
+        " WHERE lower(h.id) LIKE ? AND m.text IS NOT NULL ORDER BY m.date DESC LIMIT ?",
+        (HDFC_SENDER_PATTERN, max_rows),
+    ).fetchall()
+    conn.close()
+    for sender, text, _ in rows:
+        m = re.search(r"\b(\d{6})\b", text or "")
+        if m:
+            return sender, m.group(1)
+    return None
+
+
+def time_ms(call: Callable[[], object], repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def max_loop_lag_ms(poll: Callable[[], object], polls: int) -> float:
+    """Worst event-loop stall seen by a 1 ms ticker while ``poll`` runs ``polls`` times."""
+    lag = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal lag
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, (time.perf_counter() - started) * 1000 - 1)
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    for _ in range(polls):
+        result = poll()
+        if asyncio.iscoroutine(result):
+            await result
+        else:
+            await asyncio.sleep(0)
+    running = False
+    await task
+    return lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OTP lookups on a synthetic Messages database")
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=1_000_000,
+        help="Messages in the synthetic chat.db (default: 1000000)"
+    )
+    parser.add_argument(
+        "--handles",
+        type=int,
+        default=2000,
+        help="Distinct senders, including the bank's (default: 2000)"
+    )
+    parser.add_argument(
+        "--otp-share",
+        type=float,
+        default=0.01,
+        help="Fraction of messages that are bank OTPs (default: 0.01)"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=20,
+        help="Calls per lookup; the median is reported (default: 20)"
+    )
+    parser.add_argument(
+        "--db",
+        default="",
+        help="Reuse or create the synthetic database at this path instead of a temporary one"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, "chat.db")
+        if not os.path.isfile(db_path):
+            print(f"Building {db_path} with {args.messages:,} messages...")
+            started = time.perf_counter()
+            build_chat_db(db_path, args.messages, args.handles, args.otp_share, args.seed)
+            print(f"Built in {time.perf_counter() - started:.1f}s")
+
+        source = OtpSource(db_path)
+        try:
+            expected = legacy_latest_otp(db_path)
+            if source.latest_otp() != expected:
+                print(f"Lookups disagree: legacy {expected}, OtpSource {source.latest_otp()}")
+            mark = source.high_water_mark()
+            results = {
+                "legacy latest": time_ms(lambda: legacy_latest_otp(db_path), args.repeats),
+                "source latest": time_ms(lambda: source.latest_otp(), args.repeats),
+                "source poll": time_ms(lambda: source.otps_after(mark - 1000), args.repeats),
+            }
+            lag = {
+                "legacy latest": asyncio.run(
+                    max_loop_lag_ms(lambda: legacy_latest_otp(db_path), args.repeats)
+                ),
+                "source poll": asyncio.run(
+                    max_loop_lag_ms(lambda: source.aotps_after(mark - 1000), args.repeats)
+                ),
+            }
+        finally:
+            source.close()
+
+    print(f"{'lookup':>14}  {'median ms':>9}  {'p95 ms':>8}  {'loop stall ms':>13}")
+    for name, samples in results.items():
+        p95 = sorted(samples)[max(0, int(len(samples) * 0.95) - 1)]
+        stall = f"{lag[name]:.1f}" if name in lag else "-"
+        print(f"{name:>14}  {statistics.median(samples):>9.2f}  {p95:>8.2f}  {stall:>13}")
+    legacy_ms = statistics.median(results["legacy latest"])
+    poll_ms = statistics.median(results["source poll"])
+    if poll_ms:
+        print(f"Polling for new OTPs is {legacy_ms / poll_ms:.0f}x faster than the legacy lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Benchmark page-ready time and transferred bytes with request blocking on and off."""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add the repo root to the Python path
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from playwright.async_api import async_playwright
+
+from utils.page_waits import wait_for_element, wait_for_network_idle
+from utils.resource_blocking import BlockingProfile, blocked_resources
+
+
+async def load_once(
+    context, url: str, blocking: bool, ready_selector: str, timeout_ms: int
+) -> Dict[str, Any]:
+    """Load ``url`` in a fresh tab and measure time to ready and bytes on the wire."""
+    page = await context.new_page()
+    session = await context.new_cdp_session(page)
+    transferred = {"bytes": 0, "requests": 0}
+
+    def on_finished(event: Dict[str, Any]) -> None:
+        transferred["bytes"] += int(event.get("encodedDataLength", 0))
+        transferred["requests"] += 1
+
+    session.on("Network.loadingFinished", on_finished)
+    await session.send("Network.enable")
+    # Routing disables the HTTP cache, so disable it for both runs to compare like for like
+    await session.send("Network.setCacheDisabled", {"cacheDisabled": True})
+
+    profile = BlockingProfile.from_env() if blocking else None
+    try:
+        if profile is not None:
+            async with blocked_resources(page, profile):
+                elapsed_ms = await timed_load(page, url, ready_selector, timeout_ms)
+        else:
+            elapsed_ms = await timed_load(page, url, ready_selector, timeout_ms)
+    finally:
+        await session.detach()
+        await page.close()
+    return {
+        "ready_ms": elapsed_ms,
+        "bytes": transferred["bytes"],
+        "requests": transferred["requests"],
+        "blocked": profile.blocked if profile else 0,
+    }
+
+
+async def timed_load(page, url: str, ready_selector: str, timeout_ms: int) -> float:
+    """Time from navigation until ``ready_selector`` shows, or network idle without one."""
+    started = time.perf_counter()
+    await page.goto(url, wait_until="domcontentloaded")
+    if ready_selector:
+        ready = await wait_for_element(page, ready_selector, timeout_ms=timeout_ms)
+    else:
+        ready = await wait_for_network_idle(page, timeout_ms=timeout_ms)
+    if not ready:
+        print(f"Page not ready within {timeout_ms} ms; the timing is the timeout")
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_benchmark(
+    url: str, repeats: int, cdp_url: str, ready_selector: str, timeout_ms: int
+) -> Dict[str, List[Dict[str, Any]]]:
+    runs: Dict[str, List[Dict[str, Any]]] = {"off": [], "on": []}
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+        else:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+        try:
+            # Alternate the two modes so drift in the network affects both equally
+            for _ in range(repeats):
+                runs["off"].append(await load_once(context, url, False, ready_selector, timeout_ms))
+                runs["on"].append(await load_once(context, url, True, ready_selector, timeout_ms))
+        finally:
+            if not cdp_url:
+                await browser.close()
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the request blocking profile on a page load")
+    parser.add_argument(
+        "--url",
+        default="https://www.linkedin.com/my-items/posted-jobs/",
+        help="Page to load; use a job detail URL with --cdp-url to measure the real workflow page"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Loads per mode; the median is reported (default: 5)"
+    )
+    parser.add_argument(
+        "--cdp-url",
+        default="",
+        help="Attach to an existing (logged-in) Chrome instead of launching headless Chromium"
+    )
+    parser.add_argument(
+        "--ready-selector",
+        default="main h1",
+        help="Element whose appearance marks the page ready; pass '' to wait for network idle, "
+        "which LinkedIn's long-polling never reaches (default: 'main h1')"
+    )
+    parser.add_argument(
+        "--timeout-ms",
+        type=int,
+        default=15000,
+        help="Upper bound on the ready wait per load (default: 15000)"
+    )
+    args = parser.parse_args()
+
+    runs = asyncio.run(
+        run_benchmark(args.url, args.repeats, args.cdp_url, args.ready_selector, args.timeout_ms)
+    )
+
+    print(f"{'blocking':>8}  {'ready ms':>9}  {'KiB':>9}  {'requests':>8}  {'blocked':>7}")
+    for mode in ("off", "on"):
+        rows = runs[mode]
+        print(
+            f"{mode:>8}  {statistics.median(r['ready_ms'] for r in rows):>9.0f}  "
+            f"{statistics.median(r['bytes'] for r in rows) / 1024:>9.1f}  "
+            f"{statistics.median(r['requests'] for r in rows):>8.0f}  "
+            f"{statistics.median(r['blocked'] for r in rows):>7.0f}"
+        )
+    off_ms = statistics.median(r["ready_ms"] for r in runs["off"])
+    on_ms = statistics.median(r["ready_ms"] for r in runs["on"])
+    if on_ms:
+        print(f"Page ready {off_ms / on_ms:.1f}x faster with blocking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Benchmark stagehand's per-element XPath resolution against the batched one.
+
+The baseline is the stock path: ``DOM.resolveNode`` and then stagehand's
+``get_xpath_by_resolved_object_id`` for each element in turn. Before timing,
+every batched XPath is checked against the stock one. The strings may be
+written differently, but both must select the same element.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add the repo root to the Python path
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from playwright.async_api import async_playwright
+from stagehand.a11y.utils import get_xpath_by_resolved_object_id
+
+from utils.stagehand_observe import resolve_xpaths
+
+# True for each [stock, batched] pair of XPaths that select the same element
+SAME_ELEMENTS_JS = """
+(pairs) => pairs.map(([a, b]) => {
+  const find = (xpath) => document.evaluate(
+    xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+  ).singleNodeValue;
+  const node = find(a);
+  return node !== null && node === find(b);
+})
+"""
+
+
+def build_page(count: int) -> str:
+    """Nested form with `count` buttons spread across sections."""
+    sections = []
+    for section in range(0, count, 10):
+        buttons = "".join(
+            f"<div><label>Field {i}</label><button>Edit {i}</button></div>"
+            for i in range(section, min(section + 10, count))
+        )
+        sections.append(f"<section><h2>Section {section}</h2><form>{buttons}</form></section>")
+    return f"<html><body><main>{''.join(sections)}</main></body></html>"
+
+
+async def backend_node_ids(session) -> List[int]:
+    document = await session.send("DOM.getDocument", {"depth": -1})
+    query = await session.send(
+        "DOM.querySelectorAll",
+        {"nodeId": document["root"]["nodeId"], "selector": "button"},
+    )
+    ids = []
+    for node_id in query["nodeIds"]:
+        described = await session.send("DOM.describeNode", {"nodeId": node_id})
+        ids.append(described["node"]["backendNodeId"])
+    return ids
+
+
+async def resolve_sequential(session, ids: List[int]) -> List[str]:
+    """The stock handler's approach: two round trips per element, one at a time."""
+    xpaths = []
+    for node_id in ids:
+        response = await session.send("DOM.resolveNode", {"backendNodeId": node_id})
+        xpaths.append(
+            await get_xpath_by_resolved_object_id(session, response["object"]["objectId"])
+        )
+    return xpaths
+
+
+async def check_xpaths(page, count: int, stock: List[str], batched: List[str]) -> int:
+    """Raise unless each pair selects the same element; return how many strings match."""
+    if len(stock) != len(batched) or not all(stock) or not all(batched):
+        raise RuntimeError(f"Unresolved XPaths at {count} elements")
+    same = await page.evaluate(SAME_ELEMENTS_JS, [list(pair) for pair in zip(stock, batched)])
+    for matches, stock_xpath, batched_xpath in zip(same, stock, batched):
+        if not matches:
+            raise RuntimeError(
+                f"XPath mismatch at {count} elements: stock {stock_xpath!r}, batched {batched_xpath!r}"
+            )
+    return sum(a == b for a, b in zip(stock, batched))
+
+
+async def time_ms(func, *args) -> float:
+    started = time.perf_counter()
+    await func(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+async def run_benchmark(counts: List[int], repeats: int, cdp_url: str) -> List[Dict[str, Any]]:
+    rows = []
+    async with async_playwright() as playwright:
+        if cdp_url:
+            browser = await playwright.chromium.connect_over_cdp(cdp_url)
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+        else:
+            browser = await playwright.chromium.launch(headless=True)
+            context = await browser.new_context()
+        page = await context.new_page()
+        session = await context.new_cdp_session(page)
+
+        async def send_cdp(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+            return await session.send(method, params)
+
+        try:
+            for count in counts:
+                await page.set_content(build_page(count))
+                ids = await backend_node_ids(session)
+
+                stock = await resolve_sequential(session, ids)
+                batched = await resolve_xpaths(send_cdp, ids)
+                identical = await check_xpaths(page, count, stock, batched)
+
+                sequential_ms = [await time_ms(resolve_sequential, session, ids) for _ in range(repeats)]
+                batched_ms = [await time_ms(resolve_xpaths, send_cdp, ids) for _ in range(repeats)]
+                rows.append({
+                    "elements": count,
+                    "identical": identical,
+                    "sequential_ms": statistics.median(sequential_ms),
+                    "batched_ms": statistics.median(batched_ms),
+                })
+        finally:
+            await page.close()
+            if not cdp_url:
+                await browser.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XPath resolution for observed elements")
+    parser.add_argument(
+        "--counts",
+        nargs="*",
+        type=int,
+        default=[1, 5, 10, 25, 50, 100, 200],
+        help="Element counts to measure (default: 1 5 10 25 50 100 200)"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Runs per element count; the median is reported (default: 5)"
+    )
+    parser.add_argument(
+        "--cdp-url",
+        default="",
+        help="Attach to an existing Chrome instead of launching headless Chromium"
+    )
+    args = parser.parse_args()
+
+    rows = asyncio.run(run_benchmark(args.counts, args.repeats, args.cdp_url))
+
+    # "same text" counts XPaths written exactly as the stock helper writes
+    # them; every pair was already checked to select the same element
+    print(f"{'elements':>8}  {'same text':>9}  {'stock ms':>8}  {'batched ms':>10}  {'speedup':>7}")
+    for row in rows:
+        speedup = row["sequential_ms"] / row["batched_ms"] if row["batched_ms"] else 0
+        print(
+            f"{row['elements']:>8}  {row['identical']:>9}  {row['sequential_ms']:>8.1f}  "
+            f"{row['batched_ms']:>10.1f}  {speedup:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
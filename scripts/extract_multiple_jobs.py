@@ -6,6 +6,8 @@ import json
 import sys
 import argparse
 import csv
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Any
 
@@ -14,6 +16,9 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
+from utils.job_store import FAILED_STATUSES, JOB_STORE_FILENAME, JobStore, job_store_path
+from utils.refresh_schedule import DEFAULT_MAX_AGE_HOURS, plan_refresh, view_velocity
+from utils.session_pool import SessionPool, TabPool
 from workflows import linkedin_job_extract
 
 
@@ -32,8 +37,17 @@ def load_job_titles_mapping() -> Dict[str, str]:
     return mapping
 
 
-def find_apply_url_for_job_id(job_id: str) -> str:
-    """Find the apply URL for a given job ID from promotion workflow runs."""
+def find_apply_url_for_job_id(job_id: str, store: JobStore = None) -> str:
+    """Find the apply URL for a given job ID from promotion workflow runs.
+
+    The store's promotions table is checked first. Promotions it does not
+    know yet are looked up in ``workflow_runs/`` and then remembered.
+    """
+    if store:
+        apply_url = store.apply_url(job_id)
+        if apply_url:
+            return apply_url
+
     workflow_runs_dir = REPO_ROOT / "workflow_runs"
 
     # Look for promotion files that contain this job_id
@@ -48,6 +62,11 @@ def find_apply_url_for_job_id(job_id: str) -> str:
                 input_data = data.get("input", {})
                 apply_url = input_data.get("apply_url", "")
                 if apply_url:
+                    if store:
+                        store.put_promotion(
+                            job_id, input_data.get("job_title", ""), apply_url,
+                            json_file.stat().st_mtime,
+                        )
                     return apply_url
 
         except (json.JSONDecodeError, KeyError):
@@ -56,20 +75,36 @@ def find_apply_url_for_job_id(job_id: str) -> str:
     return ""
 
 
-def check_job_exists(job_id: str, output_dir: Path) -> bool:
-    """Check if job data already exists in the output directory."""
-    output_file = output_dir / f"{job_id}.json"
-    return output_file.exists()
+class PageLoadLimiter:
+    """Space out job starts so concurrent tabs don't hit LinkedIn in a burst."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            delay = self._next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start = time.monotonic() + self.min_interval
 
 
-async def extract_single_job(job_id: str) -> Dict[str, Any]:
-    """Extract data from a single LinkedIn job posting."""
-    input_data = {"jobId": job_id}
+async def extract_single_job(
+    job_id: str, page, capture_api: bool = False, content_hash: str = None
+) -> Dict[str, Any]:
+    """Extract data from a single LinkedIn job posting on the given tab.
+
+    With the ``content_hash`` of the stored record, an unchanged page comes
+    back as ``status: unchanged`` without extracting.
+    """
+    input_data = {"jobId": job_id, "capture_api": capture_api, "content_hash": content_hash}
 
     print(f"Extracting data for job ID: {job_id}")
 
     try:
-        result = await linkedin_job_extract.run_with_stagehand(input_data)
+        result = await linkedin_job_extract.run_on_page(page, input_data)
         print(f"✓ Successfully extracted data for job {job_id}")
         return result
     except Exception as e:
@@ -81,99 +116,238 @@ async def extract_single_job(job_id: str) -> Dict[str, Any]:
         }
 
 
-async def extract_multiple_jobs(job_ids: List[str], output_dir: Path = None, force: bool = False) -> tuple[List[Dict[str, Any]], List[str]]:
-    """Extract data from multiple LinkedIn job postings."""
-    results = []
-    skipped_jobs = []
-    processed_jobs = []
-
-    # Load the job titles mapping once
-    job_titles_mapping = load_job_titles_mapping()
-    print(f"Loaded job titles mapping with {len(job_titles_mapping)} entries")
-
-    # Filter out jobs that already exist (unless force is True)
-    jobs_to_process = []
-    for job_id in job_ids:
-        if force or not check_job_exists(job_id, output_dir):
-            jobs_to_process.append(job_id)
+async def extract_multiple_jobs(
+    job_ids: List[str],
+    output_dir: Path = None,
+    force: bool = False,
+    concurrency: int = 1,
+    min_interval: float = 2.0,
+    cdp_urls: List[str] = None,
+    capture_api: bool = False,
+    refresh: bool = False,
+    max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+    time_budget: float = None,
+) -> tuple[List[Dict[str, Any]], List[str]]:
+    """Extract data from multiple LinkedIn job postings.
+
+    With ``refresh``, only jobs whose stored data is past ``max_age_hours``
+    (weighted by status and view velocity) are re-extracted, most urgent
+    first. ``time_budget`` (minutes) stops starting new jobs once spent.
+    """
+    with JobStore(job_store_path(output_dir)) as store:
+        results = []
+        skipped_jobs = []
+
+        # Load the job titles mapping once
+        job_titles_mapping = load_job_titles_mapping()
+        print(f"Loaded job titles mapping with {len(job_titles_mapping)} entries")
+
+        jobs_to_process = []
+        if refresh and not force:
+            # Refresh the stalest, fastest-moving jobs first; leave fresh ones alone
+            due, skipped_jobs = plan_refresh(job_ids, store.records(job_ids), max_age_hours)
+            jobs_to_process = [job_id for job_id, _ in due]
+            print(f"Refresh plan: {len(due)} due, {len(skipped_jobs)} still fresh")
+            for job_id, priority in due[:10]:
+                print(f"   {job_id}: priority {priority:.1f}")
         else:
-            skipped_jobs.append(job_id)
-            print(f"⏭️  Skipping job ID {job_id} (already exists)")
-
-    if skipped_jobs:
-        print(f"\nSkipped {len(skipped_jobs)} existing jobs: {', '.join(skipped_jobs)}")
+            # Filter out jobs that already exist (unless force is True)
+            stored_ids = set() if force else store.job_ids()
+            for job_id in job_ids:
+                if job_id not in stored_ids:
+                    jobs_to_process.append(job_id)
+                else:
+                    skipped_jobs.append(job_id)
+                    print(f"⏭️  Skipping job ID {job_id} (already exists)")
+
+        if skipped_jobs:
+            kind = "fresh" if refresh else "existing"
+            print(f"\nSkipped {len(skipped_jobs)} {kind} jobs: {', '.join(skipped_jobs)}")
+
+        if not jobs_to_process:
+            if refresh:
+                print("\n✅ All jobs are fresh! Lower --max-age-hours or use --force to re-extract.")
+            else:
+                print("\n✅ All jobs already exist! Use --force to re-extract.")
+            return results, skipped_jobs
+
+        started = time.monotonic()
+        # One session per browser for the whole batch; logins are verified up front
+        async with SessionPool(cdp_urls=cdp_urls) as pool:
+            print(
+                f"\nStarting extraction for {len(jobs_to_process)} jobs on "
+                f"{pool.worker_count} browser(s) x {concurrency} tab(s)..."
+            )
+            print("=" * 50)
+            results, processed_jobs = await _extract_jobs(
+                jobs_to_process,
+                pool,
+                concurrency,
+                PageLoadLimiter(min_interval),
+                job_titles_mapping,
+                store,
+                capture_api,
+                time.monotonic() + time_budget * 60 if time_budget else None,
+            )
+            print("Per-worker throughput:")
+            for worker in pool.stats():
+                print(f"   {worker}")
+        elapsed = time.monotonic() - started
+
+        print("\n" + "=" * 50)
+        print("Extraction completed!")
+        print(
+            f"Extracted {len(processed_jobs)} jobs in {elapsed:.1f}s "
+            f"({60 * len(processed_jobs) / elapsed if elapsed else 0:.1f} jobs/min, concurrency {concurrency})"
+        )
+
+        # Save summary
+        if output_dir:
+            summary_file = output_dir / "extraction_summary.json"
+            summary = {
+                "total_requested": len(job_ids),
+                "processed": len(processed_jobs),
+                "skipped_existing": len(skipped_jobs),
+                "not_reached": len(jobs_to_process) - len(processed_jobs),
+                "successful": len([r for r in results if r.get("status") not in FAILED_STATUSES]),
+                "failed": len([r for r in results if r.get("status") in FAILED_STATUSES]),
+                "skipped_unchanged": len([r for r in results if r.get("status") == "unchanged"]),
+                "extracted_by_api": len([r for r in results if r.get("extracted_by") == "api"]),
+                "extracted_by_dom": len([r for r in results if r.get("extracted_by") == "dom"]),
+                "extracted_by_llm": len([r for r in results if r.get("extracted_by") == "llm"]),
+                # Records themselves live in the store; keep only what needs attention
+                "store": str(store.db_path),
+                "failures": [
+                    {"jobId": r.get("jobId"), "error": r.get("error")}
+                    for r in results
+                    if r.get("status") in FAILED_STATUSES
+                ],
+            }
+
+            with summary_file.open("w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+
+            print(f"Summary saved to: {summary_file}")
 
-    if not jobs_to_process:
-        print("\n✅ All jobs already exist! Use --force to re-extract.")
         return results, skipped_jobs
 
-    print(f"\nStarting extraction for {len(jobs_to_process)} jobs...")
-    print("=" * 50)
 
+def enrich_result(
+    result: Dict[str, Any], job_id: str, job_titles_mapping: Dict[str, str], store: JobStore = None
+) -> None:
+    """Add the original title and apply URL to a successful extraction."""
+    if result.get("status") in FAILED_STATUSES or not result.get("job_name"):
+        return
+    job_name = result["job_name"]
+
+    # Find original title
+    original_title = job_titles_mapping.get(job_name, "")
+    if original_title:
+        result["original_job_title"] = original_title
+        print(f"   Found original title: {original_title}")
+    else:
+        result["original_job_title"] = ""
+        print(f"   No original title found for: {job_name}")
+
+    # Find apply URL
+    apply_url = find_apply_url_for_job_id(job_id, store)
+    if apply_url:
+        result["apply_url"] = apply_url
+        print(f"   Found apply URL: {apply_url}")
+    else:
+        result["apply_url"] = ""
+        print(f"   No apply URL found for job ID: {job_id}")
+
+
+async def _extract_jobs(
+    jobs_to_process: List[str],
+    pool: SessionPool,
+    concurrency: int,
+    limiter: PageLoadLimiter,
+    job_titles_mapping: Dict[str, str],
+    store: JobStore,
+    capture_api: bool = False,
+    deadline: float = None,
+) -> tuple[List[Dict[str, Any]], List[str]]:
+    """Extract jobs on every pooled browser, ``concurrency`` tabs each.
+
+    Tabs pull job IDs from one shared queue, so faster browsers take more
+    jobs. Each result is saved to ``store`` as it finishes; results come back in input
+    order regardless of completion order. No new job starts after
+    ``deadline`` (a ``time.monotonic()`` value).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
     for i, job_id in enumerate(jobs_to_process, 1):
+        queue.put_nowait((i, job_id))
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def drain(stagehand, tabs: TabPool) -> None:
+        async with tabs.tab() as page:
+            while not queue.empty():
+                if deadline and time.monotonic() >= deadline:
+                    return
+                i, job_id = queue.get_nowait()
+                started = time.monotonic()
+                results[job_id] = await process(i, job_id, page)
+                pool.record_job(
+                    stagehand,
+                    time.monotonic() - started,
+                    results[job_id].get("status") not in FAILED_STATUSES,
+                )
+
+    async def run_worker() -> None:
+        try:
+            async with pool.session(count_job=False) as stagehand:
+                async with TabPool(stagehand, concurrency) as tabs:
+                    await asyncio.gather(*(drain(stagehand, tabs) for _ in range(concurrency)))
+        except Exception as error:
+            print(f"Browser worker stopped: {error}")
+
+    async def process(i: int, job_id: str, page) -> Dict[str, Any]:
+        # Be respectful: page loads are spaced out across all tabs
+        await limiter.wait()
         print(f"\n[{i}/{len(jobs_to_process)}] Processing job ID: {job_id}")
-
-        result = await extract_single_job(job_id)
-
-        # Enhance result with additional data
-        if result.get("status") != "failed" and result.get("job_name"):
-            job_name = result["job_name"]
-
-            # Find original title
-            original_title = job_titles_mapping.get(job_name, "")
-            if original_title:
-                result["original_job_title"] = original_title
-                print(f"   Found original title: {original_title}")
-            else:
-                result["original_job_title"] = ""
-                print(f"   No original title found for: {job_name}")
-
-            # Find apply URL
-            apply_url = find_apply_url_for_job_id(job_id)
-            if apply_url:
-                result["apply_url"] = apply_url
-                print(f"   Found apply URL: {apply_url}")
-            else:
-                result["apply_url"] = ""
-                print(f"   No apply URL found for job ID: {job_id}")
+        stored = store.get(job_id)
+        result = await extract_single_job(
+            job_id, page, capture_api, stored.get("content_hash")
+        )
+        now = datetime.now(timezone.utc)
+        if result.get("status") in FAILED_STATUSES:
+            # Log the failure; the last good record stays as it was
+            store.put_failure({**result, "extracted_at": now.isoformat()})
+            print(f"   Failure logged to: {store.db_path}")
+            return result
+
+        unchanged = result.get("status") == "unchanged"
+        if unchanged:
+            # Same analytics as last time: keep the record (and its status),
+            # refresh its timestamp
+            print("   Page unchanged, reusing stored record")
+            result = {
+                **stored,
+                "posted_when": result.get("posted_when") or stored.get("posted_when"),
+            }
+        velocity = view_velocity(result, stored, now.timestamp())
+        if velocity is not None:
+            result["view_velocity"] = velocity
+        result["extracted_at"] = now.isoformat()
+
+        enrich_result(result, job_id, job_titles_mapping, store)
 
         # Save individual result
-        if output_dir:
-            output_dir.mkdir(parents=True, exist_ok=True)
-            output_file = output_dir / f"{job_id}.json"
-
-            with output_file.open("w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2)
-
-            print(f"   Saved to: {output_file}")
-
-        results.append(result)
-        processed_jobs.append(job_id)
+        store.put(result)
+        print(f"   Saved to: {store.db_path}")
+        if not unchanged:
+            return result
+        # "unchanged" is only reported for this run, never stored. Nothing was
+        # read this run, so the stored extracted_by stays out of the counts.
+        reported = {**result, "status": "unchanged"}
+        reported.pop("extracted_by", None)
+        return reported
 
-        # Add a small delay between requests to be respectful
-        await asyncio.sleep(2)
-
-    print("\n" + "=" * 50)
-    print("Extraction completed!")
-
-    # Save summary
-    if output_dir:
-        summary_file = output_dir / "extraction_summary.json"
-        summary = {
-            "total_requested": len(job_ids),
-            "processed": len(processed_jobs),
-            "skipped_existing": len(skipped_jobs),
-            "successful": len([r for r in results if r.get("status") != "failed"]),
-            "failed": len([r for r in results if r.get("status") == "failed"]),
-            "results": results
-        }
-
-        with summary_file.open("w", encoding="utf-8") as f:
-            json.dump(summary, f, indent=2)
-
-        print(f"Summary saved to: {summary_file}")
-
-    return results, skipped_jobs
+    await asyncio.gather(*(run_worker() for _ in range(pool.worker_count)))
+    processed = [job_id for job_id in jobs_to_process if job_id in results]
+    return [results[job_id] for job_id in processed], processed
 
 
 def load_job_ids_from_file(file_path: str) -> List[str]:
@@ -212,13 +386,51 @@ def main():
     parser.add_argument(
         "--output-dir",
         default="linked_job_posts",
-        help="Output directory for extracted data (default: linked_job_posts)"
+        help=f"Output directory for the job store ({JOB_STORE_FILENAME}) and run summary (default: linked_job_posts)"
     )
     parser.add_argument(
         "--force",
         action="store_true",
         help="Force extraction of all jobs, even if data already exists (default: skip existing jobs)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of browser tabs to extract on in parallel (default: 1)"
+    )
+    parser.add_argument(
+        "--cdp-urls",
+        nargs="*",
+        help="CDP endpoints of the browsers to spread jobs across (default: STAGEHAND_CDP_URLS or STAGEHAND_LOCAL_CDP_URL)"
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=2.0,
+        help="Minimum seconds between page loads across all tabs (default: 2.0)"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-extract existing jobs whose data is stale, most urgent first (by age, status and view velocity)"
+    )
+    parser.add_argument(
+        "--max-age-hours",
+        type=float,
+        default=DEFAULT_MAX_AGE_HOURS,
+        help=f"Freshness threshold for --refresh, in hours for an Active job with flat views (default: {DEFAULT_MAX_AGE_HOURS:g})"
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop starting new jobs after this many minutes"
+    )
+    parser.add_argument(
+        "--capture-api",
+        action="store_true",
+        help="Read analytics from the page's JSON API responses, falling back to the DOM and then the LLM"
+    )
 
     args = parser.parse_args()
 
@@ -246,17 +458,32 @@ def main():
 
     print(f"Found {len(unique_job_ids)} unique job IDs to process")
 
-    if not args.force:
+    if args.refresh and not args.force:
+        print(f"ℹ️  Refreshing jobs older than {args.max_age_hours:g}h (weighted by status and view velocity)")
+    elif not args.force:
         print("ℹ️  Checking for existing job data (use --force to skip this check)")
 
     output_dir = Path(args.output_dir)
 
     # Run the extraction
-    results, skipped_jobs = asyncio.run(extract_multiple_jobs(unique_job_ids, output_dir, args.force))
+    results, skipped_jobs = asyncio.run(
+        extract_multiple_jobs(
+            unique_job_ids,
+            output_dir,
+            args.force,
+            concurrency=max(1, args.concurrency),
+            min_interval=args.min_interval,
+            cdp_urls=args.cdp_urls,
+            capture_api=args.capture_api,
+            refresh=args.refresh,
+            max_age_hours=args.max_age_hours,
+            time_budget=args.time_budget,
+        )
+    )
 
     # Print final summary
-    successful = len([r for r in results if r.get("status") != "failed"])
-    failed = len([r for r in results if r.get("status") == "failed"])
+    successful = len([r for r in results if r.get("status") not in FAILED_STATUSES])
+    failed = len([r for r in results if r.get("status") in FAILED_STATUSES])
 
     print("\nFinal Summary:")
     print(f"  Total requested: {len(unique_job_ids)}")
@@ -264,6 +491,10 @@ def main():
     print(f"  Skipped (existing): {len(skipped_jobs)}")
     print(f"  Successful: {successful}")
     print(f"  Failed: {failed}")
+    print(f"  Unchanged (reused): {len([r for r in results if r.get('status') == 'unchanged'])}")
+    print(f"  Read from API: {len([r for r in results if r.get('extracted_by') == 'api'])}")
+    print(f"  Read from DOM: {len([r for r in results if r.get('extracted_by') == 'dom'])}")
+    print(f"  LLM fallbacks: {len([r for r in results if r.get('extracted_by') == 'llm'])}")
 
     if skipped_jobs:
         print(f"\nSkipped existing jobs: {', '.join(skipped_jobs)}")
@@ -271,7 +502,7 @@ def main():
     if failed > 0:
         print("\nFailed jobs:")
         for result in results:
-            if result.get("status") == "failed":
+            if result.get("status") in FAILED_STATUSES:
                 print(f"  - {result.get('jobId')}: {result.get('error', 'Unknown error')}")
 
 
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Import the per-job JSON files and promotion records into the job store."""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+# Add the repo root to the Python path
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from utils.job_store import JOB_STORE_FILENAME, JobStore, job_store_path
+
+SKIPPED_FILES = {"extraction_summary.json"}
+IMPORT_BATCH_SIZE = 1000
+
+
+def iter_job_records(input_dir: Path) -> Iterator[Dict[str, Any]]:
+    """Yield each job record in ``input_dir``, normalised to the extractor's keys."""
+    for path in sorted(input_dir.glob("*.json")):
+        if path.name in SKIPPED_FILES:
+            continue
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError) as error:
+            print(f"Skipping {path.name}: {error}")
+            continue
+        if not isinstance(record, dict):
+            print(f"Skipping {path.name}: not a job record")
+            continue
+        # Records saved by the single-job workflow used job_id / job_url
+        record.setdefault("jobId", record.pop("job_id", None) or path.stem)
+        if "job_url" in record:
+            record.setdefault("jobDetailUrl", record.pop("job_url"))
+        # Older records have no timestamp; the file's mtime is when it was written
+        record.setdefault(
+            "extracted_at",
+            datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat(),
+        )
+        yield record
+
+
+def import_promotions(workflow_runs_dir: Path, store: JobStore) -> int:
+    """Record the apply URL of every promotion run that produced a jobId."""
+    imported = 0
+    for path in workflow_runs_dir.glob("*_promotion_*.json"):
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        job_id = (data.get("output") or {}).get("jobId")
+        input_data = data.get("input") or {}
+        if job_id and input_data.get("apply_url"):
+            store.put_promotion(
+                job_id, input_data.get("job_title", ""), input_data["apply_url"], path.stat().st_mtime
+            )
+            imported += 1
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import job JSON files into the job store")
+    parser.add_argument(
+        "--input-dir",
+        default="linked_job_posts",
+        help="Directory of <jobId>.json files to import (default: linked_job_posts)"
+    )
+    parser.add_argument(
+        "--store",
+        help=f"Job store to write (default: <input-dir>/{JOB_STORE_FILENAME})"
+    )
+    parser.add_argument(
+        "--workflow-runs",
+        default=str(REPO_ROOT / "workflow_runs"),
+        help="Directory of promotion run records, for apply URLs (default: workflow_runs)"
+    )
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        print(f"Error: {input_dir} is not a directory")
+        sys.exit(1)
+    store_path = Path(args.store) if args.store else job_store_path(input_dir)
+
+    started = time.perf_counter()
+    with JobStore(store_path) as store:
+        imported = 0
+        batch = []
+        for record in iter_job_records(input_dir):
+            batch.append(record)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += store.put_many(batch)
+                batch = []
+        imported += store.put_many(batch)
+
+        promotions = 0
+        workflow_runs_dir = Path(args.workflow_runs)
+        if workflow_runs_dir.is_dir():
+            promotions = import_promotions(workflow_runs_dir, store)
+        total = store.count()
+
+    print(
+        f"Imported {imported} job records and {promotions} promotions into {store_path} "
+        f"in {time.perf_counter() - started:.1f}s ({total} jobs stored)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
 import csv
 import json
+from functools import partial
 from pathlib import Path
 from typing import Any
 import sys
@@ -11,6 +13,9 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
+from utils.job_store import JobStore
+from utils.session_pool import SessionPool
+from utils.task_queue import KEY_SEPARATOR, RetryLater, TaskQueue, run_workers, task_key
 from workflows import linkedin_edit_country, linkedin_job_promotion
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
@@ -19,6 +24,10 @@ WORKFLOW_RUNS_DIR = REPO_ROOT / "workflow_runs"
 CACHE_DIR = REPO_ROOT / "cache"
 DOWNLOADS_DIR = REPO_ROOT / "downloads"
 SUMMARY_CSV = DOWNLOADS_DIR / "job_titles_summary.csv"
+DEFAULT_PROMOTION_CONCURRENCY = 1
+DEFAULT_EDIT_CONCURRENCY = 2
+# Ready edits a worker applies in one session before checking for more
+EDIT_BATCH_SIZE = 10
 
 
 def load_summary() -> dict[str, dict[str, Any]]:
@@ -47,72 +56,202 @@ def load_input_files() -> dict[str, dict[str, Any]]:
     return inputs
 
 
-async def run_promotion_for_job(
+async def promote_once(
     job_title: str,
-    template: dict[str, Any],
+    input_data: dict[str, Any],
+    index: int,
     run_count: int,
-) -> list[dict[str, Any]]:
-    results: list[dict[str, Any]] = []
-    for index in range(run_count):
-        input_data = dict(template["payload"])
-        print(f"Posting job '{job_title}' run {index + 1}/{run_count}")
-        try:
-            output = await linkedin_job_promotion.run_with_stagehand(input_data)
-        except Exception as error:
-            print(f"Promotion failed for '{job_title}' run {index + 1}: {error}")
-            continue
-
-        record_path = WORKFLOW_RUNS_DIR / f"{job_title.replace(' ', '_')}_promotion_run{index + 1}.json"
-        record = {
-            "workflow": "linkedin_job_promotion",
-            "input": input_data,
-            "output": output,
-        }
-        record_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
-        results.append(record)
-    return results
-
+    pool: SessionPool,
+) -> dict[str, Any] | None:
+    """Run one promotion, save its record and return the new posting's jobId."""
+    print(f"Posting job '{job_title}' run {index + 1}/{run_count}")
+    async with pool.session() as stagehand:
+        output = await linkedin_job_promotion.run(stagehand, dict(input_data))
 
-async def edit_job_location(job_detail_url: str, country: str) -> dict[str, Any] | None:
-    payload = {
-        "job_detail_url": job_detail_url,
-        "employee_location": country,
+    record_path = WORKFLOW_RUNS_DIR / f"{job_title.replace(' ', '_')}_promotion_run{index + 1}.json"
+    record = {
+        "workflow": "linkedin_job_promotion",
+        "input": input_data,
+        "output": output,
     }
-    print(f"Updating job at {job_detail_url} to location '{country}'")
-    try:
-        return await linkedin_edit_country.run_with_stagehand(payload)
-    except Exception as error:
-        print(f"Failed to update location for {job_detail_url} to {country}: {error}")
-        return None
+    record_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    job_id = output.get("jobId")
+    if job_id:
+        # Extraction looks the apply URL up by jobId
+        with JobStore() as store:
+            store.put_promotion(job_id, job_title, input_data.get("apply_url", ""))
+    return {"jobId": job_id} if job_id else None
 
 
-async def main() -> None:
+async def main(
+    cdp_urls: list[str] | None = None,
+    promotion_concurrency: int = DEFAULT_PROMOTION_CONCURRENCY,
+    edit_concurrency: int = DEFAULT_EDIT_CONCURRENCY,
+    batch: str | None = None,
+    retry_failed: bool = False,
+) -> None:
     summary = load_summary()
     input_files = load_input_files()
 
-    # Step 1: promote each job as many times as there are countries listed
-    promotion_results: dict[str, list[dict[str, Any]]] = {}
-    for job_title, template in input_files.items():
-        country_list = summary.get(job_title, {}).get("countries", [""])
-        run_count = len(country_list) or 1
-        records = await run_promotion_for_job(job_title, template, run_count)
-        promotion_results[job_title] = records
+    queue = TaskQueue()
+    try:
+        # Edits only set a field, so an interrupted one is safe to repeat; an
+        # interrupted promotion may already have been paid for
+        recovered = queue.recover(retry_kinds=("edit",))
+        if recovered:
+            print(f"Recovered {recovered} task(s) left running by a previous run")
+        if retry_failed:
+            print(f"Retrying {queue.retry_failed()} failed task(s)")
+        batch = batch or ""
+        added = enqueue_batch(queue, batch, summary, input_files)
+        print(f"Batch {batch or '(default)'}: {added} new task(s); queue {queue.counts()}")
+
+        # Keep one session per browser alive for every promotion and edit;
+        # jobs go to whichever worker is free, so at most one runs per browser
+        async with SessionPool(cdp_urls=cdp_urls) as pool:
+            await run_workers(
+                queue,
+                {
+                    "promotion": partial(run_promotion_task, pool=pool),
+                    "edit": partial(run_edit_tasks, pool=pool),
+                },
+                {"promotion": promotion_concurrency, "edit": edit_concurrency},
+                batch_sizes={"edit": EDIT_BATCH_SIZE},
+            )
+            print("Per-worker throughput:")
+            for worker in pool.stats():
+                print(f"  {worker}")
+
+        print(f"Task results: {queue.counts()}")
+        for key, error in queue.failures():
+            print(f"  failed {key.replace(KEY_SEPARATOR, ' / ')}: {error}")
+    finally:
+        queue.close()
+
 
-    # Step 2: for each successful promotion, update location per country list
-    for job_title, records in promotion_results.items():
+def enqueue_batch(
+    queue: TaskQueue,
+    batch: str,
+    summary: dict[str, dict[str, Any]],
+    input_files: dict[str, dict[str, Any]],
+) -> int:
+    """Queue one promotion per listed country, each followed by its location edit.
+
+    Keys are idempotent (job title, run index, country), so a rerun only
+    adds tasks that are new, whatever state the earlier run ended in. A
+    promotion that is done is never queued again. Only a named ``batch`` is
+    part of the key: it is an explicit request for a new round of postings.
+    An edit becomes ready as soon as its own promotion has a jobId.
+    """
+    scope = (batch,) if batch else ()
+    added = 0
+    for job_title, template in input_files.items():
         countries = summary.get(job_title, {}).get("countries", [])
-        for country, record in zip(countries, records):
-            output = record.get("output", {})
-            job_id = output.get("jobId")
-            if not job_id:
-                continue
-            job_url = f"https://www.linkedin.com/hiring/jobs/{job_id}/detail/"
-            result = await edit_job_location(job_url, country)
-            if not result:
-                continue
-            path = WORKFLOW_RUNS_DIR / f"{job_title.replace(' ', '_')}_location_{country.replace(' ', '_')}.json"
-            path.write_text(json.dumps({"input": job_url, "country": country, "output": result}, indent=2), encoding="utf-8")
+        run_count = len(countries) or 1
+        for index in range(run_count):
+            country = countries[index] if index < len(countries) else ""
+            promotion_key = task_key("promotion", *scope, job_title, index + 1, country)
+            added += queue.enqueue(
+                promotion_key,
+                "promotion",
+                {
+                    "job_title": job_title,
+                    "index": index,
+                    "run_count": run_count,
+                    "input": template["payload"],
+                },
+                batch=batch,
+            )
+            if country:
+                added += queue.enqueue(
+                    task_key("edit", *scope, job_title, index + 1, country),
+                    "edit",
+                    {"job_title": job_title, "country": country},
+                    parent=promotion_key,
+                    batch=batch,
+                )
+    return added
+
+
+async def run_promotion_task(
+    payload: dict[str, Any], _parent_result: Any, pool: SessionPool
+) -> dict[str, Any] | None:
+    return await promote_once(
+        payload["job_title"], payload["input"], payload["index"], payload["run_count"], pool
+    )
+
+
+async def run_edit_tasks(
+    tasks: list[tuple[dict[str, Any], dict[str, Any]]], pool: SessionPool
+) -> list[dict[str, Any] | RetryLater]:
+    """Apply every ready location edit in one browser session.
+
+    A new posting stays "In review" for a while, and LinkedIn only allows
+    edits once it is Active. Any edit that did not report ``updated`` is
+    therefore retried later with backoff, and only a real update is recorded.
+    """
+    inputs = [
+        {
+            "job_detail_url": f"https://www.linkedin.com/hiring/jobs/{promotion['jobId']}/detail/",
+            "employee_location": payload["country"],
+        }
+        for payload, promotion in tasks
+    ]
+    for edit in inputs:
+        print(f"Updating job at {edit['job_detail_url']} to location '{edit['employee_location']}'")
+    async with pool.session() as stagehand:
+        outputs = await linkedin_edit_country.run_many(stagehand, inputs)
+
+    results: list[dict[str, Any] | RetryLater] = []
+    for (payload, _), edit, output in zip(tasks, inputs, outputs):
+        status = output.get("status")
+        if status != "updated":
+            reason = output.get("error") or f"job state {output.get('jobState', 'unknown')}"
+            results.append(RetryLater(f"{status}: {reason}"))
+            continue
+        country = payload["country"]
+        path = WORKFLOW_RUNS_DIR / f"{payload['job_title'].replace(' ', '_')}_location_{country.replace(' ', '_')}.json"
+        path.write_text(json.dumps({"input": edit["job_detail_url"], "country": country, "output": output}, indent=2), encoding="utf-8")
+        results.append(output)
+    return results
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Promote every input job and set its locations")
+    parser.add_argument(
+        "--cdp-urls",
+        nargs="*",
+        help="CDP endpoints of the browsers to spread jobs across (default: STAGEHAND_CDP_URLS or STAGEHAND_LOCAL_CDP_URL)",
+    )
+    parser.add_argument(
+        "--promotion-concurrency",
+        type=int,
+        default=DEFAULT_PROMOTION_CONCURRENCY,
+        help=f"Promotions to run at once (default: {DEFAULT_PROMOTION_CONCURRENCY}; each waits for its SMS OTP in Messages' chat.db; one per browser at a time)",
+    )
+    parser.add_argument(
+        "--edit-concurrency",
+        type=int,
+        default=DEFAULT_EDIT_CONCURRENCY,
+        help=f"Location edit workers (default: {DEFAULT_EDIT_CONCURRENCY}; one per browser at a time)",
+    )
+    parser.add_argument(
+        "--batch",
+        help="Name a new round of postings; every promotion is queued again under it "
+        "(default: one round, so reruns only resume unfinished tasks)",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Requeue failed tasks, including interrupted promotions (check LinkedIn for duplicates first)",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.cdp_urls,
+            args.promotion_concurrency,
+            args.edit_concurrency,
+            args.batch,
+            args.retry_failed,
+        )
+    )
@@ -0,0 +1,217 @@
+"""``capture_job_api`` against a recorded Voyager payload.
+
+``fixtures/voyager_job_posting.json`` is a job detail API response with
+names, URNs and numbers replaced. The mapping tests need neither a browser
+nor pydantic. The browser tests serve the payload from a local stand-in for
+LinkedIn: the job page fetches it from ``/voyager/api/``, as the real page
+does.
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from utils.api_capture import (
+    JobApiCapture,
+    capture_job_api,
+    fields_from_payload,
+    posted_when_from_epoch_ms,
+)
+from utils.job_analytics import validate_fields
+
+FIXTURE = Path(__file__).parent / "fixtures" / "voyager_job_posting.json"
+JOB_ID = "4300000001"
+VOYAGER_CONTENT_TYPE = "application/vnd.linkedin.normalized+json+2.1"
+JOB_PAGE = """<!doctype html>
+<html><body><main><h1>Loading</h1></main>
+<script>
+fetch("/voyager/api/hiring/dash/jobPostings" + location.search);
+</script>
+</body></html>
+"""
+NOW = 1_760_000_000.0
+
+
+@pytest.fixture(scope="module")
+def job_schema():
+    pydantic = pytest.importorskip("pydantic")
+
+    class JobSchema(pydantic.BaseModel):
+        job_name: str
+        location: str
+        job_status: str
+        posted_when: str
+        amount_spent: float
+        views: int
+        apply_clicks: int
+
+    return JobSchema
+
+
+def voyager_payload(drop: str | None = None) -> dict:
+    payload = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    if drop:
+        for node in payload["included"]:
+            node.pop(drop, None)
+    return payload
+
+
+class FakeResponse:
+    def __init__(self, url: str, body: str, content_type: str = VOYAGER_CONTENT_TYPE) -> None:
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self._body = body
+
+    async def json(self):
+        return json.loads(self._body)
+
+
+def captured(*responses: FakeResponse) -> JobApiCapture:
+    async def scenario():
+        capture = JobApiCapture(JOB_ID)
+        for response in responses:
+            await capture.on_response(response)
+        return capture
+
+    return asyncio.run(scenario())
+
+
+def test_fixture_maps_onto_the_schema_fields():
+    capture = captured(
+        FakeResponse("https://www.linkedin.com/voyager/api/hiring/dash/jobPostings", FIXTURE.read_text())
+    )
+    fields = capture.fields
+    assert capture.payloads == 1
+    assert fields["job_name"] == "Generalist Evaluator Expert"
+    assert fields["location"] == "United States (Remote)"
+    assert fields["job_status"] == "Active"
+    assert fields["posted_when"].startswith("Posted ")
+    assert (fields["views"], fields["apply_clicks"], fields["amount_spent"]) == (412, 37, 1843.5)
+
+
+def test_posted_when_reads_like_the_page():
+    assert posted_when_from_epoch_ms((NOW - 6 * 3600) * 1000, NOW) == "Posted 6 hours ago"
+    assert posted_when_from_epoch_ms((NOW - 86400) * 1000, NOW) == "Posted 1 day ago"
+    assert posted_when_from_epoch_ms((NOW - 10) * 1000, NOW) == "Posted just now"
+    assert posted_when_from_epoch_ms("soon", NOW) is None
+
+
+def test_fields_of_other_jobs_and_non_job_objects_are_skipped():
+    payload = {
+        "included": [
+            {"entityUrn": "urn:li:fsd_company:1", "title": "Mercor", "viewCount": 5},
+            {"entityUrn": "urn:li:fsd_jobPosting:4300000002", "jobTitle": "Other", "jobState": "CLOSED"},
+            {"entityUrn": f"urn:li:fsd_jobPosting:{JOB_ID}", "jobTitle": "AI Trainer", "jobState": "LISTED"},
+        ]
+    }
+    fields = fields_from_payload(payload, JOB_ID)
+    assert (fields["job_name"], fields["job_status"]) == ("AI Trainer", "LISTED")
+    # Analytics may sit on any object of this job's payload
+    assert fields["views"] == 5
+
+
+def fixture_fields() -> dict:
+    return captured(
+        FakeResponse("https://www.linkedin.com/voyager/api/hiring/dash/jobPostings", FIXTURE.read_text())
+    ).fields
+
+
+def test_validate_fields_rejects_missing_and_unexpected_values():
+    # Rejected before the schema is built, so no schema is needed
+    fields = fixture_fields()
+    assert validate_fields({**fields, "views": None}, None) is None
+    assert validate_fields({**fields, "job_status": "Archived"}, None) is None
+    assert validate_fields({**fields, "posted_when": "yesterday"}, None) is None
+
+
+def test_validate_fields_builds_the_schema(job_schema):
+    job = validate_fields(fixture_fields(), job_schema)
+    assert (job.views, job.apply_clicks) == (412, 37)
+
+
+def test_other_and_non_json_responses_are_ignored():
+    capture = captured(
+        FakeResponse("https://www.linkedin.com/voyager/api/me", "<html>", "text/html"),
+        FakeResponse("https://www.linkedin.com/voyager/api/jobs", "for (;;);"),
+        FakeResponse("https://static.licdn.com/sc/h/app.json", FIXTURE.read_text()),
+    )
+    assert capture.payloads == 0
+    assert capture.fields == {}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves a job page, and the Voyager payload chosen by its ``mode`` query."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        mode = parse_qs(url.query).get("mode", ["ok"])[0]
+        if url.path.startswith("/voyager/api/"):
+            if mode == "not_json":
+                body = b"<html><body>Request blocked</body></html>"
+            else:
+                body = json.dumps(voyager_payload("applyClickCount" if mode == "missing" else None)).encode()
+            self._send(body, VOYAGER_CONTENT_TYPE)
+        else:
+            self._send(JOB_PAGE.encode(), "text/html")
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def capture_from_stand_in(base_url: str, schema: type, mode: str, timeout_ms: int = 5000):
+    async_api = pytest.importorskip("playwright.async_api")
+
+    async def scenario():
+        async with async_api.async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch()
+            except async_api.Error as error:
+                pytest.skip(f"Chromium is not installed: {error}")
+            try:
+                page = SimpleNamespace(_page=await browser.new_page())
+                return await capture_job_api(
+                    page, f"{base_url}/hiring/jobs/{JOB_ID}/detail/?mode={mode}", JOB_ID, schema, timeout_ms
+                )
+            finally:
+                await browser.close()
+
+    return asyncio.run(scenario())
+
+
+def test_capture_builds_the_schema_from_the_api_response(stand_in, job_schema):
+    job = capture_from_stand_in(stand_in, job_schema, "ok")
+    assert job is not None
+    assert job.job_name == "Generalist Evaluator Expert"
+    assert (job.views, job.apply_clicks, job.amount_spent) == (412, 37, 1843.5)
+
+
+def test_missing_field_falls_back_to_the_page(stand_in, job_schema):
+    # None sends the extract workflow on to the DOM reader and the LLM
+    assert capture_from_stand_in(stand_in, job_schema, "missing", timeout_ms=1000) is None
+
+
+def test_non_json_response_falls_back_to_the_page(stand_in, job_schema):
+    assert capture_from_stand_in(stand_in, job_schema, "not_json", timeout_ms=1000) is None
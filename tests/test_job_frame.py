@@ -0,0 +1,37 @@
+import pandas as pd
+
+from utils.job_frame import build_dashboard_data, job_page
+
+
+def jobs(count):
+    return pd.DataFrame(
+        {
+            "jobId": [str(4300000000 + i) for i in range(count)],
+            "job_name": ["Python Developer" if i % 3 == 0 else "AI Trainer" for i in range(count)],
+            "job_status": "Active",
+        }
+    )
+
+
+def test_pages_hold_at_most_page_size_rows_and_their_labels():
+    data = build_dashboard_data(jobs(120))
+
+    page = job_page(data, page=3, page_size=50)
+    assert (page.matches, page.pages, page.start) == (120, 3, 100)
+    assert list(page.table["Job ID"]) == list(page.labels) == [str(4300000100 + i) for i in range(20)]
+    assert page.labels["4300000100"] == "4300000100 - AI Trainer"
+    assert job_page(data, page=9, page_size=50).page == 3
+
+
+def test_search_pages_through_matching_rows_only():
+    data = build_dashboard_data(jobs(120))
+
+    page = job_page(data, " PYTHON ", page=1, page_size=25)
+    assert (page.matches, page.pages) == (40, 2)
+    assert set(page.table["Job Name"]) == {"Python Developer"}
+    assert list(page.labels)[:2] == ["4300000000", "4300000003"]
+    assert job_page(data, "4300000119").labels == {"4300000119": "4300000119 - AI Trainer"}
+
+    empty = job_page(data, "closed")
+    assert (empty.matches, empty.pages, empty.labels) == (0, 1, {})
+    assert empty.table.empty
@@ -0,0 +1,36 @@
+from utils.job_store import JobStore
+from utils.refresh_schedule import plan_refresh
+
+GOOD = {
+    "jobId": "4300000001",
+    "job_name": "AI Trainer",
+    "job_status": "Active",
+    "views": 412,
+    "status": "extracted",
+    "extracted_at": "2026-10-16T08:00:00+00:00",
+}
+
+
+def test_failure_keeps_the_last_good_record(tmp_path):
+    with JobStore(tmp_path / "jobs.sqlite3") as store:
+        store.put(GOOD)
+        store.put_failure(
+            {"jobId": "4300000001", "status": "extraction_failed", "error": "page did not load"}
+        )
+
+        assert store.get("4300000001") == GOOD
+        [failure] = store.failures("4300000001")
+        assert (failure["status"], failure["error"]) == ("extraction_failed", "page did not load")
+
+
+def test_failure_of_a_new_job_is_stored_and_due_first(tmp_path):
+    with JobStore(tmp_path / "jobs.sqlite3") as store:
+        store.put(GOOD)
+        store.put_failure({"jobId": "4300000002", "status": "failed", "error": "timeout"})
+
+        assert store.get("4300000002")["status"] == "failed"
+        due, fresh = plan_refresh(
+            ["4300000001", "4300000002"], store.records(), max_age_hours=1e6
+        )
+        assert [job_id for job_id, _ in due] == ["4300000002"]
+        assert fresh == ["4300000001"]
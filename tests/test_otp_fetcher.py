@@ -0,0 +1,152 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils.otp_fetcher import OtpWaiter
+
+BANK = "VM-HDFCBK"
+OTHER = "+15550100"
+
+
+@pytest.fixture
+def chat_db(tmp_path):
+    """A Messages database with the ``handle`` and ``message`` columns the fetcher reads."""
+    path = tmp_path / "chat.db"
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE handle (ROWID INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT);
+        CREATE TABLE message (
+            ROWID INTEGER PRIMARY KEY AUTOINCREMENT,
+            handle_id INTEGER,
+            text TEXT,
+            date INTEGER
+        );
+        CREATE INDEX message_idx_handle ON message (handle_id);
+        """
+    )
+    conn.executemany("INSERT INTO handle (id) VALUES (?)", [(BANK,), (OTHER,)])
+    yield path, conn
+    conn.close()
+
+
+def send(conn, sender, text):
+    handle_id = conn.execute("SELECT ROWID FROM handle WHERE id = ?", (sender,)).fetchone()[0]
+    date = conn.execute("SELECT COALESCE(MAX(date), 0) + 1 FROM message").fetchone()[0]
+    conn.execute(
+        "INSERT INTO message (handle_id, text, date) VALUES (?, ?, ?)", (handle_id, text, date)
+    )
+
+
+def otp_text(otp, amount="INR 500.00"):
+    return f"{otp} is the OTP for your transaction of {amount} on your HDFC Bank card"
+
+
+async def send_later(conn, messages, delay=0.05):
+    await asyncio.sleep(delay)
+    for sender, text in messages:
+        send(conn, sender, text)
+
+
+def test_waiter_returns_the_otp_sent_after_expect(chat_db):
+    path, conn = chat_db
+    send(conn, BANK, otp_text("111111"))
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        request = await waiter.expect()
+        sender = asyncio.ensure_future(send_later(conn, [(BANK, otp_text("222222"))]))
+        otp = await waiter.wait(request, timeout=5)
+        await sender
+        return otp
+
+    assert asyncio.run(scenario()) == "222222"
+
+
+def test_concurrent_waiters_get_otps_in_fifo_order(chat_db):
+    path, conn = chat_db
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        first = await waiter.expect()
+        second = await waiter.expect()
+        sender = asyncio.ensure_future(
+            send_later(conn, [(BANK, otp_text("333333")), (BANK, otp_text("444444"))])
+        )
+        otps = await asyncio.gather(waiter.wait(second, timeout=5), waiter.wait(first, timeout=5))
+        await sender
+        return otps
+
+    assert asyncio.run(scenario()) == ["444444", "333333"]
+
+
+def test_match_text_routes_each_otp_to_its_own_request(chat_db):
+    path, conn = chat_db
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        small = await waiter.expect("INR 500.00")
+        large = await waiter.expect("INR 900.00")
+        sender = asyncio.ensure_future(
+            send_later(
+                conn,
+                [(BANK, otp_text("555555", "INR 900.00")), (BANK, otp_text("666666", "INR 500.00"))],
+            )
+        )
+        otps = await asyncio.gather(waiter.wait(small, timeout=5), waiter.wait(large, timeout=5))
+        await sender
+        return otps
+
+    assert asyncio.run(scenario()) == ["666666", "555555"]
+
+
+def test_otps_from_other_senders_are_ignored(chat_db):
+    path, conn = chat_db
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        request = await waiter.expect()
+        sender = asyncio.ensure_future(
+            send_later(conn, [(OTHER, otp_text("777777")), (BANK, otp_text("888888"))])
+        )
+        otp = await waiter.wait(request, timeout=5)
+        await sender
+        return otp
+
+    assert asyncio.run(scenario()) == "888888"
+
+
+def test_wait_times_out_without_a_new_otp(chat_db):
+    path, conn = chat_db
+    send(conn, BANK, otp_text("999999"))
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        request = await waiter.expect()
+        send(conn, OTHER, otp_text("123456"))
+        await waiter.wait(request, timeout=0.2)
+
+    with pytest.raises(RuntimeError, match="No OTP arrived"):
+        asyncio.run(scenario())
+
+
+def test_poll_error_fails_waiters_before_the_timeout(chat_db):
+    path, _ = chat_db
+
+    async def broken(after_rowid):
+        raise sqlite3.OperationalError("database disk image is malformed")
+
+    async def scenario():
+        waiter = OtpWaiter(str(path), poll_interval=0.01)
+        waiter.source.aotps_after = broken
+        requests = [await waiter.expect(), await waiter.expect()]
+        return await asyncio.wait_for(
+            asyncio.gather(*(waiter.wait(r, timeout=60) for r in requests), return_exceptions=True),
+            timeout=5,
+        )
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert "malformed" in str(errors[0])
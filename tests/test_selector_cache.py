@@ -0,0 +1,77 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils.selector_cache import SelectorStore
+
+
+def rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT key, value FROM selectors"))
+    finally:
+        conn.close()
+
+
+def test_flush_waiting_on_a_locked_database_does_not_block_lookups(tmp_path):
+    db_path = tmp_path / "selectors.sqlite3"
+    store = SelectorStore(db_path, flush_interval=3600)
+    store.set("extract", "a", {"selector": "#a"})
+
+    other = sqlite3.connect(db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    flusher = threading.Thread(target=store.flush)
+    flusher.start()
+    time.sleep(0.2)
+
+    started = time.monotonic()
+    assert store.get("extract", "a") == {"selector": "#a"}
+    store.set("extract", "b", {"selector": "#b"})
+    assert time.monotonic() - started < 0.5
+
+    other.execute("COMMIT")
+    other.close()
+    flusher.join(timeout=10)
+    store.flush()
+    assert set(rows(db_path)) == {"a", "b"}
+    store.close()
+
+
+def test_failed_flush_marks_its_rows_dirty_again(tmp_path):
+    db_path = tmp_path / "selectors.sqlite3"
+    store = SelectorStore(db_path, flush_interval=3600)
+    store.set("extract", "a", {"selector": "#a"})
+    broken = sqlite3.connect(":memory:")
+    broken.close()
+    store._writer = broken
+
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    store._writer = None
+    store.flush()
+    assert set(rows(db_path)) == {"a"}
+    store.close()
+
+
+def test_misses_read_sqlite_once_per_url_pattern(tmp_path):
+    db_path = tmp_path / "selectors.sqlite3"
+    reader = SelectorStore(db_path, flush_interval=3600)
+    reader.get("extract", "warm-up")
+    writer = SelectorStore(db_path, flush_interval=3600)
+    writer.set("observe", "click promote\x1f/hiring/jobs/*\x1fabc", {"selector": "#promote"})
+    writer.flush()
+
+    queries = []
+    reader._connect().set_trace_callback(queries.append)
+    assert reader.get("extract", "click promote\x1f/hiring/jobs/*\x1fabc") == {"selector": "#promote"}
+    assert sorted(namespace for namespace, _, _ in reader.scan("click promote\x1f/hiring/jobs/*\x1f")) == [
+        "extract",
+        "observe",
+    ]
+    for fingerprint in ("def", "ghi"):
+        assert reader.get("extract", f"click promote\x1f/hiring/jobs/*\x1f{fingerprint}") is None
+    assert len(queries) == 1
+    writer.close()
+    reader.close()
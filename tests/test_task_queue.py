@@ -0,0 +1,130 @@
+import asyncio
+
+from utils.task_queue import (
+    DONE,
+    FAILED,
+    PENDING,
+    RetryLater,
+    TaskQueue,
+    run_workers,
+    task_key,
+)
+
+
+def promotion_key(title, index, country):
+    return task_key("promotion", title, index, country)
+
+
+def enqueue_round(queue):
+    """What run_all_jobs.enqueue_batch queues for two titles without a named batch."""
+    added = 0
+    for title, index, country in (("A", 1, "US"), ("A", 2, "CA"), ("B", 1, "US")):
+        key = promotion_key(title, index, country)
+        added += queue.enqueue(key, "promotion", {"title": title})
+        added += queue.enqueue(
+            task_key("edit", title, index, country), "edit", {"country": country}, parent=key
+        )
+    return added
+
+
+def states(queue):
+    return dict(queue._conn.execute("SELECT key, state FROM tasks"))
+
+
+def test_rerun_after_failures_does_not_requeue_done_promotions(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    assert enqueue_round(queue) == 6
+    queue.complete(promotion_key("A", 1, "US"), {"jobId": "1"})
+    queue.complete(promotion_key("A", 2, "CA"), {"jobId": "2"})
+    queue.fail(promotion_key("B", 1, "US"), "card declined")
+
+    assert enqueue_round(queue) == 0
+    assert states(queue)[promotion_key("A", 1, "US")] == DONE
+    assert states(queue)[task_key("edit", "B", 1, "US")] == FAILED
+
+
+def test_crash_during_promotion_is_not_requeued_by_a_rerun(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    enqueue_round(queue)
+    for _ in range(3):
+        queue.claim("promotion")
+    queue.complete(promotion_key("A", 1, "US"), {"jobId": "1"})
+
+    assert queue.recover(retry_kinds=("edit",)) == 2
+    assert enqueue_round(queue) == 0
+    assert not queue.has_work("promotion")
+
+
+def test_pending_child_of_failed_parent_is_failed_not_waited_on(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    enqueue_round(queue)
+    queue.fail(promotion_key("B", 1, "US"), "card declined")
+    # Retrying only edits leaves their failed promotion behind
+    assert queue.retry_failed(kinds=("edit",)) == 1
+    assert states(queue)[task_key("edit", "B", 1, "US")] == PENDING
+
+    assert queue.claim("edit") is None
+    assert states(queue)[task_key("edit", "B", 1, "US")] == FAILED
+
+
+def test_workers_finish_when_only_orphans_remain(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    enqueue_round(queue)
+    queue.fail(promotion_key("B", 1, "US"), "card declined")
+    queue.retry_failed(kinds=("edit",))
+
+    async def promote(payload, _):
+        return {"jobId": payload["title"]}
+
+    async def edit(payload, parent):
+        return {"status": "updated"}
+
+    asyncio.run(
+        asyncio.wait_for(
+            run_workers(queue, {"promotion": promote, "edit": edit}, {}, poll_interval=0.01),
+            timeout=5,
+        )
+    )
+    assert not queue.has_work()
+    assert queue.counts()["edit"] == {DONE: 2, FAILED: 1}
+
+
+def test_deferred_task_waits_for_its_backoff_then_gives_up(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    queue.enqueue("edit", "edit", {})
+    assert queue.claim("edit")["key"] == "edit"
+    assert queue.defer("edit", "job_not_active", delay=60)
+    assert queue.claim("edit") is None
+    assert queue.has_work("edit")
+
+    assert queue.defer("edit", "job_not_active", delay=0) is True
+    assert queue.claim("edit")["key"] == "edit"
+    assert queue.defer("edit", "job_not_active", delay=0, max_attempts=2) is False
+    assert states(queue)["edit"] == FAILED
+
+
+def test_edit_on_a_posting_in_review_is_retried_until_updated(tmp_path):
+    queue = TaskQueue(tmp_path / "queue.sqlite3")
+    queue.enqueue("promotion", "promotion", {})
+    queue.enqueue("edit", "edit", {}, parent="promotion")
+    job_states = iter(["In review", "In review", "Active"])
+
+    async def promote(payload, _):
+        return {"jobId": "1"}
+
+    async def edit(payload, parent):
+        if next(job_states) != "Active":
+            return RetryLater("job_not_active")
+        return {"status": "updated"}
+
+    # Retry at once instead of after the default backoff
+    original_defer = queue.defer
+    queue.defer = lambda key, reason: original_defer(key, reason, delay=0)
+    asyncio.run(
+        asyncio.wait_for(
+            run_workers(queue, {"promotion": promote, "edit": edit}, {}, poll_interval=0.01),
+            timeout=5,
+        )
+    )
+    assert states(queue)["edit"] == DONE
+    assert queue._conn.execute("SELECT attempts FROM tasks WHERE key = 'edit'").fetchone() == (3,)
@@ -0,0 +1,201 @@
+"""Read job analytics from LinkedIn's own JSON API responses.
+
+The job detail page fills in its header and analytics from background
+``/voyager/api/`` calls. Listening for those responses gets the numbers as
+soon as the payload arrives, without waiting for rendering or reading text
+back. Payload shapes vary between endpoints, so fields are found by key
+anywhere in the JSON; see ``FIELD_KEYS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+from utils.job_analytics import FIELDS, validate_fields
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+API_URL_MARKERS = ("/voyager/api/",)
+API_CAPTURE_TIMEOUT_MS = 8000
+# Payload keys per field, in order of preference. ``listed_at`` becomes
+# ``posted_when``.
+FIELD_KEYS = {
+    "job_name": ("jobTitle", "title"),
+    "location": ("formattedLocation", "locationName", "location"),
+    "job_status": ("jobState", "jobPostingState", "state"),
+    "listed_at": ("listedAt", "originalListedAt", "createdAt"),
+    "views": ("viewCount", "views", "totalViews"),
+    "apply_clicks": ("applyClickCount", "applyClicks", "applies"),
+    "amount_spent": ("amountSpent", "totalSpent", "lifetimeSpend", "spend"),
+}
+# Header fields only count when they sit on the job posting object itself,
+# not on a company, member or page object in the same payload.
+JOB_OBJECT_KEYS = {"jobState", "jobPostingState", "listedAt", "originalListedAt"}
+HEADER_FIELDS = {"job_name", "location", "job_status", "listed_at"}
+URN_KEYS = ("entityUrn", "dashEntityUrn", "jobPostingUrn", "*jobPosting")
+JOB_STATES = {
+    "LISTED": "Active",
+    "ACTIVE": "Active",
+    "REVIEW": "In review",
+    "UNDER_REVIEW": "In review",
+    "PENDING_REVIEW": "In review",
+    "CLOSED": "Closed",
+    "SUSPENDED": "Paused",
+    "DRAFT": "Draft",
+}
+AGE_UNITS = (
+    (365 * 86400, "year"),
+    (30 * 86400, "month"),
+    (7 * 86400, "week"),
+    (86400, "day"),
+    (3600, "hour"),
+    (60, "minute"),
+)
+
+
+def posted_when_from_epoch_ms(listed_at: Any, now: float | None = None) -> str | None:
+    """Render ``listedAt`` (epoch ms) the way the page does: ``'Posted 6 hours ago'``."""
+    try:
+        age = (now or time.time()) - float(listed_at) / 1000
+    except (TypeError, ValueError):
+        return None
+    for seconds, unit in AGE_UNITS:
+        if age >= seconds:
+            count = int(age // seconds)
+            return f"Posted {count} {unit}{'s' if count != 1 else ''} ago"
+    return "Posted just now"
+
+
+def _scalar(value: Any) -> Any:
+    """Unwrap ``{"text": ...}`` view models and ``{"amount": ...}`` money objects."""
+    if isinstance(value, dict):
+        for key in ("text", "amount", "value"):
+            if key in value:
+                return _scalar(value[key])
+        return None
+    return value
+
+
+def _other_job(node: dict[str, Any], job_id: str) -> bool:
+    urns = [node.get(key) for key in URN_KEYS]
+    urns = [urn for urn in urns if isinstance(urn, str) and "jobPosting" in urn]
+    return bool(urns) and not any(job_id in urn for urn in urns)
+
+
+def fields_from_payload(payload: Any, job_id: str) -> dict[str, Any]:
+    """Collect the first value for each field found anywhere in ``payload``."""
+    found: dict[str, Any] = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        stack.extend(reversed(list(node.values())))
+        if _other_job(node, job_id):
+            continue
+        is_job_object = bool(JOB_OBJECT_KEYS & node.keys())
+        for field, keys in FIELD_KEYS.items():
+            if field in found or (field in HEADER_FIELDS and not is_job_object):
+                continue
+            for key in keys:
+                value = _scalar(node.get(key))
+                if value not in (None, ""):
+                    found[field] = value
+                    break
+    return found
+
+
+def to_schema_fields(raw: dict[str, Any]) -> dict[str, Any]:
+    """Map raw payload values onto the ``JobExtractSchema`` field names."""
+    fields = {key: value for key, value in raw.items() if key != "listed_at"}
+    if "listed_at" in raw:
+        fields["posted_when"] = posted_when_from_epoch_ms(raw["listed_at"])
+    if "job_status" in fields:
+        state = str(fields["job_status"])
+        fields["job_status"] = JOB_STATES.get(state.upper(), state)
+    for field in ("amount_spent", "views", "apply_clicks"):
+        if field in fields:
+            try:
+                fields[field] = float(str(fields[field]).replace(",", ""))
+            except ValueError:
+                fields.pop(field)
+    return fields
+
+
+class JobApiCapture:
+    """Merge job fields out of every API response the page receives."""
+
+    def __init__(self, job_id: str, url_markers: tuple[str, ...] = API_URL_MARKERS) -> None:
+        self.job_id = job_id
+        self.url_markers = url_markers
+        self.raw: dict[str, Any] = {}
+        self.payloads = 0
+        self._complete = asyncio.Event()
+
+    @property
+    def fields(self) -> dict[str, Any]:
+        return to_schema_fields(self.raw)
+
+    async def on_response(self, response: Any) -> None:
+        if not any(marker in response.url for marker in self.url_markers):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        self.payloads += 1
+        for field, value in fields_from_payload(payload, self.job_id).items():
+            self.raw.setdefault(field, value)
+        if all(self.fields.get(field) not in (None, "") for field in FIELDS):
+            self._complete.set()
+
+    async def wait(self, timeout_ms: int = API_CAPTURE_TIMEOUT_MS) -> dict[str, Any]:
+        """Return the fields as soon as all are captured, or what arrived by the timeout."""
+        try:
+            await asyncio.wait_for(self._complete.wait(), timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            print(
+                f"API capture timed out after {self.payloads} payloads; "
+                f"got {sorted(self.fields)}"
+            )
+        return self.fields
+
+
+@asynccontextmanager
+async def captured_job_api(page: Any, job_id: str) -> AsyncIterator[JobApiCapture]:
+    """Listen for API responses on ``page`` for the duration of the block."""
+    raw_page = getattr(page, "_page", page)
+    capture = JobApiCapture(job_id)
+    raw_page.on("response", capture.on_response)
+    try:
+        yield capture
+    finally:
+        raw_page.remove_listener("response", capture.on_response)
+
+
+async def capture_job_api(
+    page: Any,
+    job_url: str,
+    job_id: str,
+    schema: type[BaseModel],
+    timeout_ms: int = API_CAPTURE_TIMEOUT_MS,
+) -> BaseModel | None:
+    """Navigate to ``job_url`` and build ``schema`` from its API responses.
+
+    Returns as soon as every field has arrived, without waiting for the page
+    to finish loading. Returns ``None`` if the payloads did not cover the
+    schema; the page is then still loading ``job_url`` for other extractors.
+    """
+    async with captured_job_api(page, job_id) as capture:
+        await page._page.goto(job_url, wait_until="commit")
+        fields = await capture.wait(timeout_ms)
+    return validate_fields(fields, schema)
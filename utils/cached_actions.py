@@ -0,0 +1,331 @@
+"""Observe/act helpers backed by the shared selector cache."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from utils.page_waits import wait_for_element
+from utils.selector_cache import LOCATOR_PRIORITY, SelectorCache, page_signature
+from utils.stagehand_observe import XPATHS_FOR_NODES_JS, install_observe_handler
+
+LIVENESS_PROBE_TIMEOUT_MS = 1500
+
+# Alternative locators for an element: a short CSS selector from stable
+# attributes, a Playwright role selector and a text selector.
+ALTERNATE_LOCATORS_JS = r"""
+(el) => {
+  const quote = (value) => '"' + value.replace(/\\/g, '\\\\').replace(/"/g, '\\"') + '"';
+  const tag = el.tagName.toLowerCase();
+  const text = (el.innerText || '').trim().replace(/\s+/g, ' ');
+  const label = el.getAttribute('aria-label') || el.getAttribute('placeholder') || '';
+  const found = [];
+  if (el.id && !/\d/.test(el.id)) {
+    found.push({ kind: 'css', selector: '#' + CSS.escape(el.id) });
+  } else {
+    for (const attr of ['data-test-id', 'data-control-name', 'name', 'aria-label', 'placeholder']) {
+      const value = el.getAttribute(attr);
+      if (value && !/\d{4,}/.test(value)) {
+        found.push({ kind: 'css', selector: tag + '[' + attr + '=' + quote(value) + ']' });
+        break;
+      }
+    }
+  }
+  const implicitRoles = { button: 'button', a: 'link', textarea: 'textbox', select: 'combobox' };
+  let role = el.getAttribute('role') || implicitRoles[tag];
+  if (!role && tag === 'input') {
+    role = { checkbox: 'checkbox', radio: 'radio', submit: 'button', button: 'button' }[el.type] || 'textbox';
+  }
+  const name = label || (text.length <= 60 ? text : '');
+  if (role && name) found.push({ kind: 'role', selector: 'role=' + role + '[name=' + quote(name) + ']' });
+  if (text && text.length <= 60 && !['input', 'textarea'].includes(tag)) {
+    found.push({ kind: 'text', selector: 'text=' + quote(text) });
+  }
+  return found;
+}
+"""
+
+
+@dataclass
+class ResolvedAction:
+    """An action ready to run, and where it came from in the cache."""
+
+    action: dict[str, Any]
+    key: str | None = None
+    locator: str | None = None
+
+
+async def same_element(page, selector: str, target: Any) -> bool:
+    """True if ``selector`` matches exactly one element, and it is ``target``."""
+    try:
+        locator = page._page.locator(selector)
+        if await locator.count() != 1:
+            return False
+        return await locator.evaluate("(el, target) => el === target", target)
+    except Exception:
+        return False
+
+
+async def build_locator_chain(page, results: list[Any]) -> list[dict[str, Any]]:
+    """Derive alternative locators for the first observe result.
+
+    Only alternates that match exactly one element on the current page, the
+    element the first result points at, are kept. The other observe results
+    are other elements and are not stored.
+    """
+    action = observe_result_to_dict(results[0]) if results else {}
+    selector = action.get("selector")
+    if not selector:
+        return []
+    chain = [{"kind": "xpath", "selector": selector}]
+    target = None
+    try:
+        target = await page._page.locator(selector).first.element_handle()
+        alternates = await target.evaluate(ALTERNATE_LOCATORS_JS)
+        for alternate in alternates:
+            if await same_element(page, alternate["selector"], target):
+                chain.append(alternate)
+    except Exception as error:
+        print("Unable to derive alternate locators:", error)
+    finally:
+        if target is not None:
+            await target.dispose()
+    return chain
+
+
+async def current_xpath(page, selector: str) -> str | None:
+    """Return the absolute XPath of the first element ``selector`` matches."""
+    if selector.startswith("xpath="):
+        return selector
+    for frame in page._page.frames:
+        try:
+            locator = frame.locator(selector).first
+            if await locator.count():
+                xpath = await locator.evaluate(f"(el) => ({XPATHS_FOR_NODES_JS})(el)[0]")
+                return f"xpath={xpath}" if xpath else None
+        except Exception:
+            continue
+    return None
+
+
+async def probe_locator(page, selector: str) -> str | None:
+    """One look for ``selector`` in every frame: ``"visible"``, ``"hidden"`` or ``None``."""
+    found = None
+    for frame in page._page.frames:
+        try:
+            locator = frame.locator(selector).first
+            if not await locator.count():
+                continue
+            if await locator.is_visible():
+                return "visible"
+            found = "hidden"
+        except Exception:
+            continue
+    return found
+
+
+async def resolve_locator_chain(
+    page, locators: list[dict[str, Any]], timeout_ms: int = LIVENESS_PROBE_TIMEOUT_MS
+) -> tuple[str | None, list[str]]:
+    """Walk ``locators`` in rank order until one finds a visible element.
+
+    Each locator is probed once. A locator that matches nothing is stale
+    and is skipped at once; only the first one that matches an element not
+    yet visible is given up to ``timeout_ms`` to show it.
+
+    Returns the winning selector (or ``None``) and the selectors that were
+    ranked above it but found nothing.
+    """
+    # Chains cached before may still hold "candidate" locators, the other
+    # observe results; those find other elements
+    selectors = [
+        loc["selector"]
+        for loc in locators
+        if loc.get("selector") and loc.get("kind") in LOCATOR_PRIORITY
+    ]
+    missed: list[str] = []
+    waited = False
+    for selector in selectors:
+        state = await probe_locator(page, selector)
+        if state == "visible":
+            return selector, missed
+        if state == "hidden" and not waited:
+            waited = True
+            if await wait_for_element(page, selector, timeout_ms=timeout_ms):
+                return selector, missed
+        missed.append(selector)
+    return None, missed
+
+
+async def observe_with_iframes(page, instruction: str):
+    """Run observe with iframe support enabled."""
+    last_error: Exception | None = None
+    for _ in range(3):
+        try:
+            return await page.observe(instruction=instruction, iframes=True)
+        except Exception as error:
+            print("Action failed:", error)
+            last_error = error
+    raise last_error or RuntimeError("Observe failed after 3 attempts")
+
+
+def observe_result_to_dict(result: Any) -> dict[str, Any]:
+    if hasattr(result, "model_dump"):
+        return result.model_dump()
+    return getattr(result, "__dict__", {"selector": getattr(result, "selector", None)})
+
+
+async def get_cached_action(
+    page,
+    cache: SelectorCache,
+    instruction: str,
+    use_cache: bool = True,
+    refresh: bool = False,
+) -> ResolvedAction:
+    """Resolve ``instruction`` to an action on the current page.
+
+    Each cached candidate's locator chain is walked locally, cheapest stable
+    locator first, and the first one that finds a visible element wins; its
+    element's current absolute XPath becomes the action selector. Only when
+    no chain resolves (see ``resolve_locator_chain``) does this fall back to
+    an LLM observe, which is cached with a freshly derived chain.
+    ``refresh`` skips the lookup but still caches the fresh observation.
+    """
+    page_pattern, fingerprint = "", ""
+    if use_cache:
+        page_pattern, fingerprint = await page_signature(page)
+    if use_cache and not refresh:
+        for key, entry in cache.candidates(instruction, page_pattern, fingerprint):
+            winner, missed = await resolve_locator_chain(page, entry.get("locators") or [])
+            cache.record_locator_failures(key, missed)
+            xpath = await current_xpath(page, winner) if winner else None
+            if xpath:
+                action = {**entry["action"], "selector": xpath}
+                print(f"{instruction} (cache hit via {winner})", action)
+                return ResolvedAction(action, key, winner)
+            print(f"{instruction} (stale cache entry)", entry["action"].get("selector"))
+            cache.record_failure(key)
+
+    results = await observe_with_iframes(page, instruction)
+    print(instruction, results)
+    if not results:
+        raise RuntimeError(f"No elements found for instruction: {instruction}")
+
+    action_dict = observe_result_to_dict(results[0])
+    if not use_cache:
+        return ResolvedAction(action_dict)
+    locators = await build_locator_chain(page, results)
+    key = cache.put(instruction, page_pattern, fingerprint, action_dict, locators)
+    return ResolvedAction(action_dict, key, action_dict.get("selector"))
+
+
+async def prefetch_actions(
+    page, cache: SelectorCache, instructions: list[str]
+) -> None:
+    """Warm the cache for every instruction that targets the current page.
+
+    Instructions that already have a live cached element are skipped; the
+    rest are resolved together with one snapshot and one LLM call, and
+    cached in a single write. Anything the batch could not resolve is left
+    for ``get_cached_action`` to observe on its own.
+    """
+    page_pattern, fingerprint = await page_signature(page)
+    pending = []
+    for instruction in instructions:
+        for _, entry in cache.candidates(instruction, page_pattern, fingerprint):
+            winner, _ = await resolve_locator_chain(
+                page, entry.get("locators") or [], timeout_ms=0
+            )
+            if winner:
+                break
+        else:
+            pending.append(instruction)
+    if not pending:
+        return
+
+    try:
+        results = await install_observe_handler(page).observe_many(pending)
+    except Exception as error:
+        print("Batched observe failed, falling back to single observes:", error)
+        return
+    print(f"Batched observe for {len(pending)} instructions", results)
+    actions = {}
+    locators = {}
+    for instruction, result in zip(pending, results):
+        if result is None:
+            continue
+        actions[instruction] = observe_result_to_dict(result)
+        locators[instruction] = await build_locator_chain(page, [result])
+    if actions:
+        cache.put_many(page_pattern, fingerprint, actions, locators)
+
+
+def action_to_payload(action: Any) -> dict[str, Any]:
+    if hasattr(action, "model_dump"):
+        payload = action.model_dump()
+    elif isinstance(action, dict):
+        payload = dict(action)
+    elif hasattr(action, "__dict__"):
+        payload = {k: v for k, v in vars(action).items() if not k.startswith("_")}
+    else:
+        raise TypeError("Unsupported action type")
+    payload["iframes"] = True
+    return payload
+
+
+async def run_cached_action(
+    page,
+    cache: SelectorCache,
+    instruction: str,
+    use_cache: bool = True,
+    timeout_ms: int | None = None,
+) -> None:
+    act_kwargs = {"timeout_ms": timeout_ms} if timeout_ms else {}
+    last_error: Exception | None = None
+    for attempt in range(3):
+        resolved = await get_cached_action(
+            page, cache, instruction, use_cache=use_cache, refresh=attempt > 0
+        )
+        payload = action_to_payload(resolved.action)
+        try:
+            await page.act(payload, **act_kwargs)
+            if resolved.key:
+                cache.record_success(resolved.key, resolved.locator)
+            return
+        except Exception as error:
+            print("Action failed:", error)
+            if resolved.key:
+                cache.record_failure(resolved.key)
+            last_error = error
+    raise last_error or RuntimeError(
+        f"Action '{instruction}' failed after 3 attempts"
+    )
+
+
+async def observe_and_fill(
+    page, cache: SelectorCache, instruction: str, value: str
+) -> None:
+    """Locate an element via observe and fill it with the provided value."""
+    last_error: Exception | None = None
+    for attempt in range(3):
+        resolved = await get_cached_action(
+            page, cache, instruction, refresh=attempt > 0
+        )
+        selector = resolved.action.get("selector")
+        if not selector:
+            raise RuntimeError(
+                f"No selector available for instruction: {instruction}"
+            )
+        try:
+            await page._page.fill(selector, "" if value is None else str(value))
+            if resolved.key:
+                cache.record_success(resolved.key, resolved.locator)
+            return
+        except Exception as error:
+            print("Action failed:", error)
+            if resolved.key:
+                cache.record_failure(resolved.key)
+            last_error = error
+    raise last_error or RuntimeError(
+        f"Fill for '{instruction}' failed after 3 attempts"
+    )
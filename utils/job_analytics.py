@@ -0,0 +1,359 @@
+"""Rule-based reader for the analytics fields on a LinkedIn job detail page.
+
+The fields the extract workflow needs (title, location, status, posting time,
+amount spent, views and apply clicks) sit in fixed places on the page, so
+they are read straight from the DOM. Selectors that worked before are read
+first, in one round trip. Any field still missing is parsed from the page's
+visible text. ``read_job_fields`` returns ``None`` unless the result passes
+the caller's schema, so the caller's LLM extract remains the fallback.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import TYPE_CHECKING, Any
+
+from utils.page_waits import wait_until
+from utils.selector_cache import SelectorCache, page_signature
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+FIELD_INSTRUCTION_PREFIX = "read job field: "
+TEXT_FIELDS = ("job_name", "location", "job_status", "posted_when")
+NUMBER_FIELDS = ("amount_spent", "views", "apply_clicks")
+FIELDS = TEXT_FIELDS + NUMBER_FIELDS
+METRIC_LABELS = {
+    "views": {"views", "view", "total views"},
+    "apply_clicks": {"apply clicks", "apply click", "total apply clicks"},
+    "amount_spent": {"amount spent", "spent", "total spent", "total amount spent"},
+}
+NUMBER_RE = re.compile(r"(?<![\w.])(\d[\d,]*(?:\.\d+)?)\s*([kmb])?(?![a-z])", re.IGNORECASE)
+CURRENCY_RE = re.compile(r"[₹$€£]|\b(?:inr|usd|rs\.?)(?=\s|\d|$)", re.IGNORECASE)
+NUMBER_ONLY_RE = re.compile(
+    r"^\s*(?:[₹$€£]|inr|usd|rs\.?)?\s*\d[\d,]*(?:\.\d+)?\s*[kmb]?\s*$", re.IGNORECASE
+)
+STATUS_RE = re.compile(r"^(active|in review|closed|paused|draft)$", re.IGNORECASE)
+POSTED_RE = re.compile(
+    r"\b(?:re)?posted\s+(?:on\s+)?(?:\d+\s*\w+\s+ago|just now|today|yesterday)",
+    re.IGNORECASE,
+)
+RELATIVE_TIME_RE = re.compile(r"\b\d+\s*\w+\s+ago\b|\bjust now\b", re.IGNORECASE)
+LOCATION_RE = re.compile(r"\((?:remote|on-site|onsite|hybrid)\)", re.IGNORECASE)
+MULTIPLIERS = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+# Heading plus the visible text of the main region, one trimmed line each.
+PAGE_TEXT_JS = """
+() => {
+  const root = document.querySelector('main') || document.body;
+  const heading = root.querySelector('h1') || document.querySelector('h1');
+  return {
+    title: heading ? heading.innerText.trim() : '',
+    lines: root.innerText.split('\\n').map((line) => line.trim()).filter(Boolean),
+  };
+}
+"""
+
+# For each selector, the element's text and the lines of its nearest
+# ancestor that shows more than the element does (where a label would sit).
+READ_SELECTORS_JS = """
+(selectors) => selectors.map((selector) => {
+  try {
+    const el = document.querySelector(selector);
+    if (!el) return null;
+    const text = el.innerText.trim();
+    let context = el;
+    for (let depth = 0; depth < 3 && context.parentElement; depth += 1) {
+      context = context.parentElement;
+      if (context.innerText.trim() !== text) break;
+    }
+    const lines = context.innerText.split('\\n').map((line) => line.trim()).filter(Boolean);
+    return { text, lines };
+  } catch (error) {
+    return null;
+  }
+})
+"""
+
+# For each field, the smallest element whose text is the given line, as a
+# CSS path anchored at the nearest stable id.
+LOCATE_TEXTS_JS = r"""
+(texts) => {
+  const cssPath = (el) => {
+    const parts = [];
+    for (; el && el.nodeType === 1 && el !== document.body; el = el.parentElement) {
+      if (el.id && !/\d/.test(el.id)) {
+        parts.unshift('#' + CSS.escape(el.id));
+        return parts.join(' > ');
+      }
+      let index = 1;
+      for (let sib = el.previousElementSibling; sib; sib = sib.previousElementSibling) {
+        if (sib.tagName === el.tagName) index += 1;
+      }
+      parts.unshift(el.tagName.toLowerCase() + ':nth-of-type(' + index + ')');
+    }
+    return ['body', ...parts].join(' > ');
+  };
+  const root = document.querySelector('main') || document.body;
+  const elements = Array.from(root.querySelectorAll('*')).reverse();
+  const found = {};
+  for (const [field, text] of Object.entries(texts)) {
+    const match = elements.find((el) => (el.innerText || '').trim() === text);
+    if (match) found[field] = cssPath(match);
+  }
+  return found;
+}
+"""
+
+
+def parse_number(text: str | None) -> float | None:
+    """Parse ``'₹1,234.50'``, ``'1.2K'`` or ``'44 views'`` to a number."""
+    if not text:
+        return None
+    match = NUMBER_RE.search(CURRENCY_RE.sub(" ", text))
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    return value * MULTIPLIERS.get(suffix, 1)
+
+
+def parse_posted(text: str | None) -> str | None:
+    match = POSTED_RE.search(text or "")
+    return match.group(0) if match else None
+
+
+def parse_status(text: str | None) -> str | None:
+    match = STATUS_RE.match((text or "").strip())
+    return match.group(0) if match else None
+
+
+def parse_location(text: str | None) -> str | None:
+    """Pick the ``'United States (Remote)'`` part out of a header line."""
+    for part in re.split(r"\s+[·•|]\s+", text or ""):
+        if LOCATION_RE.search(part):
+            return part.strip()
+    return None
+
+
+PARSERS = {
+    "job_name": lambda text: (text or "").strip() or None,
+    "location": parse_location,
+    "job_status": parse_status,
+    "posted_when": parse_posted,
+    "amount_spent": parse_number,
+    "views": parse_number,
+    "apply_clicks": parse_number,
+}
+
+
+def _metric_from_lines(lines: list[str], labels: set[str]) -> tuple[float, str] | None:
+    """Find a labelled number, inline (``'44 views'``) or on a neighbouring line."""
+    for index, line in enumerate(lines):
+        label = NUMBER_RE.sub("", CURRENCY_RE.sub("", line)).strip(" :·-").lower()
+        if label not in labels:
+            continue
+        if label != line.strip().lower():
+            value = parse_number(line)
+            if value is not None:
+                return value, line
+        for neighbour in (index + 1, index - 1):
+            if 0 <= neighbour < len(lines) and NUMBER_ONLY_RE.match(lines[neighbour]):
+                return parse_number(lines[neighbour]), lines[neighbour]
+    return None
+
+
+def parse_page_text(title: str, lines: list[str]) -> tuple[dict[str, Any], dict[str, str]]:
+    """Parse fields from the page text; returns values and the line each came from."""
+    values: dict[str, Any] = {}
+    sources: dict[str, str] = {}
+
+    def keep(field: str, value: Any, line: str) -> None:
+        if value is not None and field not in values:
+            values[field] = value
+            sources[field] = line
+
+    keep("job_name", title or None, title)
+    for line in lines:
+        keep("job_status", parse_status(line), line)
+        keep("posted_when", parse_posted(line), line)
+        keep("location", parse_location(line), line)
+    for field, labels in METRIC_LABELS.items():
+        found = _metric_from_lines(lines, labels)
+        if found:
+            keep(field, *found)
+    return values, sources
+
+
+def labelled_number(field: str, text: str | None, lines: list[str]) -> float | None:
+    """``text`` parsed as ``field``, if its label sits with it in ``lines``.
+
+    Cached number selectors are positional, so on a page laid out
+    differently they can land on another metric's number. The value is
+    only accepted when the field's own label is next to that same number.
+    """
+    value = parse_number(text)
+    found = _metric_from_lines(lines, METRIC_LABELS[field])
+    return value if found is not None and found[0] == value else None
+
+
+def content_hash(lines: list[str]) -> str:
+    """Hash the page text, ignoring relative times that change by the hour.
+
+    ``lines`` is all of ``main`` (see ``PAGE_TEXT_JS``), not just the
+    analytics card, so a change anywhere on the job page counts as a change.
+    """
+    normalized = "\n".join(
+        " ".join(RELATIVE_TIME_RE.sub("", line).split()) for line in lines
+    )
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+async def wait_for_job_fields(page, timeout_ms: int = 5000) -> bool:
+    """Wait until every analytics field can be parsed from the page text."""
+
+    async def rendered() -> bool:
+        page_text = await page._page.evaluate(PAGE_TEXT_JS)
+        values, _ = parse_page_text(page_text["title"], page_text["lines"])
+        return len(values) == len(FIELDS)
+
+    return await wait_until(rendered, timeout_ms)
+
+
+async def page_content_hash(page) -> tuple[str, str | None]:
+    """Return the content hash of the job page and its current posting time."""
+    page_text = await page._page.evaluate(PAGE_TEXT_JS)
+    lines = page_text["lines"]
+    posted = next((parse_posted(line) for line in lines if parse_posted(line)), None)
+    return content_hash(lines), posted
+
+
+def validate_fields(fields: dict[str, Any], schema: type[BaseModel]) -> BaseModel | None:
+    """Return ``schema`` built from ``fields``, or ``None`` if anything is off."""
+    missing = [field for field in FIELDS if fields.get(field) in (None, "")]
+    if missing:
+        print(f"Extraction missing fields: {', '.join(missing)}")
+        return None
+    if not parse_status(fields["job_status"]) or not parse_posted(fields["posted_when"]):
+        print(f"Extraction read unexpected values: {fields}")
+        return None
+    try:
+        return schema.model_validate(
+            {
+                **fields,
+                "views": int(round(fields["views"])),
+                "apply_clicks": int(round(fields["apply_clicks"])),
+            }
+        )
+    # pydantic's ValidationError is a ValueError
+    except (TypeError, ValueError) as error:
+        print(f"Extraction failed validation: {error}")
+        return None
+
+
+async def read_job_fields(
+    page, cache: SelectorCache, schema: type[BaseModel]
+) -> BaseModel | None:
+    """Read the job analytics fields without an LLM call.
+
+    Cached field selectors are tried first; a cached number only counts if
+    its label is beside it (``labelled_number``). Fields they miss are
+    parsed from the page text, and the elements those fields came from are
+    cached for the next job. Returns ``None`` when the result does not
+    validate.
+    """
+    raw_page = page._page
+    page_pattern, fingerprint = await page_signature(page)
+    cached: dict[str, tuple[str, str]] = {}
+    for field in FIELDS:
+        for key, entry in cache.candidates(
+            FIELD_INSTRUCTION_PREFIX + field, page_pattern, fingerprint
+        ):
+            selector = entry["action"].get("selector")
+            if selector:
+                cached[field] = (key, selector)
+                break
+
+    fields: dict[str, Any] = {}
+    if cached:
+        reads = await raw_page.evaluate(
+            READ_SELECTORS_JS, [selector for _, selector in cached.values()]
+        )
+        for (field, (key, _)), read in zip(cached.items(), reads):
+            if read is None:
+                value = None
+            elif field in NUMBER_FIELDS:
+                value = labelled_number(field, read["text"], read["lines"])
+            else:
+                value = PARSERS[field](read["text"])
+            if value is None:
+                cache.record_failure(key)
+            else:
+                fields[field] = value
+
+    if len(fields) < len(FIELDS):
+        page_text = await raw_page.evaluate(PAGE_TEXT_JS)
+        parsed, sources = parse_page_text(page_text["title"], page_text["lines"])
+        learned = {field: sources[field] for field in parsed if field not in fields}
+        fields = {**parsed, **fields}
+        await learn_field_selectors(page, cache, learned, page_pattern, fingerprint)
+
+    result = validate_fields(fields, schema)
+    if result is not None:
+        for field, (key, _) in cached.items():
+            if field in fields:
+                cache.record_success(key)
+    return result
+
+
+async def learn_field_selectors(
+    page,
+    cache: SelectorCache,
+    texts: dict[str, str],
+    page_pattern: str | None = None,
+    fingerprint: str | None = None,
+) -> None:
+    """Cache a selector for each field whose element shows exactly ``texts[field]``."""
+    texts = {field: text for field, text in texts.items() if text}
+    if not texts:
+        return
+    if page_pattern is None or fingerprint is None:
+        page_pattern, fingerprint = await page_signature(page)
+    try:
+        selectors = await page._page.evaluate(LOCATE_TEXTS_JS, texts)
+    except Exception as error:
+        print("Unable to locate job fields in the DOM:", error)
+        return
+    if not selectors:
+        return
+    instructions = {FIELD_INSTRUCTION_PREFIX + field: selector for field, selector in selectors.items()}
+    cache.put_many(
+        page_pattern,
+        fingerprint,
+        {
+            instruction: {"selector": selector, "method": "read", "description": instruction}
+            for instruction, selector in instructions.items()
+        },
+        {
+            instruction: [{"kind": "css", "selector": selector}]
+            for instruction, selector in instructions.items()
+        },
+    )
+
+
+def llm_field_texts(extracted: Any) -> dict[str, str]:
+    """Display strings to look for after an LLM extract, for ``learn_field_selectors``.
+
+    Numbers are only learnable when the page shows them plainly, so integer
+    counts are matched as-is and amounts are skipped. A bare ``'2 days ago'``
+    would not re-parse as a posting time, so it is skipped too.
+    """
+    texts = {field: str(getattr(extracted, field, "") or "") for field in TEXT_FIELDS}
+    if not parse_posted(texts["posted_when"]):
+        texts.pop("posted_when")
+    for field in ("views", "apply_clicks"):
+        value = getattr(extracted, field, None)
+        if value is not None:
+            texts[field] = str(int(value))
+    return texts
@@ -0,0 +1,172 @@
+"""Vectorised table, totals and lookup for the job posts dashboard.
+
+``build_dashboard_data`` turns the loaded jobs into one typed DataFrame
+indexed by ``jobId``, plus the display table, summary totals and
+selectbox labels. Every step is a column operation, and it runs once per
+change to the data. A Streamlit rerun that reuses the result only reads it,
+and ``job_details`` is a single index lookup.
+
+The dashboard shows one page of ``job_page`` at a time, so the table and
+the selectbox it sends to the browser stay at ``PAGE_SIZE`` rows however
+many jobs there are. A search scans every row once; the matches of the
+last ``SEARCH_CACHE_SIZE`` searches are kept with the data.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# Display order: URLs last, LinkedIn URL before the apply URL
+DISPLAY_COLUMNS = [
+    "jobId", "job_name", "original_job_title", "location", "job_status",
+    "posted_when", "amount_spent", "views", "apply_clicks", "jobDetailUrl", "apply_url",
+]
+COLUMN_LABELS = {
+    "jobId": "Job ID",
+    "job_name": "Job Name",
+    "original_job_title": "Original Title",
+    "location": "Location",
+    "job_status": "Status",
+    "posted_when": "Posted",
+    "amount_spent": "Amount Spent",
+    "views": "Views",
+    "apply_clicks": "Apply Clicks",
+    "jobDetailUrl": "LinkedIn URL",
+    "apply_url": "Apply Url",
+}
+# LinkColumn shows the text after '#'
+LINK_TEXTS = {"jobDetailUrl": "LinkedIn Job", "apply_url": "Apply Url"}
+NUMBER_COLUMNS = {"amount_spent": "float64", "views": "Int64", "apply_clicks": "Int64"}
+SEARCH_COLUMNS = ["jobId", "job_name", "original_job_title", "location", "job_status"]
+PAGE_SIZE = 50
+SEARCH_CACHE_SIZE = 16
+
+
+@dataclass(frozen=True)
+class DashboardData:
+    """Everything a rerun needs; treat the frames as read-only."""
+
+    jobs: pd.DataFrame
+    table: pd.DataFrame
+    metrics: dict[str, float]
+    # jobId -> selectbox label, '<jobId> - <job name>'
+    labels: dict[str, str]
+    # Lower-cased search query -> table positions of the matching rows
+    search: Callable[[str], np.ndarray]
+
+
+@dataclass(frozen=True)
+class JobPage:
+    """One page of the table, and the selectbox labels of its jobs."""
+
+    table: pd.DataFrame
+    labels: dict[str, str]
+    # Rows matching the search, and the 0-based position of the first one shown
+    matches: int
+    start: int
+    page: int
+    pages: int
+
+
+def prepare_jobs(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed numbers and a unique ``jobId`` index (the last record per id wins)."""
+    if "jobId" not in df.columns:
+        return pd.DataFrame(columns=DISPLAY_COLUMNS).set_index("jobId", drop=False)
+    jobs = df[df["jobId"].notna()].copy()
+    jobs["jobId"] = jobs["jobId"].astype(str)
+    jobs = jobs.drop_duplicates("jobId", keep="last").set_index("jobId", drop=False)
+    for column, dtype in NUMBER_COLUMNS.items():
+        if column in jobs.columns:
+            values = pd.to_numeric(jobs[column], errors="coerce")
+            jobs[column] = values.round().astype(dtype) if dtype == "Int64" else values
+    return jobs
+
+
+def display_table(jobs: pd.DataFrame) -> pd.DataFrame:
+    columns = [column for column in DISPLAY_COLUMNS if column in jobs.columns]
+    table = jobs[columns].reset_index(drop=True)
+    for column, text in LINK_TEXTS.items():
+        if column in table.columns:
+            urls = table[column].fillna("").astype(str)
+            table[column] = urls.where(urls == "", urls + f"#{text}")
+    return table.rename(columns=COLUMN_LABELS)
+
+
+def summary_metrics(jobs: pd.DataFrame) -> dict[str, float]:
+    def total(column: str) -> float:
+        return jobs[column].sum() if column in jobs.columns else 0
+
+    status = jobs["job_status"] if "job_status" in jobs.columns else pd.Series(dtype=object)
+    return {
+        "total_jobs": len(jobs),
+        "active_jobs": int((status == "Active").sum()),
+        "total_amount": float(total("amount_spent")),
+        "total_views": int(total("views")),
+        "total_applies": int(total("apply_clicks")),
+    }
+
+
+def job_labels(jobs: pd.DataFrame) -> dict[str, str]:
+    names = jobs["job_name"] if "job_name" in jobs.columns else pd.Series("", index=jobs.index)
+    names = names.fillna("").astype(str)
+    labels = jobs.index.to_series() + " - " + names.where(names != "", "Unknown")
+    return dict(zip(jobs.index, labels))
+
+
+def search_text(jobs: pd.DataFrame) -> pd.Series:
+    """Lower-cased searchable text of each row, in table order."""
+    columns = [column for column in SEARCH_COLUMNS if column in jobs.columns]
+    text = pd.Series("", index=range(len(jobs)), dtype=object)
+    for column in columns:
+        text = text + " " + jobs[column].fillna("").astype(str).to_numpy()
+    return text.str.lower()
+
+
+def build_dashboard_data(df: pd.DataFrame) -> DashboardData:
+    jobs = prepare_jobs(df)
+    text = search_text(jobs)
+
+    @lru_cache(maxsize=SEARCH_CACHE_SIZE)
+    def search(query: str) -> np.ndarray:
+        return np.flatnonzero(text.str.contains(query, regex=False).to_numpy())
+
+    return DashboardData(
+        jobs=jobs,
+        table=display_table(jobs),
+        metrics=summary_metrics(jobs),
+        labels=job_labels(jobs),
+        search=search,
+    )
+
+
+def job_page(data: DashboardData, query: str = "", page: int = 1, page_size: int = PAGE_SIZE) -> JobPage:
+    """Page ``page`` (from 1, clamped to the last page) of the rows containing ``query``."""
+    query = query.strip().lower()
+    rows = data.search(query) if query else None
+    matches = len(data.table) if rows is None else len(rows)
+    pages = max(1, -(-matches // page_size))
+    page = min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, matches)
+    positions = slice(start, stop) if rows is None else rows[start:stop]
+    return JobPage(
+        table=data.table.iloc[positions],
+        labels={job_id: data.labels[job_id] for job_id in data.jobs.index[positions]},
+        matches=matches,
+        start=start,
+        page=page,
+        pages=pages,
+    )
+
+
+def job_details(jobs: pd.DataFrame, job_id: str) -> dict[str, Any] | None:
+    """The stored fields of ``job_id``, without empty values."""
+    if job_id not in jobs.index:
+        return None
+    row = jobs.loc[job_id]
+    return {key: value.item() if hasattr(value, "item") else value for key, value in row[row.notna()].items()}
@@ -0,0 +1,96 @@
+"""Incremental loader for the per-job JSON records in ``linked_job_posts/``.
+
+``JobRecordIndex`` keeps every parsed record in memory, keyed by path,
+together with the file's mtime and size. Each ``load`` costs one directory
+scan, and only new or changed files are read again; removed files drop out.
+A cold start over thousands of files parses them in a thread pool. When
+nothing changed since the last call, the same list object is returned.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+# Below this many changed files, a thread pool costs more than it saves
+PARALLEL_PARSE_THRESHOLD = 64
+DEFAULT_PARSE_WORKERS = min(8, os.cpu_count() or 4)
+
+
+def _read_record(path: str) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+class JobRecordIndex:
+    """In-memory index of ``*.json`` job records, refreshed by mtime and size."""
+
+    def __init__(self, directory: Path, workers: int = DEFAULT_PARSE_WORKERS) -> None:
+        self.directory = Path(directory)
+        self.workers = workers
+        self.errors: dict[str, str] = {}
+        # path -> ((mtime_ns, size), record or None if it failed to parse)
+        self._entries: dict[str, tuple[tuple[int, int], dict[str, Any] | None]] = {}
+        self._records: list[dict[str, Any]] = []
+        self._stamps: dict[str, tuple[int, int]] | None = None
+        self._lock = threading.Lock()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        stamps: dict[str, tuple[int, int]] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    stamps[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _parse(self, paths: list[str]) -> list[tuple[str, dict[str, Any] | None, str | None]]:
+        def parse(path: str) -> tuple[str, dict[str, Any] | None, str | None]:
+            try:
+                return path, _read_record(path), None
+            except (OSError, ValueError) as error:
+                return path, None, str(error)
+
+        if len(paths) < PARALLEL_PARSE_THRESHOLD or self.workers <= 1:
+            return [parse(path) for path in paths]
+        # One chunk per worker keeps the per-task overhead off small files
+        chunks = [paths[start :: self.workers] for start in range(self.workers)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            parsed = pool.map(lambda chunk: [parse(path) for path in chunk], chunks)
+            return [item for chunk in parsed for item in chunk]
+
+    def load(self) -> list[dict[str, Any]]:
+        """Return every record, sorted by filename, with ``filename`` added."""
+        with self._lock:
+            stamps = self._scan()
+            if stamps == self._stamps:
+                return self._records
+
+            for path in set(self._entries) - set(stamps):
+                del self._entries[path]
+            for path in set(self.errors) - set(stamps):
+                del self.errors[path]
+            changed = [
+                path
+                for path, stamp in stamps.items()
+                if path not in self._entries or self._entries[path][0] != stamp
+            ]
+            for path, record, error in self._parse(changed):
+                if record is None:
+                    self.errors[path] = error or "unreadable"
+                else:
+                    self.errors.pop(path, None)
+                    record["filename"] = os.path.basename(path)
+                self._entries[path] = (stamps[path], record)
+
+            self._records = [
+                record
+                for _, record in (self._entries[path] for path in sorted(self._entries))
+                if record is not None
+            ]
+            self._stamps = stamps
+            return self._records
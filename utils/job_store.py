@@ -0,0 +1,277 @@
+"""SQLite store for extracted job analytics, one typed row per posting.
+
+This replaces the one-JSON-file-per-job layout of ``linked_job_posts/``:
+
+- ``jobs`` holds the latest record for each ``jobId``. Known fields are
+  typed columns; anything else is kept in the ``extra`` JSON column.
+- ``job_snapshots`` is append-only and keeps each extraction's numbers,
+  partitioned by ``extracted_date`` so history can be read a day at a time.
+- ``promotions`` maps each promoted ``jobId`` to its apply URL, so lookups
+  no longer scan ``workflow_runs/``.
+- ``failures`` logs failed extractions. A failure never replaces the last
+  good record in ``jobs``.
+
+Writers upsert single rows and commit at once (WAL mode). The dashboard
+reads the whole ``jobs`` table into a DataFrame in one query.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import quote
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+JOB_STORE_FILENAME = "job_posts.sqlite3"
+DEFAULT_JOB_STORE_DB = Path(
+    os.environ.get("JOB_STORE_DB", REPO_ROOT / "linked_job_posts" / JOB_STORE_FILENAME)
+)
+
+COLUMNS = {
+    "jobId": "TEXT PRIMARY KEY",
+    "job_name": "TEXT",
+    "original_job_title": "TEXT",
+    "location": "TEXT",
+    "job_status": "TEXT",
+    "posted_when": "TEXT",
+    "amount_spent": "REAL",
+    "views": "INTEGER",
+    "apply_clicks": "INTEGER",
+    "view_velocity": "REAL",
+    "jobDetailUrl": "TEXT",
+    "apply_url": "TEXT",
+    "status": "TEXT",
+    "error": "TEXT",
+    "extracted_by": "TEXT",
+    "content_hash": "TEXT",
+    "extracted_at": "TEXT",
+}
+SNAPSHOT_FIELDS = ("job_status", "views", "apply_clicks", "amount_spent")
+FAILED_STATUSES = ("failed", "extraction_failed")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS jobs (
+    {", ".join(f"{name} {kind}" for name, kind in COLUMNS.items())},
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS job_snapshots (
+    jobId TEXT NOT NULL,
+    extracted_at TEXT NOT NULL,
+    extracted_date TEXT NOT NULL,
+    job_status TEXT,
+    views INTEGER,
+    apply_clicks INTEGER,
+    amount_spent REAL,
+    PRIMARY KEY (jobId, extracted_at)
+);
+CREATE INDEX IF NOT EXISTS job_snapshots_date ON job_snapshots (extracted_date);
+CREATE TABLE IF NOT EXISTS promotions (
+    jobId TEXT PRIMARY KEY,
+    job_title TEXT,
+    apply_url TEXT,
+    promoted_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    jobId TEXT NOT NULL,
+    failed_at TEXT NOT NULL,
+    status TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS failures_job ON failures (jobId, failed_at);
+"""
+
+
+def job_store_path(output_dir: Path | None = None) -> Path:
+    """The store inside ``output_dir``, or the default one."""
+    return Path(output_dir) / JOB_STORE_FILENAME if output_dir else DEFAULT_JOB_STORE_DB
+
+
+def store_signature(db_path: Path) -> tuple[int, ...]:
+    """Changes whenever a write lands, in the database or its WAL file."""
+    signature: list[int] = []
+    for candidate in (Path(db_path), Path(f"{db_path}-wal")):
+        try:
+            stat = candidate.stat()
+            signature.extend((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.extend((0, 0))
+    return tuple(signature)
+
+
+def read_jobs_frame(db_path: Path = DEFAULT_JOB_STORE_DB):
+    """Load the ``jobs`` table into a pandas DataFrame over a read-only connection."""
+    import pandas as pd
+
+    conn = sqlite3.connect(f"file:{quote(str(db_path))}?mode=ro", uri=True)
+    try:
+        return pd.read_sql_query(
+            f"SELECT {', '.join(COLUMNS)} FROM jobs ORDER BY jobId", conn
+        )
+    finally:
+        conn.close()
+
+
+class JobStore:
+    """Read and write job records; every write is committed immediately."""
+
+    def __init__(self, db_path: Path = DEFAULT_JOB_STORE_DB) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "JobStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def _row(job_id: str, record: dict[str, Any]) -> tuple:
+        values = [job_id if name == "jobId" else record.get(name) for name in COLUMNS]
+        extra = {key: value for key, value in record.items() if key not in COLUMNS}
+        return (*values, json.dumps(extra) if extra else None)
+
+    def put_many(self, records: Iterable[dict[str, Any]]) -> int:
+        """Upsert records by ``jobId`` and append their snapshots; returns the count."""
+        rows = []
+        snapshots = []
+        for record in records:
+            job_id = str(record.get("jobId") or "")
+            if not job_id:
+                continue
+            rows.append(self._row(job_id, record))
+            stamp = record.get("extracted_at")
+            if stamp and record.get("views") is not None:
+                snapshots.append(
+                    (job_id, stamp, stamp[:10], *(record.get(name) for name in SNAPSHOT_FIELDS))
+                )
+        placeholders = ", ".join("?" for _ in range(len(COLUMNS) + 1))
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(COLUMNS)}, extra) VALUES ({placeholders})",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_snapshots"
+                f" (jobId, extracted_at, extracted_date, {', '.join(SNAPSHOT_FIELDS)})"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                snapshots,
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def put(self, record: dict[str, Any]) -> None:
+        self.put_many([record])
+
+    def put_failure(self, record: dict[str, Any]) -> None:
+        """Log a failed extraction, keeping the job's last good record.
+
+        A job with no record yet gets the failed one, so that it still
+        shows up (and is retried first by ``plan_refresh``).
+        """
+        job_id = str(record.get("jobId") or "")
+        if not job_id:
+            return
+        failed_at = record.get("extracted_at") or datetime.now(timezone.utc).isoformat()
+        placeholders = ", ".join("?" for _ in range(len(COLUMNS) + 1))
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "INSERT INTO failures (jobId, failed_at, status, error) VALUES (?, ?, ?, ?)",
+                (job_id, failed_at, record.get("status"), record.get("error")),
+            )
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO jobs ({', '.join(COLUMNS)}, extra) VALUES ({placeholders})",
+                self._row(job_id, {**record, "extracted_at": failed_at}),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def failures(self, job_id: str) -> list[dict[str, Any]]:
+        """Every logged failure of ``job_id``, oldest first."""
+        cursor = self._conn.execute(
+            "SELECT failed_at, status, error FROM failures WHERE jobId = ? ORDER BY failed_at",
+            (str(job_id),),
+        )
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def _to_record(self, row: tuple) -> dict[str, Any]:
+        record = {name: value for name, value in zip(COLUMNS, row) if value is not None}
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    def get(self, job_id: str) -> dict[str, Any]:
+        """The stored record for ``job_id``, or an empty dict."""
+        row = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)}, extra FROM jobs WHERE jobId = ?", (str(job_id),)
+        ).fetchone()
+        return self._to_record(row) if row else {}
+
+    def records(self, job_ids: Iterable[str] | None = None) -> dict[str, dict[str, Any]]:
+        """Stored records by ``jobId``; all of them, or only ``job_ids``."""
+        query = f"SELECT {', '.join(COLUMNS)}, extra FROM jobs"
+        if job_ids is None:
+            rows = self._conn.execute(query).fetchall()
+        else:
+            wanted = sorted({str(job_id) for job_id in job_ids})
+            rows = []
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start : start + 500]
+                rows.extend(
+                    self._conn.execute(
+                        f"{query} WHERE jobId IN ({', '.join('?' for _ in chunk)})", chunk
+                    ).fetchall()
+                )
+        return {row[0]: self._to_record(row) for row in rows}
+
+    def job_ids(self) -> set[str]:
+        return {row[0] for row in self._conn.execute("SELECT jobId FROM jobs")}
+
+    def snapshots(self, job_id: str) -> list[dict[str, Any]]:
+        """Every stored extraction of ``job_id``, oldest first."""
+        cursor = self._conn.execute(
+            f"SELECT extracted_at, {', '.join(SNAPSHOT_FIELDS)} FROM job_snapshots"
+            " WHERE jobId = ? ORDER BY extracted_at",
+            (str(job_id),),
+        )
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def put_promotion(
+        self, job_id: str, job_title: str, apply_url: str, promoted_at: float | None = None
+    ) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO promotions (jobId, job_title, apply_url, promoted_at)"
+            " VALUES (?, ?, ?, ?)",
+            (str(job_id), job_title, apply_url, promoted_at or time.time()),
+        )
+
+    def apply_url(self, job_id: str) -> str:
+        row = self._conn.execute(
+            "SELECT apply_url FROM promotions WHERE jobId = ?", (str(job_id),)
+        ).fetchone()
+        return (row[0] or "") if row else ""
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
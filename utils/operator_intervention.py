@@ -0,0 +1,115 @@
+"""Ask the operator to fix something in the browser without stalling other workflows.
+
+A workflow that needs a person calls ``wait_for_operator``. This writes
+``<key>.waiting`` into the intervention directory and then polls, with
+``asyncio.sleep``, for the operator's answer: ``<key>.retry`` to try again or
+``<key>.abort`` to give up. Only that workflow waits; every other task on
+the event loop keeps running. If nobody answers within the timeout, the
+workflow raises and only its own job fails.
+
+Answer from another terminal with::
+
+    python utils/operator_intervention.py            # list what is waiting
+    python utils/operator_intervention.py retry KEY
+    python utils/operator_intervention.py abort KEY
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_INTERVENTION_DIR = Path(
+    os.environ.get("INTERVENTION_DIR", REPO_ROOT / "cache" / "interventions")
+)
+DEFAULT_INTERVENTION_TIMEOUT = float(os.environ.get("INTERVENTION_TIMEOUT", 600))
+INTERVENTION_POLL_INTERVAL = 0.5
+ANSWERS = ("retry", "abort")
+
+
+def intervention_key(*parts: object) -> str:
+    """A filename-safe key, e.g. ``intervention_key("card", job_id)``."""
+    return re.sub(r"[^\w.-]+", "_", "-".join(str(part) for part in parts)).strip("_")
+
+
+def _paths(key: str, directory: Path) -> dict[str, Path]:
+    return {name: directory / f"{key}.{name}" for name in ("waiting", *ANSWERS)}
+
+
+async def wait_for_operator(
+    key: str,
+    message: str,
+    timeout: float = DEFAULT_INTERVENTION_TIMEOUT,
+    directory: Path = DEFAULT_INTERVENTION_DIR,
+) -> None:
+    """Wait for the operator to answer ``retry`` for ``key``.
+
+    Raises ``RuntimeError`` when the operator aborts or ``timeout`` seconds
+    pass without an answer.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = _paths(key, directory)
+    for answer in ANSWERS:
+        paths[answer].unlink(missing_ok=True)
+    paths["waiting"].write_text(
+        json.dumps({"key": key, "message": message, "since": time.time(), "pid": os.getpid()}),
+        encoding="utf-8",
+    )
+    print(
+        f"Waiting up to {timeout:.0f}s for operator on {key!r}: {message}\n"
+        f"  retry: python utils/operator_intervention.py retry {key}\n"
+        f"  abort: python utils/operator_intervention.py abort {key}"
+    )
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            if paths["retry"].exists():
+                return
+            if paths["abort"].exists():
+                raise RuntimeError(f"Operator aborted {key!r}: {message}")
+            await asyncio.sleep(INTERVENTION_POLL_INTERVAL)
+        raise RuntimeError(f"No operator response for {key!r} within {timeout:.0f}s: {message}")
+    finally:
+        for path in paths.values():
+            path.unlink(missing_ok=True)
+
+
+def pending_interventions(directory: Path = DEFAULT_INTERVENTION_DIR) -> list[dict]:
+    """The interventions currently waiting for an answer, oldest first."""
+    waiting = []
+    for path in directory.glob("*.waiting"):
+        try:
+            waiting.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return sorted(waiting, key=lambda item: item.get("since", 0))
+
+
+def answer(key: str, choice: str, directory: Path = DEFAULT_INTERVENTION_DIR) -> None:
+    if choice not in ANSWERS:
+        raise ValueError(f"Answer must be one of {', '.join(ANSWERS)}")
+    paths = _paths(key, directory)
+    if not paths["waiting"].exists():
+        raise RuntimeError(f"Nothing is waiting on {key!r}")
+    paths[choice].touch()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        answer(sys.argv[2], sys.argv[1])
+        print(f"Sent {sys.argv[1]} to {sys.argv[2]!r}")
+    elif len(sys.argv) == 1:
+        waiting = pending_interventions()
+        if not waiting:
+            print("No workflow is waiting for an operator.")
+        for item in waiting:
+            age = time.time() - item.get("since", time.time())
+            print(f"{item['key']}  (waiting {age:.0f}s, pid {item.get('pid')}): {item['message']}")
+    else:
+        raise SystemExit("Usage: python utils/operator_intervention.py [retry|abort KEY]")
@@ -1,54 +1,236 @@
+import asyncio
 import os
 import re
 import sqlite3
-from typing import Optional, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+DEFAULT_MESSAGES_DB = '~/Library/Messages/chat.db'
+HDFC_SENDER_PATTERN = '%hdfcbk%'
+OTP_RE = re.compile(r"\b(\d{6})\b")
+OTP_POLL_INTERVAL = 0.05
+OTP_TIMEOUT = 120.0
+
+
+def _messages_db_path(db_path: Optional[str] = None) -> str:
+    path = os.path.expanduser(db_path or DEFAULT_MESSAGES_DB)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Database not found at {path}")
+    return path
+
+
+class OtpSource:
+    """Reusable, read-only view of the OTP messages from one sender.
+
+    Holds one ``mode=ro`` connection. The sender's ``handle.ROWID`` values
+    are resolved once (and again only when new handles appear), so message
+    queries filter on the indexed ``handle_id`` and walk ``message.ROWID``
+    ranges instead of running ``LIKE`` over a join. The ``a*`` methods run
+    the same queries in a worker thread so the event loop never blocks on
+    SQLite.
+    """
+
+    def __init__(
+        self, db_path: Optional[str] = None, sender_pattern: str = HDFC_SENDER_PATTERN
+    ) -> None:
+        self.db_path = _messages_db_path(db_path)
+        self.sender_pattern = sender_pattern
+        self._conn = sqlite3.connect(
+            f"file:{quote(self.db_path)}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._handles: Dict[int, str] = {}
+        self._handle_mark = -1
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _resolve_handles(self) -> Dict[int, str]:
+        """Refresh the sender's handle ROWIDs if the handle table grew."""
+        mark = self._conn.execute("SELECT MAX(ROWID) FROM handle").fetchone()[0] or 0
+        if mark != self._handle_mark:
+            rows = self._conn.execute(
+                "SELECT ROWID, id FROM handle WHERE lower(id) LIKE ?",
+                (self.sender_pattern,),
+            ).fetchall()
+            self._handles = {rowid: sender for rowid, sender in rows}
+            self._handle_mark = mark
+        return self._handles
+
+    def _otps(self, rows: List[Tuple[int, int, str]]) -> List[Tuple[int, str, str, str]]:
+        found = []
+        for rowid, handle_id, text in rows:
+            m = OTP_RE.search(text)
+            if m:
+                found.append((rowid, self._handles[handle_id], m.group(1), text))
+        return found
+
+    def _message_query(self, where: str, order: str, params: Tuple) -> List[Tuple[int, int, str]]:
+        """Query the sender's messages; ``where`` ends in the ``handle_id IN`` test."""
+        handles = self._resolve_handles()
+        if not handles:
+            return []
+        return self._conn.execute(
+            f"SELECT ROWID, handle_id, text FROM message WHERE {where}"
+            f" ({', '.join('?' for _ in handles)}) AND text IS NOT NULL ORDER BY {order}",
+            (*params, *handles),
+        ).fetchall()
+
+    def high_water_mark(self) -> int:
+        """Return the newest message ROWID; later messages have larger ROWIDs."""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(ROWID) FROM message").fetchone()[0] or 0
+
+    def otps_after(self, after_rowid: int) -> List[Tuple[int, str, str, str]]:
+        """Return ``(rowid, sender, otp, text)`` for OTP messages newer than ``after_rowid``."""
+        with self._lock:
+            # Walk the ROWID range; ``+handle_id`` keeps SQLite off the
+            # handle index, which would visit every OTP the sender ever sent
+            rows = self._message_query("ROWID > ? AND +handle_id IN", "ROWID", (after_rowid,))
+            return self._otps(rows)
+
+    def latest_otp(self, max_rows: int = 20) -> Optional[Tuple[str, str]]:
+        """Return ``(sender, otp)`` from the newest of the last ``max_rows`` messages."""
+        with self._lock:
+            rows = self._message_query(
+                "handle_id IN", f"date DESC LIMIT {int(max_rows)}", ()
+            )
+            found = self._otps(rows)
+        return (found[0][1], found[0][2]) if found else None
+
+    async def ahigh_water_mark(self) -> int:
+        return await asyncio.to_thread(self.high_water_mark)
+
+    async def aotps_after(self, after_rowid: int) -> List[Tuple[int, str, str, str]]:
+        return await asyncio.to_thread(self.otps_after, after_rowid)
+
 
 def get_latest_otp_from_hdfcbnk(db_path: Optional[str] = None, max_rows: int = 20) -> Optional[Tuple[str, str]]:
     """
     Looks in the Messages DB for messages from a handle whose id contains 'hdfcbnk'.
-    Checks up to `max_rows` recent messages from that sender (by date descending),
+    Checks up to `max_rows` recent messages from that sender (newest first),
     and returns the first one that contains a 6‐digit number (OTP).
     Returns (sender_handle, otp) or None if not found in the first `max_rows`.
     """
-    if db_path is None:
-        db_path = os.path.expanduser('~/Library/Messages/chat.db')
-    if not os.path.isfile(db_path):
-        raise FileNotFoundError(f"Database not found at {db_path}")
-
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
-    sql = """
-    SELECT
-      h.id AS sender,
-      m.text AS message_text,
-      m.date AS msg_date
-    FROM
-      message m
-      JOIN handle h ON m.handle_id = h.ROWID
-    WHERE
-      lower(h.id) LIKE ?
-      AND m.text IS NOT NULL
-    ORDER BY
-      m.date DESC
-    LIMIT ?
+    source = OtpSource(db_path)
+    try:
+        return source.latest_otp(max_rows)
+    finally:
+        source.close()
+
+
+class OtpRequest:
+    """One in-flight promotion waiting for its OTP."""
+
+    def __init__(self, high_water_mark: int, match_text: Optional[str] = None) -> None:
+        self.high_water_mark = high_water_mark
+        self.match_text = match_text
+        self.future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+
+
+class OtpWaiter:
+    """Hand each promotion the first OTP that arrives after its own click.
+
+    ``expect`` records the messages high-water mark just before the action
+    that triggers an SMS. ``wait`` then resolves as soon as a newer OTP row
+    appears. The database (and its WAL file) is watched with a cheap
+    ``stat`` every ``poll_interval`` seconds, and is only queried when it
+    changes. With several promotions in flight, each new OTP goes to the
+    oldest request it can belong to: one whose mark is below the message
+    and whose ``match_text`` (e.g. the amount) appears in it. Every OTP is
+    handed out once at most.
     """
-    cur.execute(sql, ('%hdfcbk%', max_rows))
-    rows = cur.fetchall()
-    conn.close()
-
-    for row in rows:
-        sender = row['sender']
-        text = row['message_text'] or ""        
-        # Try to extract any 6-digit number
-        m = re.search(r"\b(\d{6})\b", text)
-        if m:
-            otp = m.group(1)
-            return (sender, otp)
-
-    # If we get here no message in the first max_rows had a matching OTP
-    return None
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        sender_pattern: str = HDFC_SENDER_PATTERN,
+        poll_interval: float = OTP_POLL_INTERVAL,
+    ) -> None:
+        self.source = OtpSource(db_path, sender_pattern)
+        self.poll_interval = poll_interval
+        self._pending: List[OtpRequest] = []
+        self._claimed: set = set()
+        self._poller: Optional["asyncio.Task[None]"] = None
+
+    async def expect(self, match_text: Optional[str] = None) -> OtpRequest:
+        request = OtpRequest(await self.source.ahigh_water_mark(), match_text)
+        self._pending.append(request)
+        return request
+
+    def cancel(self, request: OtpRequest) -> None:
+        if request in self._pending:
+            self._pending.remove(request)
+        if not request.future.done():
+            request.future.cancel()
+
+    async def wait(self, request: OtpRequest, timeout: float = OTP_TIMEOUT) -> str:
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll())
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"No OTP arrived within {timeout:.0f}s") from None
+        finally:
+            self.cancel(request)
+
+    def _db_signature(self) -> Tuple[float, ...]:
+        signature: List[float] = []
+        for candidate in (self.source.db_path, self.source.db_path + "-wal"):
+            try:
+                stat = os.stat(candidate)
+                signature.extend((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.extend((0, 0))
+        return tuple(signature)
+
+    def _assign(self, messages: List[Tuple[int, str, str, str]]) -> None:
+        for rowid, _, otp, text in messages:
+            if rowid in self._claimed:
+                continue
+            for request in self._pending:
+                if rowid <= request.high_water_mark:
+                    continue
+                if request.match_text and request.match_text not in text:
+                    continue
+                self._claimed.add(rowid)
+                self._pending.remove(request)
+                request.future.set_result(otp)
+                break
+
+    async def _poll(self) -> None:
+        last_signature = None
+        try:
+            while self._pending:
+                signature = self._db_signature()
+                if signature != last_signature:
+                    last_signature = signature
+                    after = min(request.high_water_mark for request in self._pending)
+                    self._assign(await self.source.aotps_after(after))
+                await asyncio.sleep(self.poll_interval)
+        except Exception as error:
+            # Fail the waiting promotions now rather than at their timeout
+            pending, self._pending = self._pending, []
+            for request in pending:
+                if not request.future.done():
+                    request.future.set_exception(
+                        RuntimeError(f"Reading OTPs from {self.source.db_path} failed: {error}")
+                    )
+
+
+_WAITERS: dict = {}
+
+
+def get_otp_waiter(db_path: Optional[str] = None) -> OtpWaiter:
+    """Return the process-wide waiter for ``db_path`` so concurrent promotions share it."""
+    key = os.path.expanduser(db_path or DEFAULT_MESSAGES_DB)
+    waiter = _WAITERS.get(key)
+    if waiter is None:
+        waiter = _WAITERS[key] = OtpWaiter(db_path)
+    return waiter
+
 
 if __name__ == "__main__":
     result = get_latest_otp_from_hdfcbnk(max_rows=20)
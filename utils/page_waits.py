@@ -0,0 +1,103 @@
+"""Condition-based waits that return as soon as the page is ready.
+
+Every wait keeps an upper bound and returns ``False`` instead of raising when
+it runs out, so a workflow can swap a fixed ``wait_for_timeout`` for one of
+these without changing its failure behaviour.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable
+
+DEFAULT_POLL_INTERVAL_MS = 100
+LISTBOX_OPTION_SELECTOR = '[role="listbox"] [role="option"], [role="option"]'
+
+
+def _raw_page(page):
+    """Accept either a StagehandPage or a Playwright page."""
+    return getattr(page, "_page", page)
+
+
+async def wait_until(
+    condition: Callable[[], Awaitable[bool]],
+    timeout_ms: int,
+    interval_ms: int = DEFAULT_POLL_INTERVAL_MS,
+) -> bool:
+    """Poll ``condition`` until it returns truthy or ``timeout_ms`` elapses."""
+    deadline = time.monotonic() + timeout_ms / 1000
+    while True:
+        try:
+            if await condition():
+                return True
+        except Exception:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(interval_ms / 1000, remaining))
+
+
+async def element_ready(page, selector: str, enabled: bool = False) -> bool:
+    """Return whether ``selector`` is visible (and optionally enabled) in any frame."""
+    for frame in _raw_page(page).frames:
+        try:
+            locator = frame.locator(selector).first
+            if not await locator.count() or not await locator.is_visible():
+                continue
+            if enabled and not await locator.is_enabled():
+                continue
+            return True
+        except Exception:
+            continue
+    return False
+
+
+async def wait_for_element(
+    page, selector: str, enabled: bool = False, timeout_ms: int = 10000
+) -> bool:
+    return await wait_until(lambda: element_ready(page, selector, enabled), timeout_ms)
+
+
+async def wait_for_element_gone(page, selector: str, timeout_ms: int = 5000) -> bool:
+    """Wait until ``selector`` is visible in no frame, e.g. a dropdown has closed."""
+
+    async def gone() -> bool:
+        return not await element_ready(page, selector)
+
+    return await wait_until(gone, timeout_ms)
+
+
+async def wait_for_url(page, pattern: str, timeout_ms: int = 15000) -> bool:
+    """Wait until the current URL matches the ``pattern`` regex.
+
+    Polls rather than waiting on a navigation event, so client-side route
+    changes (``history.pushState``) count too.
+    """
+    regex = re.compile(pattern)
+    raw_page = _raw_page(page)
+
+    async def matches() -> bool:
+        return bool(regex.search(raw_page.url or ""))
+
+    return await wait_until(matches, timeout_ms)
+
+
+async def wait_for_network_idle(page, timeout_ms: int = 10000) -> bool:
+    """Wait for Playwright's ``networkidle`` load state.
+
+    LinkedIn keeps long-poll requests open, so on its pages this runs to
+    ``timeout_ms``; workflows wait for an element or URL instead.
+    """
+    try:
+        await _raw_page(page).wait_for_load_state("networkidle", timeout=timeout_ms)
+        return True
+    except Exception:
+        return False
+
+
+async def wait_for_listbox_option(page, timeout_ms: int = 5000) -> bool:
+    """Wait for a typeahead or dropdown to render at least one option."""
+    return await wait_for_element(page, LISTBOX_OPTION_SELECTOR, timeout_ms=timeout_ms)
@@ -0,0 +1,98 @@
+"""Decide which stored job extractions are worth refreshing, and in what order.
+
+Each job's priority is its "effective age": hours since the last extraction,
+scaled up for jobs whose numbers move (Active status, views rising) and down
+for ones that don't (closed or paused). A job is due once its effective age
+passes the freshness threshold, so with a 24 h threshold a quiet Active job
+is refreshed daily, a closed one every few weeks, and a job gaining views
+fast within hours.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from datetime import datetime
+from typing import Any
+
+from utils.job_store import FAILED_STATUSES
+
+DEFAULT_MAX_AGE_HOURS = 24.0
+STATUS_WEIGHTS = {
+    "active": 1.0,
+    "in review": 0.5,
+    "paused": 0.2,
+    "draft": 0.2,
+    "closed": 0.05,
+}
+UNKNOWN_STATUS_WEIGHT = 0.5
+# Views per hour at which a job's effective age doubles
+VELOCITY_SCALE = 10.0
+
+
+def extracted_at(record: dict[str, Any]) -> float | None:
+    """Epoch seconds of the last extraction, if the record carries one."""
+    stamp = record.get("extracted_at")
+    if stamp:
+        try:
+            return datetime.fromisoformat(stamp).timestamp()
+        except ValueError:
+            pass
+    return None
+
+
+def view_velocity(
+    record: dict[str, Any], previous: dict[str, Any], now: float
+) -> float | None:
+    """Views gained per hour between ``previous`` and ``record`` (taken at ``now``)."""
+    if record.get("views") is None or previous.get("views") is None:
+        return None
+    stamp = previous.get("extracted_at")
+    if not stamp:
+        return None
+    try:
+        hours = (now - datetime.fromisoformat(stamp).timestamp()) / 3600
+    except ValueError:
+        return None
+    if hours <= 0:
+        return None
+    return round((int(record["views"]) - int(previous["views"])) / hours, 3)
+
+
+def refresh_priority(record: dict[str, Any], age_hours: float) -> float:
+    """Effective age in hours; compare against the freshness threshold."""
+    status = str(record.get("job_status") or "").strip().lower()
+    weight = STATUS_WEIGHTS.get(status, UNKNOWN_STATUS_WEIGHT)
+    velocity = max(float(record.get("view_velocity") or 0), 0.0)
+    return age_hours * weight * (1 + math.log1p(velocity / VELOCITY_SCALE) / math.log(2))
+
+
+def plan_refresh(
+    job_ids: list[str],
+    records: dict[str, dict[str, Any]],
+    max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+    now: float | None = None,
+) -> tuple[list[tuple[str, float]], list[str]]:
+    """Split ``job_ids`` into due ``(job_id, priority)`` pairs, highest first, and fresh ids.
+
+    ``records`` maps job ids to their stored records. Jobs with no record,
+    no extraction time, or only a failed extraction are always due and come
+    first.
+    """
+    now = now or time.time()
+    due: list[tuple[str, float]] = []
+    fresh: list[str] = []
+    for job_id in job_ids:
+        record = records.get(job_id)
+        stamp = extracted_at(record) if record else None
+        if stamp is None or record.get("status") in FAILED_STATUSES:
+            due.append((job_id, math.inf))
+            continue
+        age_hours = max(now - stamp, 0) / 3600
+        priority = refresh_priority(record, age_hours)
+        if priority >= max_age_hours:
+            due.append((job_id, priority))
+        else:
+            fresh.append(job_id)
+    due.sort(key=lambda item: item[1], reverse=True)
+    return due, fresh
@@ -0,0 +1,117 @@
+"""Request blocking profile for pages that only need the DOM.
+
+The extract and edit workflows read text and click form controls, so images,
+media, fonts and third-party trackers only cost time and bandwidth. A
+``BlockingProfile`` aborts those requests through ``page.route`` while the
+workflow runs and removes the route afterwards, so a pooled tab is handed
+back unchanged.
+
+Set ``RESOURCE_BLOCKING=0`` to turn blocking off, and override the lists with
+comma-separated ``BLOCK_RESOURCE_TYPES``, ``BLOCK_HOSTS`` and ``ALLOW_HOSTS``.
+"""
+
+from __future__ import annotations
+
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+from urllib.parse import urlsplit
+
+ROUTE_PATTERN = "**/*"
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+DEFAULT_BLOCKED_HOSTS = (
+    "px.ads.linkedin.com",
+    "ads.linkedin.com",
+    "snap.licdn.com",
+    "doubleclick.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "facebook.net",
+    "bat.bing.com",
+)
+
+
+def _env_list(name: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return tuple(item.strip().lower() for item in value.split(",") if item.strip())
+
+
+def _host_matches(host: str, domains: tuple[str, ...]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+@dataclass
+class BlockingProfile:
+    """Which requests to abort, by resource type and by host.
+
+    ``allowed_hosts`` wins over both deny lists, so e.g. images from one
+    host can be kept while every other image is blocked.
+    """
+
+    blocked_types: tuple[str, ...] = DEFAULT_BLOCKED_TYPES
+    blocked_hosts: tuple[str, ...] = DEFAULT_BLOCKED_HOSTS
+    allowed_hosts: tuple[str, ...] = ()
+    blocked: int = field(default=0, compare=False)
+    allowed: int = field(default=0, compare=False)
+
+    @classmethod
+    def from_env(cls) -> "BlockingProfile":
+        return cls(
+            blocked_types=_env_list("BLOCK_RESOURCE_TYPES", DEFAULT_BLOCKED_TYPES),
+            blocked_hosts=_env_list("BLOCK_HOSTS", DEFAULT_BLOCKED_HOSTS),
+            allowed_hosts=_env_list("ALLOW_HOSTS", ()),
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if not host or _host_matches(host, self.allowed_hosts):
+            return False
+        return resource_type in self.blocked_types or _host_matches(
+            host, self.blocked_hosts
+        )
+
+    async def handle(self, route: Any) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked += 1
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed += 1
+            await route.fallback()
+
+    def stats(self) -> dict[str, int]:
+        return {"blocked": self.blocked, "allowed": self.allowed}
+
+
+def blocking_enabled() -> bool:
+    return os.environ.get("RESOURCE_BLOCKING", "1").lower() not in ("0", "false", "no", "off")
+
+
+@asynccontextmanager
+async def blocked_resources(
+    page: Any, profile: BlockingProfile | None = None
+) -> AsyncIterator[BlockingProfile | None]:
+    """Apply ``profile`` (default: from the environment) to ``page`` for the block.
+
+    Note that Playwright bypasses the HTTP cache for routed pages, so this
+    trades cached static assets for never fetching the blocked ones.
+    """
+    if profile is None:
+        if not blocking_enabled():
+            yield None
+            return
+        profile = BlockingProfile.from_env()
+    raw_page = getattr(page, "_page", page)
+    await raw_page.route(ROUTE_PATTERN, profile.handle)
+    try:
+        yield profile
+    finally:
+        try:
+            await raw_page.unroute(ROUTE_PATTERN, profile.handle)
+        except Exception as error:
+            print(f"Ignoring error while removing request blocking: {error}")
+        print(f"Request blocking stats: {profile.stats()}")
@@ -0,0 +1,660 @@
+"""Process-wide, write-behind cache for observed Stagehand selectors.
+
+All workflows share one SQLite database (WAL mode) so several worker
+processes can read and write it concurrently. Entries are namespaced by
+workflow name; a miss in one namespace falls back to an identical
+instruction cached by another workflow, or by another process since this
+one started.
+
+Keys combine the instruction with a URL pattern and a DOM structure
+fingerprint of the page it was observed on. Entries record when they last
+worked, expire after a TTL, are bounded in number with LRU eviction, and
+are dropped after repeated consecutive failures.
+
+Each entry also keeps a ranked chain of locators for the element (short
+CSS, ARIA role, text, absolute XPath), each with its own win/failure
+counts, so a broken XPath can heal locally.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlparse
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = Path(
+    os.environ.get("SELECTOR_CACHE_DB", REPO_ROOT / "cache" / "selectors.sqlite3")
+)
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL_SECONDS = 14 * 24 * 3600
+DEFAULT_MAX_FAILURES = 3
+
+KEY_SEPARATOR = "\x1f"
+# Lower is cheaper to evaluate and less sensitive to layout changes.
+LOCATOR_PRIORITY = {"css": 0, "role": 1, "text": 2, "xpath": 3}
+TRACKING_QUERY_PARAMS = {"trk", "refId", "trackingId", "lipi"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS selectors (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS selectors_key ON selectors (key);
+"""
+
+
+# Structural skeleton of the top of the DOM: tag names, stable ids and roles
+# down to a fixed depth. Text and generated ids are ignored so the same layout
+# fingerprints the same way for every job.
+DOM_FINGERPRINT_JS = """
+() => {
+  const skip = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'LINK', 'META', 'TEMPLATE', 'svg']);
+  const parts = [];
+  const walk = (el, depth) => {
+    if (depth > 3) return;
+    for (const child of el.children) {
+      if (skip.has(child.tagName)) continue;
+      const id = child.id && !/\\d/.test(child.id) ? '#' + child.id : '';
+      const role = child.getAttribute('role');
+      parts.push(depth + child.tagName + id + (role ? '[' + role + ']' : ''));
+      walk(child, depth + 1);
+    }
+  };
+  if (document.body) walk(document.body, 0);
+  return parts.join('|');
+}
+"""
+
+
+class SelectorStore:
+    """In-memory mirror of the shared selector database.
+
+    Rows are loaded once, on first access. ``set`` only marks an entry dirty;
+    a daemon thread upserts dirty rows every ``flush_interval`` seconds and
+    once more at interpreter exit. Upserts touch only the rows this process
+    changed, so concurrent writers never clobber each other's entries.
+    Entries are indexed by instruction and URL pattern. The first lookup for
+    a URL pattern also reads the rows other processes have written for it
+    since the load; later misses never touch SQLite. The
+    flush writes on its own connection without holding the lock that
+    lookups take, so a write waiting on another process never stalls them.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.flushes = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[str, str], Any] | None = None
+        # "<instruction>\x1f<url pattern>\x1f" -> (namespace, key) of its entries
+        self._by_prefix: dict[str, set[tuple[str, str]]] = {}
+        self._synced_patterns: set[str] = set()
+        self._dirty: set[tuple[str, str]] = set()
+        self._deleted: set[tuple[str, str]] = set()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flush_thread: threading.Thread | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._writer: sqlite3.Connection | None = None
+
+    def _open(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """The reading connection; used under ``_lock``."""
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _ensure_loaded(self) -> dict[tuple[str, str], Any]:
+        with self._lock:
+            if self._entries is None:
+                rows = self._connect().execute(
+                    "SELECT namespace, key, value FROM selectors ORDER BY updated_at"
+                ).fetchall()
+                self._entries = OrderedDict()
+                for namespace, key, value in rows:
+                    self._add((namespace, key), json.loads(value))
+                self._evict_overflow()
+            return self._entries
+
+    def _add(self, ident: tuple[str, str], value: Any) -> None:
+        self._entries[ident] = value
+        self._entries.move_to_end(ident)
+        prefix = _key_prefix(ident[1])
+        if prefix:
+            self._by_prefix.setdefault(prefix, set()).add(ident)
+
+    def _remove(self, ident: tuple[str, str]) -> Any:
+        value = self._entries.pop(ident, None)
+        prefix = _key_prefix(ident[1])
+        if prefix and prefix in self._by_prefix:
+            self._by_prefix[prefix].discard(ident)
+            if not self._by_prefix[prefix]:
+                del self._by_prefix[prefix]
+        return value
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self.max_entries:
+            evicted = next(iter(self._entries))
+            self._remove(evicted)
+            self._dirty.discard(evicted)
+            self._deleted.add(evicted)
+            self.evictions += 1
+
+    def _sync_pattern(self, prefix: str) -> None:
+        """Once per URL pattern, pull in rows other processes wrote since the load."""
+        pattern = prefix.split(KEY_SEPARATOR)[1]
+        if pattern in self._synced_patterns:
+            return
+        self._synced_patterns.add(pattern)
+        rows = self._connect().execute(
+            "SELECT namespace, key, value FROM selectors WHERE instr(key, ?) > 0",
+            (f"{KEY_SEPARATOR}{pattern}{KEY_SEPARATOR}",),
+        ).fetchall()
+        for namespace, key, value in rows:
+            if (namespace, key) not in self._entries and (namespace, key) not in self._deleted:
+                self._add((namespace, key), json.loads(value))
+        self._evict_overflow()
+
+    def _start_flusher(self) -> None:
+        if self._flush_thread is not None:
+            return
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="selector-cache-flush", daemon=True
+        )
+        self._flush_thread.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as error:
+                print(f"Selector cache flush failed, will retry: {error}")
+
+    def _lookup_shared(self, namespace: str, key: str) -> Any:
+        prefix = _key_prefix(key)
+        if not prefix:
+            return None
+        self._sync_pattern(prefix)
+        own = self._entries.get((namespace, key))
+        if own is not None:
+            return own
+        for other_namespace, other_key in self._by_prefix.get(prefix, ()):
+            if other_key == key and other_namespace != namespace:
+                return self._entries[(other_namespace, other_key)]
+        return None
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            entries = self._ensure_loaded()
+            value = entries.get((namespace, key))
+            if value is not None:
+                entries.move_to_end((namespace, key))
+                self.hits += 1
+                return value
+            value = self._lookup_shared(namespace, key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self._add((namespace, key), value)
+            self._evict_overflow()
+            return value
+
+    def peek(self, namespace: str, key: str) -> Any:
+        """Return an entry without touching counters or LRU order."""
+        with self._lock:
+            return self._ensure_loaded().get((namespace, key))
+
+    def scan(self, key_prefix: str) -> list[tuple[str, str, Any]]:
+        """Return entries of any namespace whose key starts with ``key_prefix``.
+
+        An ``"<instruction>\x1f<url pattern>\x1f"`` prefix is an index lookup;
+        any other prefix scans every entry.
+        """
+        with self._lock:
+            entries = self._ensure_loaded()
+            if _key_prefix(key_prefix) == key_prefix:
+                self._sync_pattern(key_prefix)
+                return [
+                    (namespace, key, entries[(namespace, key)])
+                    for namespace, key in self._by_prefix.get(key_prefix, ())
+                ]
+            return [
+                (namespace, key, value)
+                for (namespace, key), value in entries.items()
+                if key.startswith(key_prefix)
+            ]
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            self._add((namespace, key), value)
+            self._dirty.add((namespace, key))
+            self._deleted.discard((namespace, key))
+            self.writes += 1
+            self._evict_overflow()
+            self._start_flusher()
+
+    def set_many(self, namespace: str, items: dict[str, Any]) -> None:
+        """Store several entries as a single write."""
+        with self._lock:
+            self._ensure_loaded()
+            for key, value in items.items():
+                self._add((namespace, key), value)
+                self._dirty.add((namespace, key))
+                self._deleted.discard((namespace, key))
+            self.writes += 1
+            self._evict_overflow()
+            self._start_flusher()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            if self._remove((namespace, key)) is None:
+                return
+            self._dirty.discard((namespace, key))
+            self._deleted.add((namespace, key))
+            self.evictions += 1
+            self._start_flusher()
+
+    def has_namespace(self, namespace: str) -> bool:
+        with self._lock:
+            return any(ns == namespace for ns, _ in self._ensure_loaded())
+
+    def flush(self) -> None:
+        """Upsert entries changed, and delete entries evicted, since the last flush.
+
+        The changes are copied and cleared under the lock, then written
+        after releasing it. If the write fails they are marked again, unless
+        they changed in the meantime, and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if (not self._dirty and not self._deleted) or self._entries is None:
+                    return
+                dirty, self._dirty = self._dirty, set()
+                deleted, self._deleted = self._deleted, set()
+                now = time.time()
+                rows = [
+                    (namespace, key, json.dumps(self._entries[(namespace, key)]), now)
+                    for namespace, key in dirty
+                    if (namespace, key) in self._entries
+                ]
+            try:
+                if self._writer is None:
+                    self._writer = self._open()
+                with self._writer:
+                    self._writer.executemany(
+                        "INSERT INTO selectors (namespace, key, value, updated_at) "
+                        "VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (namespace, key) DO UPDATE SET "
+                        "value = excluded.value, updated_at = excluded.updated_at",
+                        rows,
+                    )
+                    self._writer.executemany(
+                        "DELETE FROM selectors WHERE namespace = ? AND key = ?",
+                        list(deleted),
+                    )
+            except Exception:
+                with self._lock:
+                    self._dirty |= {
+                        ident for ident in dirty
+                        if ident in self._entries and ident not in self._deleted
+                    }
+                    self._deleted |= {ident for ident in deleted if ident not in self._entries}
+                raise
+            with self._lock:
+                self.flushes += 1
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+        with self._flush_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries or {}),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate_pct": (
+                    round(100 * (self.hits + self.shared_hits) / lookups) if lookups else 0
+                ),
+                "writes": self.writes,
+                "flushes": self.flushes,
+                "evictions": self.evictions,
+            }
+
+
+def url_pattern(url: str) -> str:
+    """Reduce a URL to host, path and meaningful query keys with ids masked.
+
+    ``/hiring/jobs/4317415591/detail/`` and ``/hiring/jobs/4317729050/detail/``
+    share a pattern, while ``?step=job-settings`` and ``?step=qualifications``
+    on the review page do not.
+    """
+    parsed = urlparse(url or "")
+    path = re.sub(r"\d+", "*", parsed.path.rstrip("/")) or "/"
+    query = sorted(
+        (name, re.sub(r"\d+", "*", value))
+        for name, value in parse_qsl(parsed.query)
+        if name not in TRACKING_QUERY_PARAMS
+    )
+    query_str = "&".join(f"{name}={value}" for name, value in query)
+    return f"{parsed.netloc}{path}" + (f"?{query_str}" if query_str else "")
+
+
+async def page_signature(page) -> tuple[str, str]:
+    """Return the ``(url_pattern, dom_fingerprint)`` used to key cache entries."""
+    raw_page = page._page
+    fingerprint = ""
+    try:
+        skeleton = await raw_page.evaluate(DOM_FINGERPRINT_JS)
+        fingerprint = hashlib.sha1(skeleton.encode("utf-8")).hexdigest()[:12]
+    except Exception as error:
+        print("Unable to fingerprint DOM:", error)
+    return url_pattern(raw_page.url), fingerprint
+
+
+def _key_prefix(key: str) -> str | None:
+    """``"<instruction>\x1f<url pattern>\x1f"`` of a full key, or ``None`` for a bare one."""
+    parts = key.split(KEY_SEPARATOR)
+    if len(parts) != 3:
+        return None
+    return KEY_SEPARATOR.join((parts[0], parts[1], ""))
+
+
+def _is_entry(value: Any) -> bool:
+    return isinstance(value, dict) and "action" in value and "instruction" in value
+
+
+def rank_locators(locators: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Order locators: unfailed before failing, proven before untried, then cheapest."""
+    return sorted(
+        locators,
+        key=lambda loc: (
+            (loc.get("failures") or 0) > 0,
+            not loc.get("wins"),
+            LOCATOR_PRIORITY.get(loc.get("kind"), len(LOCATOR_PRIORITY)),
+        ),
+    )
+
+
+def _legacy_entry(action: dict[str, Any]) -> dict[str, Any]:
+    selector = action.get("selector")
+    locators = [{"kind": "xpath", "selector": selector, "wins": 0, "failures": 0}]
+    return {"action": action, "locators": locators if selector else []}
+
+
+class SelectorCache:
+    """View of the shared store scoped to one workflow's namespace."""
+
+    def __init__(
+        self,
+        store: SelectorStore,
+        namespace: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_failures: int = DEFAULT_MAX_FAILURES,
+    ) -> None:
+        self.store = store
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_failures = max_failures
+
+    @staticmethod
+    def make_key(instruction: str, page_pattern: str, fingerprint: str) -> str:
+        return KEY_SEPARATOR.join((instruction, page_pattern, fingerprint))
+
+    def get(self, key: str) -> Any:
+        return self.store.get(self.namespace, key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.store.set(self.namespace, key, value)
+
+    def _is_expired(self, entry: dict[str, Any], now: float) -> bool:
+        last_success = entry.get("last_success") or entry.get("created_at") or 0
+        return now - last_success > self.ttl_seconds
+
+    def candidates(
+        self, instruction: str, page_pattern: str, fingerprint: str
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """Return cached ``(key, entry)`` pairs to try, best match first.
+
+        The exact page signature comes first, then the same instruction and
+        URL pattern under other DOM fingerprints (most recently successful
+        first), then a legacy entry keyed by the bare instruction. Expired
+        entries are evicted on the way.
+        """
+        now = time.time()
+        found: list[tuple[str, dict[str, Any]]] = []
+        exact_key = self.make_key(instruction, page_pattern, fingerprint)
+        exact = self.get(exact_key)
+        if _is_entry(exact):
+            if self._is_expired(exact, now):
+                self.store.delete(self.namespace, exact_key)
+            else:
+                found.append((exact_key, exact))
+
+        prefix = KEY_SEPARATOR.join((instruction, page_pattern, ""))
+        siblings = sorted(
+            (
+                (key, value)
+                for namespace, key, value in self.store.scan(prefix)
+                if namespace == self.namespace and key != exact_key and _is_entry(value)
+            ),
+            key=lambda item: item[1].get("last_success") or 0,
+            reverse=True,
+        )
+        for key, value in siblings:
+            if self._is_expired(value, now):
+                self.store.delete(self.namespace, key)
+            else:
+                found.append((key, value))
+
+        legacy = self.store.peek(self.namespace, instruction)
+        if legacy and not _is_entry(legacy):
+            found.append((instruction, _legacy_entry(legacy)))
+        return found
+
+    @staticmethod
+    def _new_entry(
+        instruction: str,
+        page_pattern: str,
+        fingerprint: str,
+        action: dict[str, Any],
+        locators: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        if not locators:
+            locators = _legacy_entry(action)["locators"]
+        return {
+            "instruction": instruction,
+            "url_pattern": page_pattern,
+            "fingerprint": fingerprint,
+            "action": action,
+            "locators": rank_locators(
+                [{"wins": 0, "failures": 0, **locator} for locator in locators]
+            ),
+            "created_at": time.time(),
+            "last_success": None,
+            "failures": 0,
+        }
+
+    def put(
+        self,
+        instruction: str,
+        page_pattern: str,
+        fingerprint: str,
+        action: dict[str, Any],
+        locators: list[dict[str, Any]] | None = None,
+    ) -> str:
+        key = self.make_key(instruction, page_pattern, fingerprint)
+        self.set(
+            key, self._new_entry(instruction, page_pattern, fingerprint, action, locators)
+        )
+        return key
+
+    def put_many(
+        self,
+        page_pattern: str,
+        fingerprint: str,
+        actions: dict[str, dict[str, Any]],
+        locators: dict[str, list[dict[str, Any]]] | None = None,
+    ) -> dict[str, str]:
+        """Cache actions for several instructions observed on the same page."""
+        locators = locators or {}
+        entries = {
+            instruction: self._new_entry(
+                instruction, page_pattern, fingerprint, action, locators.get(instruction)
+            )
+            for instruction, action in actions.items()
+        }
+        self.store.set_many(
+            self.namespace,
+            {
+                self.make_key(instruction, page_pattern, fingerprint): entry
+                for instruction, entry in entries.items()
+            },
+        )
+        return {
+            instruction: self.make_key(instruction, page_pattern, fingerprint)
+            for instruction in actions
+        }
+
+    def record_success(self, key: str, selector: str | None = None) -> None:
+        """Mark the entry as working, crediting the locator that found the element."""
+        entry = self.store.peek(self.namespace, key)
+        if not _is_entry(entry):
+            return
+        updated = {**entry, "last_success": time.time(), "failures": 0}
+        if selector:
+            locators = [
+                {**loc, "wins": (loc.get("wins") or 0) + 1, "failures": 0}
+                if loc.get("selector") == selector else loc
+                for loc in entry.get("locators") or []
+            ]
+            updated["locators"] = rank_locators(locators)
+        self.set(key, updated)
+
+    def record_locator_failures(self, key: str, selectors: list[str]) -> None:
+        """Count a miss against each locator in ``selectors`` and re-rank the chain."""
+        entry = self.store.peek(self.namespace, key)
+        if not _is_entry(entry) or not selectors:
+            return
+        locators = [
+            {**loc, "failures": (loc.get("failures") or 0) + 1}
+            if loc.get("selector") in selectors else loc
+            for loc in entry.get("locators") or []
+        ]
+        self.set(key, {**entry, "locators": rank_locators(locators)})
+
+    def record_failure(self, key: str) -> None:
+        """Count a failure, evicting the entry after ``max_failures`` in a row."""
+        entry = self.store.peek(self.namespace, key)
+        if entry is None:
+            return
+        if not _is_entry(entry):
+            self.store.delete(self.namespace, key)
+            return
+        failures = (entry.get("failures") or 0) + 1
+        if failures >= self.max_failures:
+            print(f"Evicting selector for '{entry['instruction']}' after {failures} failures")
+            self.store.delete(self.namespace, key)
+        else:
+            self.set(key, {**entry, "failures": failures})
+
+    def import_legacy_file(self, path: Path) -> int:
+        """Seed an empty namespace from a pre-SQLite ``cache/<workflow>.json``."""
+        path = Path(path)
+        if not path.exists() or self.store.has_namespace(self.namespace):
+            return 0
+        try:
+            legacy = json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            print(f"Ignoring unreadable legacy selector cache at {path}")
+            return 0
+        for key, value in legacy.items():
+            if value:
+                self.set(key, value)
+        return len(legacy)
+
+    def stats(self) -> dict[str, int]:
+        return self.store.stats()
+
+
+_STORES: dict[Path, SelectorStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_selector_store(db_path: Path = DEFAULT_DB_PATH) -> SelectorStore:
+    """Return the process-wide store for ``db_path``, creating it on first use."""
+    key = Path(db_path).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = SelectorStore(key)
+        return store
+
+
+def get_selector_cache(
+    namespace: str,
+    legacy_file: Path | None = None,
+    db_path: Path = DEFAULT_DB_PATH,
+) -> SelectorCache:
+    """Return a namespaced view of the shared selector store."""
+    cache = SelectorCache(get_selector_store(db_path), namespace)
+    if legacy_file is not None:
+        try:
+            cache.import_legacy_file(legacy_file)
+        except sqlite3.Error as error:
+            print(f"Unable to import legacy selector cache {legacy_file}: {error}")
+    return cache
+
+
+@atexit.register
+def _flush_all() -> None:
+    for store in list(_STORES.values()):
+        try:
+            store.close()
+        except Exception as error:
+            print(f"Failed to flush selector cache {store.db_path}: {error}")
@@ -0,0 +1,331 @@
+"""Pool of initialized Stagehand clients reused across jobs in a batch.
+
+A pool can span several browsers: give it a list of CDP endpoints (or set
+``STAGEHAND_CDP_URLS``) and every checkout goes to the next free worker,
+whichever browser it lives in. Endpoints that fail to start, fail the login
+check or keep failing health checks are taken out of rotation.
+
+Each endpoint gets exactly one session. Stagehand clients attached to the
+same browser all drive the context's first page, so a second client would
+navigate the first one's tab. To work in parallel, add endpoints or open
+tabs within a session with ``TabPool``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from stagehand import Stagehand, StagehandConfig
+
+from utils.stagehand_observe import report_observe_stats
+
+DEFAULT_CDP_URL = "http://localhost:9222"
+HEALTH_CHECK_TIMEOUT_S = 5.0
+LOGIN_CHECK_URL = "https://www.linkedin.com/my-items/posted-jobs/"
+LOGGED_OUT_URL_MARKERS = ("/login", "/authwall", "/checkpoint", "/uas/")
+MAX_HEALTH_FAILURES = 2
+
+
+def cdp_endpoints(value: str | list[str] | None = None) -> list[str]:
+    """Resolve the CDP endpoints to use, from an argument or the environment.
+
+    Accepts a list or a comma-separated string; falls back to
+    ``STAGEHAND_CDP_URLS``, then ``STAGEHAND_LOCAL_CDP_URL``, then localhost.
+    """
+    if value is None:
+        value = os.environ.get("STAGEHAND_CDP_URLS") or os.environ.get(
+            "STAGEHAND_LOCAL_CDP_URL", DEFAULT_CDP_URL
+        )
+    if isinstance(value, str):
+        value = value.split(",")
+    return [url.strip() for url in value if url and url.strip()]
+
+
+def stagehand_config(cdp_url: str | None = None) -> StagehandConfig:
+    """Build the local-browser Stagehand config the workflows share."""
+    return StagehandConfig(
+        env="LOCAL",
+        local_browser_launch_options={
+            "cdp_url": cdp_url
+            or os.environ.get("STAGEHAND_LOCAL_CDP_URL", DEFAULT_CDP_URL)
+        },
+        model_api_key=os.environ.get("OPENAI_API_KEY", ""),
+        model_name=os.environ.get(
+            "STAGEHAND_MODEL_NAME",
+            "openrouter/google/gemini-2.5-flash-preview-09-2025",
+        ),
+        model_client_options={
+            "api_base": os.environ.get(
+                "OPENROUTER_API_BASE", "https://openrouter.ai/api/v1"
+            ),
+        },
+    )
+
+
+class StagehandSession:
+    """One initialized Stagehand client attached to a browser over CDP."""
+
+    def __init__(self, cdp_url: str | None = None, check_login: bool = False) -> None:
+        self.cdp_url = cdp_url
+        self.check_login = check_login
+        self.stagehand: Any = None
+        self.jobs_run = 0
+        self.jobs_failed = 0
+        self.busy_seconds = 0.0
+        self.reconnects = 0
+        self.health_failures = 0
+
+    async def open(self) -> None:
+        client = Stagehand(stagehand_config(self.cdp_url))
+        await client.init()
+        self.stagehand = client
+
+    async def close(self) -> None:
+        if self.stagehand is None:
+            return
+        client, self.stagehand = self.stagehand, None
+        report_observe_stats(client.page)
+        try:
+            await client.close()
+        except Exception as error:
+            print(f"Ignoring error while closing Stagehand session: {error}")
+
+    async def is_healthy(self) -> bool:
+        """Round-trip a trivial script to confirm the CDP connection is alive."""
+        if self.stagehand is None:
+            return False
+        try:
+            raw_page = self.stagehand.page._page
+            if raw_page.is_closed() or not raw_page.context.browser.is_connected():
+                return False
+            await asyncio.wait_for(raw_page.evaluate("1"), HEALTH_CHECK_TIMEOUT_S)
+            return True
+        except Exception:
+            return False
+
+    async def ensure_healthy(self) -> None:
+        """Reconnect if the CDP connection dropped, and check the login again.
+
+        Raises if the reconnected browser is not signed in; the session is
+        then closed, so the next call reconnects and checks again.
+        """
+        if await self.is_healthy():
+            return
+        if self.stagehand is not None:
+            print("Stagehand session lost its browser connection, reconnecting")
+            self.reconnects += 1
+            await self.close()
+        await self.open()
+        if self.check_login:
+            try:
+                await verify_login(self.stagehand)
+            except Exception:
+                await self.close()
+                raise
+
+
+async def verify_login(stagehand: Any) -> None:
+    """Fail fast if the attached browser profile is not signed in to LinkedIn."""
+    page = stagehand.page
+    await page.goto(LOGIN_CHECK_URL)
+    current_url = page._page.url or ""
+    if any(marker in current_url for marker in LOGGED_OUT_URL_MARKERS):
+        raise RuntimeError(
+            f"LinkedIn session is not logged in (redirected to {current_url})"
+        )
+
+
+class TabPool:
+    """Hand out up to ``size`` tabs of one Stagehand client's browser context.
+
+    The client's own page is the first tab; the rest are opened on entry and
+    closed on exit. A tab that was closed underneath us is replaced on the
+    next checkout.
+    """
+
+    def __init__(self, stagehand: Any, size: int) -> None:
+        self.stagehand = stagehand
+        self.size = max(1, size)
+        self._opened: list[Any] = []
+        self._idle: asyncio.Queue[Any] = asyncio.Queue()
+
+    async def __aenter__(self) -> "TabPool":
+        self._idle.put_nowait(self.stagehand.page)
+        for _ in range(self.size - 1):
+            self._idle.put_nowait(await self._new_tab())
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        for page in self._opened:
+            try:
+                await page._page.close()
+            except Exception:
+                pass
+        self._opened.clear()
+
+    async def _new_tab(self) -> Any:
+        page = await self.stagehand.context.new_page()
+        self._opened.append(page)
+        return page
+
+    @asynccontextmanager
+    async def tab(self) -> AsyncIterator[Any]:
+        page = await self._idle.get()
+        try:
+            if page._page.is_closed():
+                page = await self._new_tab()
+            yield page
+        finally:
+            self._idle.put_nowait(page)
+
+
+class SessionPool:
+    """Keep one Stagehand session per browser alive for a whole batch.
+
+    Sessions are opened and the login is verified once per endpoint in
+    ``start``. Each ``session()`` checkout takes the next free worker,
+    health-checks it and reconnects it if the CDP connection dropped
+    (verifying the login again), then hands back the client for a
+    workflow's ``run(stagehand, input_data)``. A worker that fails
+    ``max_health_failures`` checkouts in a row, including failed logins
+    after a reconnect, is retired.
+    """
+
+    def __init__(
+        self,
+        cdp_url: str | None = None,
+        check_login: bool = True,
+        cdp_urls: str | list[str] | None = None,
+        max_health_failures: int = MAX_HEALTH_FAILURES,
+    ) -> None:
+        self.endpoints = cdp_endpoints(cdp_urls if cdp_urls else cdp_url)
+        self.check_login = check_login
+        self.max_health_failures = max_health_failures
+        self.started_at = time.monotonic()
+        self._sessions: list[StagehandSession] = []
+        self._retired: list[StagehandSession] = []
+        self._by_client: dict[int, StagehandSession] = {}
+        self._idle: asyncio.Queue[StagehandSession | None] = asyncio.Queue()
+
+    @property
+    def worker_count(self) -> int:
+        return len(self._sessions)
+
+    async def _start_endpoint(self, cdp_url: str) -> list[StagehandSession]:
+        # One session only: a second one would share this session's page
+        session = StagehandSession(cdp_url, self.check_login)
+        try:
+            await session.open()
+            if session.check_login:
+                await verify_login(session.stagehand)
+        except Exception as error:
+            print(f"Taking {cdp_url} out of rotation: {error}")
+            await session.close()
+            return []
+        return [session]
+
+    async def start(self) -> "SessionPool":
+        self.started_at = time.monotonic()
+        started = await asyncio.gather(
+            *(self._start_endpoint(url) for url in self.endpoints)
+        )
+        for session in (s for sessions in started for s in sessions):
+            self._sessions.append(session)
+            self._by_client[id(session.stagehand)] = session
+            self._idle.put_nowait(session)
+        if not self._sessions:
+            raise RuntimeError(
+                f"No usable browser among CDP endpoints: {', '.join(self.endpoints)}"
+            )
+        return self
+
+    async def close(self) -> None:
+        for session in self._sessions + self._retired:
+            await session.close()
+        self._sessions.clear()
+        self._retired.clear()
+        self._by_client.clear()
+
+    async def _checkout(self) -> StagehandSession:
+        while True:
+            if not self._sessions:
+                raise RuntimeError("No healthy browser workers left in the pool")
+            pooled = await self._idle.get()
+            if pooled is None:
+                # Last worker was retired; wake the next waiter and give up
+                self._idle.put_nowait(None)
+                raise RuntimeError("No healthy browser workers left in the pool")
+            if pooled not in self._sessions:
+                continue
+            try:
+                await pooled.ensure_healthy()
+            except Exception as error:
+                pooled.health_failures += 1
+                print(f"Health check failed for {pooled.cdp_url}: {error}")
+                if pooled.health_failures >= self.max_health_failures:
+                    print(f"Taking {pooled.cdp_url} out of rotation")
+                    self._sessions.remove(pooled)
+                    self._retired.append(pooled)
+                    if not self._sessions:
+                        self._idle.put_nowait(None)
+                else:
+                    self._idle.put_nowait(pooled)
+                continue
+            pooled.health_failures = 0
+            self._by_client[id(pooled.stagehand)] = pooled
+            return pooled
+
+    def record_job(self, stagehand: Any, seconds: float, ok: bool = True) -> None:
+        """Credit a job to the worker owning ``stagehand`` (for long checkouts)."""
+        pooled = self._by_client.get(id(stagehand))
+        if pooled is None:
+            return
+        pooled.jobs_run += 1
+        pooled.busy_seconds += seconds
+        if not ok:
+            pooled.jobs_failed += 1
+
+    async def __aenter__(self) -> "SessionPool":
+        try:
+            return await self.start()
+        except BaseException:
+            await self.close()
+            raise
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def session(self, count_job: bool = True) -> AsyncIterator[Any]:
+        """Check out a healthy client; the checkout counts as one job unless
+        ``count_job`` is False (the caller then uses ``record_job``)."""
+        pooled = await self._checkout()
+        started = time.monotonic()
+        ok = False
+        try:
+            yield pooled.stagehand
+            ok = True
+        finally:
+            if count_job:
+                self.record_job(pooled.stagehand, time.monotonic() - started, ok)
+            self._idle.put_nowait(pooled)
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-worker throughput since ``start``."""
+        elapsed_min = max(time.monotonic() - self.started_at, 1e-9) / 60
+        return [
+            {
+                "cdp_url": s.cdp_url,
+                "in_rotation": s in self._sessions,
+                "jobs_run": s.jobs_run,
+                "jobs_failed": s.jobs_failed,
+                "jobs_per_min": round(s.jobs_run / elapsed_min, 2),
+                "busy_pct": round(100 * s.busy_seconds / (elapsed_min * 60)),
+                "reconnects": s.reconnects,
+            }
+            for s in self._sessions + self._retired
+        ]
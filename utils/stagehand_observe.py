@@ -0,0 +1,344 @@
+"""Observe handler extensions installed on Stagehand pages.
+
+See docs/observe_code.py for the stock handler this builds on.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable
+
+from stagehand.a11y.utils import get_accessibility_tree, get_xpath_by_resolved_object_id
+from stagehand.handlers.observe_handler import ObserveHandler
+from stagehand.llm.inference import observe as observe_inference
+from stagehand.metrics import StagehandFunctionName
+from stagehand.schemas import ObserveOptions, ObserveResult
+from stagehand.utils import draw_observe_overlay
+
+BATCH_TAG_RE = re.compile(r"^\s*\[(\d+)\]\s*")
+
+DEFAULT_OBSERVE_INSTRUCTION = (
+    "Find elements that can be used for any future actions in the page. "
+    "These may be navigation links, related pages, section/subsection links, "
+    "buttons, or other interactive elements. Be comprehensive: if there are "
+    "multiple elements that may be relevant for future actions, return all of them."
+)
+
+# Installs a MutationObserver once per document and returns "<token>:<count>".
+# The random token changes on every navigation, so a fresh document never
+# reuses the previous one's version numbers. Typing into a field and moving
+# focus change the accessibility tree (values, focused state) without a DOM
+# mutation, so capture-phase listeners on the document count those too.
+DOM_VERSION_JS = """
+() => {
+  if (!window.__jpaDomVersion) {
+    const state = { token: Math.random().toString(36).slice(2), count: 0 };
+    const bump = () => { state.count += 1; };
+    new MutationObserver(bump).observe(document, {
+      subtree: true, childList: true, attributes: true, characterData: true,
+    });
+    for (const type of ['input', 'change', 'focus', 'blur']) {
+      document.addEventListener(type, bump, true);
+    }
+    window.__jpaDomVersion = state;
+  }
+  return window.__jpaDomVersion.token + ':' + window.__jpaDomVersion.count;
+}
+"""
+
+# Called with ``this`` bound to the first node and every node as an argument;
+# returns one absolute XPath per node in a single Runtime.callFunctionOn.
+XPATHS_FOR_NODES_JS = """
+function(...nodes) {
+  const xpathFor = (node) => {
+    if (node && node.nodeType === Node.TEXT_NODE) node = node.parentNode;
+    if (!node || node.nodeType !== Node.ELEMENT_NODE) return '';
+    const parts = [];
+    for (let el = node; el && el.nodeType === Node.ELEMENT_NODE; el = el.parentElement) {
+      let index = 1;
+      let sameTag = false;
+      for (let sib = el.parentElement && el.parentElement.firstElementChild; sib; sib = sib.nextElementSibling) {
+        if (sib === el) continue;
+        if (sib.tagName === el.tagName) {
+          sameTag = true;
+          if (sib.compareDocumentPosition(el) & Node.DOCUMENT_POSITION_FOLLOWING) index += 1;
+        }
+      }
+      const tag = el.tagName.toLowerCase();
+      parts.unshift(sameTag ? `${tag}[${index}]` : tag);
+    }
+    return '/' + parts.join('/');
+  };
+  return nodes.map(xpathFor);
+}
+"""
+
+SendCdp = Callable[[str, dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+async def resolve_xpaths(
+    send_cdp: SendCdp,
+    backend_node_ids: list[int],
+    fallback: Callable[[str], Awaitable[str]] | None = None,
+) -> list[str | None]:
+    """Return an absolute XPath per backend node id, ``None`` if unresolvable.
+
+    All ``DOM.resolveNode`` calls are issued concurrently, then every XPath is
+    computed by one ``Runtime.callFunctionOn`` over the whole set. Nodes from
+    different frames live in different JS worlds and cannot share that call;
+    if it fails, each object is resolved on its own with ``fallback``.
+    """
+    responses = await asyncio.gather(
+        *(
+            send_cdp("DOM.resolveNode", {"backendNodeId": node_id})
+            for node_id in backend_node_ids
+        ),
+        return_exceptions=True,
+    )
+    object_ids = [
+        None if isinstance(response, Exception)
+        else response.get("object", {}).get("objectId")
+        for response in responses
+    ]
+    live = [object_id for object_id in object_ids if object_id]
+    if not live:
+        return [None] * len(backend_node_ids)
+
+    try:
+        response = await send_cdp(
+            "Runtime.callFunctionOn",
+            {
+                "objectId": live[0],
+                "functionDeclaration": XPATHS_FOR_NODES_JS,
+                "arguments": [{"objectId": object_id} for object_id in live],
+                "returnByValue": True,
+            },
+        )
+        if "exceptionDetails" in response:
+            raise RuntimeError(response["exceptionDetails"].get("text", "callFunctionOn failed"))
+        xpaths = iter(response["result"]["value"])
+    except Exception:
+        if fallback is None:
+            raise
+        xpaths = iter(await asyncio.gather(*(fallback(object_id) for object_id in live)))
+
+    return [(next(xpaths) or None) if object_id else None for object_id in object_ids]
+
+
+def build_batch_instruction(instructions: list[str]) -> str:
+    numbered = "\n".join(
+        f"[{index}] {instruction}" for index, instruction in enumerate(instructions, 1)
+    )
+    return (
+        "Find one element for each of the numbered instructions below. Return "
+        "exactly one element per instruction, and start each element's "
+        "description with that instruction's number in square brackets, for "
+        "example \"[2] Continue button\". Skip an instruction only if no "
+        "element on the page matches it.\n"
+        f"{numbered}"
+    )
+
+
+class PageObserveHandler(ObserveHandler):
+    """ObserveHandler with a reusable tree snapshot and batched instructions.
+
+    The simplified accessibility tree is cached per page together with a DOM
+    version read from a MutationObserver injected into every frame. While
+    the version is unchanged, back-to-back observes (including retries) skip
+    both the settle wait and the tree walk.
+    """
+
+    def __init__(
+        self, stagehand_page, stagehand_client, user_provided_instructions=None
+    ):
+        super().__init__(stagehand_page, stagehand_client, user_provided_instructions)
+        self._tree: dict[str, Any] | None = None
+        self._tree_version: tuple[str, ...] | None = None
+        self._tree_cost_ms = 0.0
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self.saved_ms = 0.0
+
+    async def _dom_version(self) -> tuple[str, ...] | None:
+        """Return the DOM version of every frame, or None if any is unreadable."""
+        raw_page = self.stagehand_page._page
+        versions = [raw_page.url]
+        for frame in raw_page.frames:
+            try:
+                versions.append(await frame.evaluate(DOM_VERSION_JS))
+            except Exception:
+                return None
+        return tuple(versions)
+
+    async def _get_tree(self) -> dict[str, Any]:
+        version = await self._dom_version()
+        if version is not None and version == self._tree_version and self._tree:
+            self.snapshot_hits += 1
+            self.saved_ms += self._tree_cost_ms
+            self.logger.info("Reusing accessibility tree, DOM unchanged")
+            return self._tree
+
+        self.snapshot_misses += 1
+        started = time.perf_counter()
+        await self.stagehand_page._wait_for_settled_dom()
+        self.logger.info("Getting accessibility tree data")
+        tree = await get_accessibility_tree(self.stagehand_page, self.logger)
+        self._tree_cost_ms = (time.perf_counter() - started) * 1000
+        self._tree = tree
+        # Read the version after the walk: if the page kept mutating while we
+        # snapshotted, the next observe will see a different version and miss.
+        self._tree_version = await self._dom_version()
+        return tree
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        lookups = self.snapshot_hits + self.snapshot_misses
+        return {
+            "hits": self.snapshot_hits,
+            "misses": self.snapshot_misses,
+            "hit_rate_pct": round(100 * self.snapshot_hits / lookups) if lookups else 0,
+            "saved_ms": round(self.saved_ms),
+        }
+
+    async def observe(
+        self,
+        options: ObserveOptions,
+        from_act: bool = False,
+    ) -> list[ObserveResult]:
+        """Same as the stock observe, but reads the tree through ``_get_tree``."""
+        instruction = options.instruction or DEFAULT_OBSERVE_INSTRUCTION
+        if not from_act:
+            self.logger.info(
+                f"Starting observation for task: '{instruction}'",
+                category="observe",
+            )
+        if hasattr(self.stagehand, "start_inference_timer"):
+            self.stagehand.start_inference_timer()
+
+        tree = await self._get_tree()
+        observation_response = await observe_inference(
+            instruction=instruction,
+            tree_elements=tree["simplified"],
+            llm_client=self.stagehand.llm,
+            user_provided_instructions=self.user_provided_instructions,
+            logger=self.logger,
+            log_inference_to_file=False,
+            from_act=from_act,
+        )
+        self.stagehand.update_metrics(
+            StagehandFunctionName.ACT if from_act else StagehandFunctionName.OBSERVE,
+            observation_response.get("prompt_tokens", 0),
+            observation_response.get("completion_tokens", 0),
+            observation_response.get("inference_time_ms", 0),
+        )
+
+        elements = observation_response.get("elements", [])
+        for iframe in tree.get("iframes", []):
+            elements.append(
+                {
+                    "element_id": int(iframe.get("nodeId", 0)),
+                    "description": "an iframe",
+                    "method": "not-supported",
+                    "arguments": [],
+                }
+            )
+        elements_with_selectors = await self._add_selectors_to_elements(elements)
+        self.logger.debug(
+            "Found elements", auxiliary={"elements": elements_with_selectors}
+        )
+        if options.draw_overlay:
+            await draw_observe_overlay(
+                page=self.stagehand_page,
+                elements=[el.model_dump() for el in elements_with_selectors],
+            )
+        return elements_with_selectors
+
+    async def observe_many(self, instructions: list[str]) -> list[ObserveResult | None]:
+        """Resolve one element per instruction from a single snapshot.
+
+        Returns results in the order of ``instructions``; an entry is
+        ``None`` when the model did not return a usable element for it.
+        """
+        if not instructions:
+            return []
+        self.logger.info(
+            f"Starting batched observation for {len(instructions)} instructions",
+            category="observe",
+        )
+        if hasattr(self.stagehand, "start_inference_timer"):
+            self.stagehand.start_inference_timer()
+
+        tree = await self._get_tree()
+        observation_response = await observe_inference(
+            instruction=build_batch_instruction(instructions),
+            tree_elements=tree["simplified"],
+            llm_client=self.stagehand.llm,
+            user_provided_instructions=self.user_provided_instructions,
+            logger=self.logger,
+            log_inference_to_file=False,
+            from_act=False,
+        )
+        self.stagehand.update_metrics(
+            StagehandFunctionName.OBSERVE,
+            observation_response.get("prompt_tokens", 0),
+            observation_response.get("completion_tokens", 0),
+            observation_response.get("inference_time_ms", 0),
+        )
+
+        elements = await self._add_selectors_to_elements(
+            observation_response.get("elements", [])
+        )
+        resolved: list[ObserveResult | None] = [None] * len(instructions)
+        for element in elements:
+            match = BATCH_TAG_RE.match(element.description or "")
+            if not match:
+                continue
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(instructions) and resolved[index] is None:
+                element.description = element.description[match.end():]
+                resolved[index] = element
+        return resolved
+
+    async def _add_selectors_to_elements(
+        self,
+        elements: list[dict[str, Any]],
+    ) -> list[ObserveResult]:
+        """Add XPath selectors to all elements in one batched CDP pass."""
+        if not elements:
+            return []
+        cdp_client = await self.stagehand_page.get_cdp_client()
+
+        async def single_xpath(object_id: str) -> str:
+            return await get_xpath_by_resolved_object_id(cdp_client, object_id)
+
+        xpaths = await resolve_xpaths(
+            self.stagehand_page.send_cdp,
+            [element.get("element_id") for element in elements],
+            fallback=single_xpath,
+        )
+        result = []
+        for element, xpath in zip(elements, xpaths):
+            if not xpath:
+                self.logger.info(
+                    f"No xpath resolved for element: {element.get('element_id')}"
+                )
+                continue
+            rest = {k: v for k, v in element.items() if k != "element_id"}
+            result.append(ObserveResult(**{**rest, "selector": f"xpath={xpath}"}))
+        return result
+
+
+def install_observe_handler(page: Any) -> PageObserveHandler:
+    """Make ``page.observe`` use a PageObserveHandler and return it."""
+    handler = getattr(page, "_observe_handler", None)
+    if not isinstance(handler, PageObserveHandler):
+        handler = PageObserveHandler(page, page._stagehand, "")
+        page._observe_handler = handler
+    return handler
+
+
+def report_observe_stats(page: Any) -> None:
+    handler = getattr(page, "_observe_handler", None)
+    if isinstance(handler, PageObserveHandler):
+        print(f"Accessibility tree cache stats: {handler.snapshot_stats()}")
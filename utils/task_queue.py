@@ -0,0 +1,333 @@
+"""Durable, checkpointed task queue for batch runs.
+
+Every promotion and location edit in a batch is one row in a local SQLite
+database, keyed by an idempotency key (job title, run index, country).
+Enqueueing the same key again is a no-op, and each state change is
+committed before the next step runs. A batch that dies partway through can
+therefore be rerun and picks up only the tasks that never finished: a paid
+promotion that already produced a posting is never promoted again.
+
+A task may depend on a parent task. It is only claimed once the parent is
+done, and it receives the parent's result. Tasks move through ``pending``,
+``running``, and then ``done`` or ``failed``. A task that is not ready to
+take effect yet, such as an edit to a posting still in review, can be put
+back to ``pending`` with a growing delay; it fails after too many attempts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_QUEUE_DB = Path(
+    os.environ.get("TASK_QUEUE_DB", REPO_ROOT / "cache" / "task_queue.sqlite3")
+)
+DEFAULT_POLL_INTERVAL = 0.5
+# Deferred tasks wait 1, 2, 4, ... minutes, at most 15, for about 2.5 hours in all
+DEFAULT_RETRY_DELAY = 60.0
+MAX_RETRY_DELAY = 900.0
+DEFAULT_MAX_ATTEMPTS = 14
+KEY_SEPARATOR = "\x1f"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    batch TEXT NOT NULL DEFAULT '',
+    parent TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, kind, created_at);
+CREATE INDEX IF NOT EXISTS tasks_parent ON tasks (parent);
+"""
+
+
+def task_key(kind: str, *parts: Any) -> str:
+    """Idempotency key, e.g. ``task_key("promotion", title, run_index, country)``."""
+    return KEY_SEPARATOR.join([kind, *(str(part) for part in parts)])
+
+
+@dataclass(frozen=True)
+class RetryLater:
+    """Handler result for a task that should run again later; see ``TaskQueue.defer``."""
+
+    reason: str
+
+
+class TaskQueue:
+    """SQLite-backed queue; every state change is committed immediately."""
+
+    def __init__(self, db_path: Path = DEFAULT_QUEUE_DB) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Task state guards paid actions, so don't trade durability for speed
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "not_before" not in columns:
+            self._conn.execute(
+                "ALTER TABLE tasks ADD COLUMN not_before REAL NOT NULL DEFAULT 0"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def enqueue(
+        self,
+        key: str,
+        kind: str,
+        payload: dict[str, Any],
+        parent: str | None = None,
+        batch: str = "",
+    ) -> bool:
+        """Add a task unless ``key`` is already queued; returns whether it was added."""
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO tasks"
+            " (key, kind, batch, parent, payload, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, batch, parent, json.dumps(payload), now, now),
+        )
+        return cursor.rowcount > 0
+
+    def recover(self, retry_kinds: tuple[str, ...] = ()) -> int:
+        """Settle tasks left ``running`` by a crashed run.
+
+        Kinds in ``retry_kinds`` are safe to repeat and go back to
+        ``pending``. Any other kind may already have taken effect, so it is
+        marked ``failed`` for a person to check before ``retry_failed``.
+        """
+        rows = self._conn.execute(
+            "SELECT key, kind FROM tasks WHERE state = ?", (RUNNING,)
+        ).fetchall()
+        for key, kind in rows:
+            if kind in retry_kinds:
+                self._set(key, PENDING)
+            else:
+                self.fail(key, "interrupted while running; check before retrying")
+        return len(rows)
+
+    def retry_failed(self, kinds: tuple[str, ...] | None = None) -> int:
+        query = (
+            "UPDATE tasks SET state = ?, error = NULL, attempts = 0, not_before = 0,"
+            " updated_at = ? WHERE state = ?"
+        )
+        params: list[Any] = [PENDING, time.time(), FAILED]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        return self._conn.execute(query, params).rowcount
+
+    def claim(self, kind: str) -> dict[str, Any] | None:
+        """Mark the oldest ready task of ``kind`` running and return it.
+
+        A task is ready when it has no parent or its parent is done, and
+        any delay set by ``defer`` has passed. The
+        returned dict carries ``payload`` and the parent's ``parent_result``.
+        Pending tasks whose parent failed or is gone can never become ready,
+        so they are failed here instead of being waited on.
+        """
+        self._fail_orphans(kind)
+        while True:
+            row = self._conn.execute(
+                "SELECT t.key, t.payload, p.result FROM tasks t"
+                " LEFT JOIN tasks p ON p.key = t.parent"
+                " WHERE t.state = ? AND t.kind = ? AND (t.parent IS NULL OR p.state = ?)"
+                " AND t.not_before <= ?"
+                " ORDER BY t.created_at, t.rowid LIMIT 1",
+                (PENDING, kind, DONE, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            key, payload, parent_result = row
+            claimed = self._conn.execute(
+                "UPDATE tasks SET state = ?, attempts = attempts + 1, updated_at = ?"
+                " WHERE key = ? AND state = ?",
+                (RUNNING, time.time(), key, PENDING),
+            ).rowcount
+            if claimed:
+                return {
+                    "key": key,
+                    "payload": json.loads(payload),
+                    "parent_result": json.loads(parent_result) if parent_result else None,
+                }
+
+    def _fail_orphans(self, kind: str) -> None:
+        rows = self._conn.execute(
+            "SELECT t.key, p.key, p.error FROM tasks t LEFT JOIN tasks p ON p.key = t.parent"
+            " WHERE t.state = ? AND t.kind = ? AND t.parent IS NOT NULL"
+            " AND (p.key IS NULL OR p.state = ?)",
+            (PENDING, kind, FAILED),
+        ).fetchall()
+        for key, parent, error in rows:
+            self.fail(key, f"parent failed: {error}" if parent else "parent task missing")
+
+    def claim_many(self, kind: str, limit: int) -> list[dict[str, Any]]:
+        """Claim up to ``limit`` ready tasks of ``kind``; see ``claim``."""
+        tasks: list[dict[str, Any]] = []
+        while len(tasks) < limit:
+            task = self.claim(kind)
+            if task is None:
+                break
+            tasks.append(task)
+        return tasks
+
+    def complete(self, key: str, result: Any) -> None:
+        self._set(key, DONE, result=result)
+
+    def defer(
+        self,
+        key: str,
+        reason: str,
+        delay: float = DEFAULT_RETRY_DELAY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> bool:
+        """Put a claimed task back to ``pending`` until its backoff has passed.
+
+        The wait doubles with each attempt, from ``delay`` up to
+        ``MAX_RETRY_DELAY``. After ``max_attempts`` the task is failed
+        instead. Returns whether it was deferred.
+        """
+        row = self._conn.execute("SELECT attempts FROM tasks WHERE key = ?", (key,)).fetchone()
+        attempts = row[0] if row else max_attempts
+        if attempts >= max_attempts:
+            self.fail(key, f"{reason} (gave up after {attempts} attempts)")
+            return False
+        wait = min(delay * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+        now = time.time()
+        self._conn.execute(
+            "UPDATE tasks SET state = ?, error = ?, not_before = ?, updated_at = ? WHERE key = ?",
+            (PENDING, reason, now + wait, now, key),
+        )
+        return True
+
+    def fail(self, key: str, error: str) -> None:
+        """Mark ``key`` failed, along with every task still waiting on it."""
+        self._set(key, FAILED, error=error)
+        children = self._conn.execute(
+            "SELECT key FROM tasks WHERE parent = ? AND state = ?", (key, PENDING)
+        ).fetchall()
+        for (child,) in children:
+            self.fail(child, f"parent failed: {error}")
+
+    def _set(
+        self, key: str, state: str, result: Any = None, error: str | None = None
+    ) -> None:
+        self._conn.execute(
+            "UPDATE tasks SET state = ?, result = COALESCE(?, result), error = ?,"
+            " updated_at = ? WHERE key = ?",
+            (
+                state,
+                json.dumps(result) if result is not None else None,
+                error,
+                time.time(),
+                key,
+            ),
+        )
+
+    def has_work(self, kind: str | None = None) -> bool:
+        """Whether any task (of ``kind``) is pending or running."""
+        query = "SELECT 1 FROM tasks WHERE state IN (?, ?)"
+        params: list[Any] = [PENDING, RUNNING]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return self._conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        """Task counts per kind and state."""
+        counts: dict[str, dict[str, int]] = {}
+        for kind, state, count in self._conn.execute(
+            "SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state"
+        ):
+            counts.setdefault(kind, {})[state] = count
+        return counts
+
+    def failures(self) -> list[tuple[str, str]]:
+        return self._conn.execute(
+            "SELECT key, error FROM tasks WHERE state = ? ORDER BY updated_at", (FAILED,)
+        ).fetchall()
+
+
+async def run_workers(
+    queue: TaskQueue,
+    handlers: dict[str, Callable[..., Awaitable[Any]]],
+    limits: dict[str, int],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    batch_sizes: dict[str, int] | None = None,
+) -> None:
+    """Drain ``queue`` with ``limits[kind]`` workers per task kind.
+
+    ``handlers[kind](payload, parent_result)`` runs one task. Its return
+    value is stored as the task result. A falsy result fails the task, so
+    that its dependants do not run, and a ``RetryLater`` defers it. For kinds in ``batch_sizes``, a worker
+    claims up to that many ready tasks at once. The handler then gets a list
+    of ``(payload, parent_result)`` pairs and returns one result per pair.
+    Workers of a kind exit once nothing of that kind is pending or running.
+    """
+    batch_sizes = batch_sizes or {}
+
+    def settle(key: str, result: Any) -> None:
+        if isinstance(result, RetryLater):
+            if queue.defer(key, result.reason):
+                print(f"Task {key!r} deferred: {result.reason}")
+        elif result:
+            queue.complete(key, result)
+        else:
+            queue.fail(key, "no result")
+
+    async def worker(kind: str) -> None:
+        handler = handlers[kind]
+        batch_size = batch_sizes.get(kind)
+        while True:
+            tasks = queue.claim_many(kind, batch_size or 1)
+            if not tasks:
+                if not queue.has_work(kind):
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            try:
+                if batch_size:
+                    results = await handler(
+                        [(task["payload"], task["parent_result"]) for task in tasks]
+                    )
+                else:
+                    results = [
+                        await handler(tasks[0]["payload"], tasks[0]["parent_result"])
+                    ]
+            except Exception as error:
+                for task in tasks:
+                    print(f"Task {task['key']!r} failed: {error}")
+                    queue.fail(task["key"], str(error))
+                continue
+            for task, result in zip(tasks, results):
+                settle(task["key"], result)
+
+    await asyncio.gather(
+        *(
+            worker(kind)
+            for kind in handlers
+            for _ in range(max(1, limits.get(kind, 1)))
+        )
+    )
@@ -9,11 +9,18 @@ import sys
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
-import os
 from dotenv import load_dotenv
 
-from stagehand import Stagehand, StagehandConfig
+from stagehand import Stagehand
 from stagehand.page import StagehandPage
+from utils import cached_actions
+from utils.job_analytics import PAGE_TEXT_JS, parse_status
+from utils.page_waits import wait_for_listbox_option, wait_until
+from utils.resource_blocking import blocked_resources
+from utils.selector_cache import get_selector_cache
+from utils.session_pool import stagehand_config
+from utils.stagehand_observe import install_observe_handler, report_observe_stats
+
 load_dotenv()
 
 WORKFLOW_NAME = "linkedin_edit_country"
@@ -26,6 +33,8 @@ REQUIRED_FIELDS = [
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "workflow_runs"
 CACHE_DIR = Path(__file__).resolve().parent.parent / "cache"
 CACHE_FILE = CACHE_DIR / f"{WORKFLOW_NAME}.json"
+SELECTOR_CACHE = get_selector_cache(WORKFLOW_NAME, legacy_file=CACHE_FILE)
+STATE_LABEL_TIMEOUT_MS = 5000
 
 
 def parse_digits_from_url(url: str) -> str:
@@ -40,134 +49,45 @@ def validate_input(input_data: dict[str, str]) -> None:
             raise ValueError(f"Missing required input field: {field}")
 
 
-def _load_cache() -> dict[str, Any]:
-    if not CACHE_FILE.exists():
-        return {}
-    try:
-        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return {}
-
-
-def _save_cache(cache: dict[str, Any]) -> None:
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(cache), encoding="utf-8")
-
-
-def cache_get(prompt: str) -> Any:
-    return _load_cache().get(prompt)
-
-
-def cache_set(prompt: str, value: Any) -> None:
-    cache = _load_cache()
-    cache[prompt] = value
-    _save_cache(cache)
-
-
-async def observe_with_iframes(page, instruction: str):
-    """Run observe with iframe support enabled."""
-    last_error: Exception | None = None
-    for _ in range(3):
-        try:
-            return await page.observe(instruction=instruction, iframes=True)
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError("Observe failed after 3 attempts")
-
-
-async def get_cached_action(page, instruction: str, use_cache: bool = True) -> dict[str, Any]:
-    if use_cache:
-        cached = cache_get(instruction)
-        if cached:
-            print(f"{instruction} (cache hit)", cached)
-            await asyncio.sleep(2)
-            return cached
-
-    results = await observe_with_iframes(page, instruction)
-    print(instruction, results)
-    if not results:
-        raise RuntimeError(f"No elements found for instruction: {instruction}")
-
-    first = results[0]
-    action_dict = (
-        first.model_dump()
-        if hasattr(first, "model_dump")
-        else getattr(first, "__dict__", {"selector": getattr(first, "selector", None)})
-    )
-    if use_cache:
-        cache_set(instruction, action_dict)
-    return action_dict
-
-
-def _action_to_payload(action: Any) -> dict[str, Any]:
-    if hasattr(action, "model_dump"):
-        payload = action.model_dump()
-    elif isinstance(action, dict):
-        payload = dict(action)
-    elif hasattr(action, "__dict__"):
-        payload = {
-            k: v for k, v in vars(action).items() if not k.startswith("_")
-        }
-    else:
-        raise TypeError("Unsupported action type")
-    payload["iframes"] = True
-    return payload
-
-
 async def run_cached_action(page: StagehandPage, instruction: str, use_cache: bool = True) -> None:
-    last_error: Exception | None = None
-    for attempt in range(3):
-        action = await get_cached_action(
-            page,
-            instruction,
-            use_cache=use_cache if attempt == 0 else False,
-        )
-        payload = _action_to_payload(action)
-        try:
-            await page.act(payload)
-            return
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError(
-        f"Action '{instruction}' failed after 3 attempts"
+    await cached_actions.run_cached_action(
+        page, SELECTOR_CACHE, instruction, use_cache=use_cache
     )
 
 
 async def observe_and_fill(page, instruction: str, value: str) -> None:
     """Observe an input field, cache its selector, and fill it."""
-    last_error: Exception | None = None
-    for attempt in range(3):
-        action = await get_cached_action(
-            page,
-            instruction,
-            use_cache=True if attempt == 0 else False,
-        )
-        selector = None
-        if isinstance(action, dict):
-            selector = action.get("selector")
-        elif hasattr(action, "selector"):
-            selector = action.selector
-        if not selector:
-            raise RuntimeError(f"No selector available for instruction: {instruction}")
-        try:
-            await page._page.fill(selector, "" if value is None else str(value))
-            return
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError(
-        f"Fill for '{instruction}' failed after 3 attempts"
-    )
+    await cached_actions.observe_and_fill(page, SELECTOR_CACHE, instruction, value)
 
 
 async def _execute_workflow(
     stagehand: Stagehand, input_data: dict[str, str]
 ) -> dict[str, str]:
     page = stagehand.page
+    install_observe_handler(page)
+    # The edit only touches form controls, so skip images, fonts, media and trackers
+    async with blocked_resources(page):
+        job_state_text = await _open_job(page, input_data["job_detail_url"])
+        return await _edit_location(page, input_data, job_state_text)
 
-    await page.goto(input_data["job_detail_url"])
+
+async def _open_job(page: StagehandPage, job_detail_url: str) -> str:
+    """Navigate to the job and return its state label, e.g. "Active"."""
+    await page.goto(job_detail_url)
+
+    # The state label sits in the page header; only ask the LLM if it can't be read
+    found: list[str] = []
+
+    async def state_rendered() -> bool:
+        page_text = await page._page.evaluate(PAGE_TEXT_JS)
+        state = next((s for s in map(parse_status, page_text["lines"]) if s), None)
+        if state:
+            found.append(state)
+        return bool(state)
+
+    if await wait_until(state_rendered, STATE_LABEL_TIMEOUT_MS):
+        print("Read job state:", found[0])
+        return found[0]
 
     job_state_text = ""
     try:
@@ -179,6 +99,13 @@ async def _execute_workflow(
             job_state_text = (getattr(state_extraction, "extraction") or "").strip()
     except Exception as state_error:
         print("Unable to extract job state:", state_error)
+    return job_state_text
+
+
+async def _edit_location(
+    page: StagehandPage, input_data: dict[str, str], job_state_text: str
+) -> dict[str, str]:
+    """Change the employee location on the job page ``page`` is showing."""
     normalized_state = job_state_text.lower()
     current_url = page._page.url
     job_id = parse_digits_from_url(current_url or input_data["job_detail_url"])
@@ -205,7 +132,7 @@ async def _execute_workflow(
         'Locate the "Employee location" input field',
         input_data["employee_location"],
     )
-    await page.wait_for_timeout(2000)
+    await wait_for_listbox_option(page, timeout_ms=5000)
     await page._page.keyboard.press("ArrowDown")
     await page._page.keyboard.press("Enter")
 
@@ -227,30 +154,54 @@ async def run(stagehand: Any, input_data: dict[str, str]) -> dict[str, str]:
     return await _execute_workflow(stagehand, input_data)
 
 
+async def run_many(
+    stagehand: Any, inputs: list[dict[str, str]]
+) -> list[dict[str, str]]:
+    """Apply several location edits in one browser session.
+
+    Each posting is opened and its state read once, however many of the
+    inputs target it. One result per input comes back, in input order, in
+    the same format as ``run``; a failed edit gives ``status: failed``
+    instead of stopping the batch.
+    """
+    for input_data in inputs:
+        validate_input(input_data)
+    page = stagehand.page
+    install_observe_handler(page)
+    results: list[dict[str, str]] = []
+    states: dict[str, str] = {}
+    async with blocked_resources(page):
+        for input_data in inputs:
+            url = input_data["job_detail_url"]
+            try:
+                if url not in states:
+                    states[url] = await _open_job(page, url)
+                elif page._page.url.rstrip("/") != url.rstrip("/"):
+                    # The previous edit navigated away; the state is still known
+                    await page.goto(url)
+                results.append(await _edit_location(page, input_data, states[url]))
+            except Exception as error:
+                print(f"Failed to update location for {url}: {error}")
+                results.append(
+                    {
+                        "jobDetailUrl": url,
+                        "jobId": parse_digits_from_url(url),
+                        "jobState": states.get(url) or "unknown",
+                        "status": "failed",
+                        "error": str(error),
+                    }
+                )
+    return results
+
+
 async def run_with_stagehand(input_data: dict[str, str]) -> dict[str, str]:
     validate_input(input_data)
-    stagehand_client = Stagehand(
-        StagehandConfig(
-            env="LOCAL",
-            local_browser_launch_options={
-                "cdp_url": os.environ.get("STAGEHAND_LOCAL_CDP_URL", "http://localhost:9222")
-            },
-            model_api_key=os.environ.get("OPENAI_API_KEY", ""),
-            model_name=os.environ.get(
-                "STAGEHAND_MODEL_NAME",
-                "openrouter/google/gemini-2.5-flash-preview-09-2025",
-            ),
-            model_client_options={
-                "api_base": os.environ.get(
-                    "OPENROUTER_API_BASE", "https://openrouter.ai/api/v1"
-                ),
-            },
-        )
-    )
+    stagehand_client = Stagehand(stagehand_config())
     await stagehand_client.init()
     try:
         return await _execute_workflow(stagehand_client, input_data)
     finally:
+        report_observe_stats(stagehand_client.page)
         await stagehand_client.close()
 
 
@@ -269,6 +220,18 @@ def save_run_record(input_data: dict[str, str], output_data: dict[str, str]) ->
     return output_path
 
 
+async def run_many_with_stagehand(
+    inputs: list[dict[str, str]]
+) -> list[dict[str, str]]:
+    stagehand_client = Stagehand(stagehand_config())
+    await stagehand_client.init()
+    try:
+        return await run_many(stagehand_client, inputs)
+    finally:
+        report_observe_stats(stagehand_client.page)
+        await stagehand_client.close()
+
+
 def main() -> None:
     if len(sys.argv) != 2:
         raise SystemExit(
@@ -279,7 +242,17 @@ def main() -> None:
     with input_path.open("r", encoding="utf-8") as handle:
         input_data = json.load(handle)
 
+    # A list of inputs is applied in one browser session
+    if isinstance(input_data, list):
+        outputs = asyncio.run(run_many_with_stagehand(input_data))
+        print(f"Selector cache stats: {SELECTOR_CACHE.stats()}")
+        for item, output_data in zip(input_data, outputs):
+            output_path = save_run_record(item, output_data)
+            print(f"Saved workflow run to {output_path}")
+        return
+
     output_data = asyncio.run(run_with_stagehand(input_data))
+    print(f"Selector cache stats: {SELECTOR_CACHE.stats()}")
     output_path = save_run_record(input_data, output_data)
     print(f"Saved workflow run to {output_path}")
 
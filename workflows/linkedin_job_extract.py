@@ -9,12 +9,25 @@ import sys
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
-import os
 from dotenv import load_dotenv
 
-from stagehand import Stagehand, StagehandConfig
+from stagehand import Stagehand
 from stagehand.page import StagehandPage
 from pydantic import BaseModel, Field
+from utils import cached_actions
+from utils.api_capture import capture_job_api
+from utils.job_analytics import (
+    learn_field_selectors,
+    llm_field_texts,
+    page_content_hash,
+    read_job_fields,
+    wait_for_job_fields,
+)
+from utils.job_store import FAILED_STATUSES, JobStore, job_store_path
+from utils.resource_blocking import blocked_resources
+from utils.selector_cache import get_selector_cache
+from utils.session_pool import stagehand_config
+from utils.stagehand_observe import install_observe_handler, report_observe_stats
 
 load_dotenv()
 
@@ -27,6 +40,7 @@ REQUIRED_FIELDS = [
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "linked_job_posts"
 CACHE_DIR = Path(__file__).resolve().parent.parent / "cache"
 CACHE_FILE = CACHE_DIR / f"{WORKFLOW_NAME}.json"
+SELECTOR_CACHE = get_selector_cache(WORKFLOW_NAME, legacy_file=CACHE_FILE)
 
 
 class JobExtractSchema(BaseModel):
@@ -52,98 +66,9 @@ def validate_input(input_data: dict[str, str]) -> None:
             raise ValueError(f"Missing required input field: {field}")
 
 
-def _load_cache() -> dict[str, Any]:
-    if not CACHE_FILE.exists():
-        return {}
-    try:
-        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return {}
-
-
-def _save_cache(cache: dict[str, Any]) -> None:
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(cache), encoding="utf-8")
-
-
-def cache_get(prompt: str) -> Any:
-    return _load_cache().get(prompt)
-
-
-def cache_set(prompt: str, value: Any) -> None:
-    cache = _load_cache()
-    cache[prompt] = value
-    _save_cache(cache)
-
-
-async def observe_with_iframes(page, instruction: str):
-    """Run observe with iframe support enabled."""
-    last_error: Exception | None = None
-    for _ in range(3):
-        try:
-            return await page.observe(instruction=instruction, iframes=True)
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError("Observe failed after 3 attempts")
-
-
-async def get_cached_action(page, instruction: str, use_cache: bool = True) -> dict[str, Any]:
-    if use_cache:
-        cached = cache_get(instruction)
-        if cached:
-            print(f"{instruction} (cache hit)", cached)
-            await asyncio.sleep(2)
-            return cached
-
-    results = await observe_with_iframes(page, instruction)
-    print(instruction, results)
-    if not results:
-        raise RuntimeError(f"No elements found for instruction: {instruction}")
-
-    first = results[0]
-    action_dict = (
-        first.model_dump()
-        if hasattr(first, "model_dump")
-        else getattr(first, "__dict__", {"selector": getattr(first, "selector", None)})
-    )
-    if use_cache:
-        cache_set(instruction, action_dict)
-    return action_dict
-
-
-def _action_to_payload(action: Any) -> dict[str, Any]:
-    if hasattr(action, "model_dump"):
-        payload = action.model_dump()
-    elif isinstance(action, dict):
-        payload = dict(action)
-    elif hasattr(action, "__dict__"):
-        payload = {
-            k: v for k, v in vars(action).items() if not k.startswith("_")
-        }
-    else:
-        raise TypeError("Unsupported action type")
-    payload["iframes"] = True
-    return payload
-
-
 async def run_cached_action(page: StagehandPage, instruction: str, use_cache: bool = True) -> None:
-    last_error: Exception | None = None
-    for attempt in range(3):
-        action = await get_cached_action(
-            page,
-            instruction,
-            use_cache=use_cache if attempt == 0 else False,
-        )
-        payload = _action_to_payload(action)
-        try:
-            await page.act(payload)
-            return
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError(
-        f"Action '{instruction}' failed after 3 attempts"
+    await cached_actions.run_cached_action(
+        page, SELECTOR_CACHE, instruction, use_cache=use_cache
     )
 
 
@@ -151,27 +76,66 @@ async def _execute_workflow(
     stagehand: Stagehand, input_data: dict[str, str]
 ) -> dict[str, Any]:
     """Core workflow logic that assumes a prepared Stagehand client."""
-    page = stagehand.page
+    return await _execute_on_page(stagehand.page, input_data)
+
+
+async def _execute_on_page(
+    page: StagehandPage, input_data: dict[str, str]
+) -> dict[str, Any]:
+    """Extract one job on the given tab; lets callers run several tabs at once."""
+    install_observe_handler(page)
+    # Only the DOM text is read, so skip images, fonts, media and trackers
+    async with blocked_resources(page):
+        return await _extract_job(page, input_data)
+
 
+async def _extract_job(
+    page: StagehandPage, input_data: dict[str, str]
+) -> dict[str, Any]:
     job_id = input_data["jobId"]
     job_url = f"https://www.linkedin.com/hiring/jobs/{job_id}/detail/"
 
     print(f"Navigating to job URL: {job_url}")
-    await page.goto(job_url)
-
-    # Wait for the page to load completely
-    await page.wait_for_timeout(5000)
+    extracted_data, extracted_by, content_hash = None, "api", None
+    if input_data.get("capture_api"):
+        # Take the analytics from the page's own API responses as they arrive
+        extracted_data = await capture_job_api(page, job_url, job_id, JobExtractSchema)
+    else:
+        await page.goto(job_url)
 
-    # Extract job data using stagehand extract
     print("Extracting job data...")
     try:
-        extracted_data = await page.extract(
-            instruction="Extract the job name, location, status, posting time, amount spent (as a number), views (as a number), and apply clicks (as a number) from this LinkedIn job posting page. Return only the numeric values for amount spent, views, and apply clicks without any text or currency symbols.",
-            schema=JobExtractSchema,
-            iframes=True
-        )
-
-        print("Extracted data:", extracted_data)
+        if extracted_data is None:
+            # Wait for the analytics to render, not for the network: LinkedIn
+            # long-polls, so the network never goes idle
+            await wait_for_job_fields(page, timeout_ms=5000)
+            # Nothing on the page changed since the stored extraction
+            content_hash, posted_when = await page_content_hash(page)
+            if content_hash == input_data.get("content_hash"):
+                print("Job page unchanged since the last extraction")
+                return {
+                    "jobDetailUrl": job_url,
+                    "jobId": job_id,
+                    "posted_when": posted_when,
+                    "content_hash": content_hash,
+                    "status": "unchanged",
+                }
+            # Read the fields straight from the DOM; only an incomplete or
+            # invalid read costs an LLM extract
+            extracted_data = await read_job_fields(page, SELECTOR_CACHE, JobExtractSchema)
+            extracted_by = "dom"
+        if extracted_data is None:
+            print("Falling back to LLM extraction")
+            extracted_data = await page.extract(
+                instruction="Extract the job name, location, status, posting time, amount spent (as a number), views (as a number), and apply clicks (as a number) from this LinkedIn job posting page. Return only the numeric values for amount spent, views, and apply clicks without any text or currency symbols.",
+                schema=JobExtractSchema,
+                iframes=True
+            )
+            extracted_by = "llm"
+            # Remember where the LLM's values sit so the next job reads them directly
+            await learn_field_selectors(page, SELECTOR_CACHE, llm_field_texts(extracted_data))
+
+        print(f"Extracted data ({extracted_by}):", extracted_data)
 
         return {
             "jobDetailUrl": job_url,
@@ -183,6 +147,8 @@ async def _execute_workflow(
             "amount_spent": float(extracted_data.amount_spent),
             "views": int(extracted_data.views),
             "apply_clicks": int(extracted_data.apply_clicks),
+            "extracted_by": extracted_by,
+            "content_hash": content_hash,
             "status": "extracted"
         }
 
@@ -201,55 +167,39 @@ async def run(stagehand: Any, input_data: dict[str, str]) -> dict[str, Any]:
     return await _execute_workflow(stagehand, input_data)
 
 
+async def run_on_page(page: StagehandPage, input_data: dict[str, str]) -> dict[str, Any]:
+    """Execute on a specific tab of an initialized client (see utils.session_pool.TabPool)."""
+    validate_input(input_data)
+    return await _execute_on_page(page, input_data)
+
+
 async def run_with_stagehand(input_data: dict[str, str]) -> dict[str, Any]:
     validate_input(input_data)
-    stagehand_client = Stagehand(
-        StagehandConfig(
-            env="LOCAL",
-            local_browser_launch_options={
-                "cdp_url": os.environ.get("STAGEHAND_LOCAL_CDP_URL", "http://localhost:9222")
-            },
-            model_api_key=os.environ.get("OPENAI_API_KEY", ""),
-            model_name=os.environ.get(
-                "STAGEHAND_MODEL_NAME",
-                "openrouter/google/gemini-2.5-flash-preview-09-2025",
-            ),
-            model_client_options={
-                "api_base": os.environ.get(
-                    "OPENROUTER_API_BASE", "https://openrouter.ai/api/v1"
-                ),
-            },
-        )
-    )
+    stagehand_client = Stagehand(stagehand_config())
     await stagehand_client.init()
     try:
         return await _execute_workflow(stagehand_client, input_data)
     finally:
+        report_observe_stats(stagehand_client.page)
         await stagehand_client.close()
 
 
 def save_run_record(input_data: dict[str, str], output_data: dict[str, Any]) -> Path:
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Save the main output file as {jobId}.json (just the job data)
-    job_id = input_data["jobId"]
-    output_path = OUTPUT_DIR / f"{job_id}.json"
+    """Upsert the extracted job into the job store under ``OUTPUT_DIR``.
 
-    # Create a simplified record with just the extracted data
+    A failed extraction is only logged; the job's last good record stays.
+    """
     record = {
-        "job_name": output_data.get("job_name", ""),
-        "location": output_data.get("location", ""),
-        "job_status": output_data.get("job_status", ""),
-        "posted_when": output_data.get("posted_when", ""),
-        "amount_spent": output_data.get("amount_spent", 0.0),
-        "views": output_data.get("views", 0),
-        "apply_clicks": output_data.get("apply_clicks", 0),
-        "job_url": output_data.get("jobDetailUrl", ""),
-        "job_id": job_id
+        **output_data,
+        "jobId": input_data["jobId"],
+        "extracted_at": datetime.now(timezone.utc).isoformat(),
     }
-
-    with output_path.open("w", encoding="utf-8") as handle:
-        json.dump(record, handle, indent=2)
+    with JobStore(job_store_path(OUTPUT_DIR)) as store:
+        if record.get("status") in FAILED_STATUSES:
+            store.put_failure(record)
+        else:
+            store.put(record)
+        output_path = store.db_path
 
     print(f"Saved job extraction to {output_path}")
     return output_path
@@ -266,6 +216,7 @@ def main() -> None:
         input_data = json.load(handle)
 
     output_data = asyncio.run(run_with_stagehand(input_data))
+    print(f"Selector cache stats: {SELECTOR_CACHE.stats()}")
     output_path = save_run_record(input_data, output_data)
     print(f"Workflow completed. Output saved to {output_path}")
 
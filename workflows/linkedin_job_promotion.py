@@ -9,13 +9,25 @@ import sys
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
-import os
 from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 
-from stagehand import Stagehand, StagehandConfig
+from stagehand import Stagehand
 from stagehand.page import StagehandPage
-from utils.otp_fetcher import get_latest_otp_from_hdfcbnk
+from utils.operator_intervention import intervention_key, wait_for_operator
+from utils.otp_fetcher import get_otp_waiter
+from utils import cached_actions
+from utils.cached_actions import observe_with_iframes
+from utils.page_waits import (
+    LISTBOX_OPTION_SELECTOR,
+    wait_for_element,
+    wait_for_element_gone,
+    wait_for_listbox_option,
+    wait_for_url,
+)
+from utils.selector_cache import get_selector_cache
+from utils.session_pool import stagehand_config
+from utils.stagehand_observe import install_observe_handler, report_observe_stats
 
 load_dotenv()
 
@@ -35,6 +47,13 @@ REQUIRED_FIELDS = [
 OUTPUT_DIR = Path(__file__).resolve().parent.parent / "workflow_runs"
 CACHE_DIR = Path(__file__).resolve().parent.parent / "cache"
 CACHE_FILE = CACHE_DIR / f"{WORKFLOW_NAME}.json"
+SELECTOR_CACHE = get_selector_cache(WORKFLOW_NAME, legacy_file=CACHE_FILE)
+# The qualifications step is the first after job settings with rich-text editors
+QUALIFICATION_EDITOR_SELECTOR = '[contenteditable="true"]'
+# Every promotion pays the same budget, usually with the same card, so the
+# bank SMS has nothing to tell two promotions' OTPs apart. Only one promotion
+# at a time goes from "Promote job" to submitting its OTP.
+OTP_LOCK = asyncio.Lock()
 
 
 def parse_digits_from_url(url: str) -> str:
@@ -49,126 +68,15 @@ def validate_input(input_data: dict[str, str]) -> None:
             raise ValueError(f"Missing required input field: {field}")
 
 
-def _load_cache() -> dict[str, Any]:
-    if not CACHE_FILE.exists():
-        return {}
-    try:
-        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return {}
-
-
-def _save_cache(cache: dict[str, Any]) -> None:
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(cache), encoding="utf-8")
-
-
-def cache_get(prompt: str) -> Any:
-    return _load_cache().get(prompt)
-
-
-def cache_set(prompt: str, value: Any) -> None:
-    cache = _load_cache()
-    cache[prompt] = value
-    _save_cache(cache)
-
-
-async def get_cached_action(page, instruction: str, use_cache: bool = True) -> dict[str, Any]:
-    if use_cache:
-        cached = cache_get(instruction)
-        if cached:
-            print(f"{instruction} (cache hit)", cached)
-            await asyncio.sleep(2)
-            return cached
-
-    results = await observe_with_iframes(page, instruction)
-    print(instruction, results)
-    if not results:
-        raise RuntimeError(f"No elements found for instruction: {instruction}")
-
-    first = results[0]
-    action_dict = (
-        first.model_dump()
-        if hasattr(first, "model_dump")
-        else getattr(first, "__dict__", {"selector": getattr(first, "selector", None)})
-    )
-    if use_cache:
-        cache_set(instruction, action_dict)
-    return action_dict
-
-
-def _action_to_payload(action: Any) -> dict[str, Any]:
-    if hasattr(action, "model_dump"):
-        payload = action.model_dump()
-    elif isinstance(action, dict):
-        payload = dict(action)
-    elif hasattr(action, "__dict__"):
-        payload = {k: v for k, v in vars(action).items() if not k.startswith("_")}
-    else:
-        raise TypeError("Unsupported action type")
-    payload["iframes"] = True    
-    return payload
-
-
 async def run_cached_action(page: StagehandPage, instruction: str, use_cache: bool = True) -> None:
-    last_error: Exception | None = None
-    for attempt in range(3):
-        action = await get_cached_action(
-            page,
-            instruction,
-            use_cache=use_cache if attempt == 0 else False,
-        )
-        payload = _action_to_payload(action)
-        try:
-            await page.act(payload, timeout_ms=15000)
-            return
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError(
-        f"Action '{instruction}' failed after 3 attempts"
+    await cached_actions.run_cached_action(
+        page, SELECTOR_CACHE, instruction, use_cache=use_cache, timeout_ms=15000
     )
 
 
-async def observe_with_iframes(page, instruction: str):
-    """Run observe with iframe support enabled."""
-    last_error: Exception | None = None
-    for _ in range(3):
-        try:
-            return await page.observe(instruction=instruction, iframes=True)
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError("Observe failed after 3 attempts")
-
-
 async def observe_and_fill(page, instruction: str, value: str) -> None:
     """Locate an element via observe and fill it with the provided value."""
-    last_error: Exception | None = None
-    for attempt in range(3):
-        action = await get_cached_action(
-            page,
-            instruction,
-            use_cache=True if attempt == 0 else False,
-        )
-        selector = None
-        if isinstance(action, dict):
-            selector = action.get("selector")
-        elif hasattr(action, "selector"):
-            selector = action.selector
-        if not selector:
-            raise RuntimeError(
-                f"No selector available for instruction: {instruction}"
-            )
-        try:
-            await page._page.fill(selector, "" if value is None else str(value))
-            return
-        except Exception as error:
-            print("Action failed:", error)
-            last_error = error
-    raise last_error or RuntimeError(
-        f"Fill for '{instruction}' failed after 3 attempts"
-    )
+    await cached_actions.observe_and_fill(page, SELECTOR_CACHE, instruction, value)
 
 
 async def _execute_workflow(
@@ -176,6 +84,7 @@ async def _execute_workflow(
 ) -> dict[str, str]:
     """Core workflow logic that assumes a prepared Stagehand client."""
     page = stagehand.page
+    install_observe_handler(page)
 
     await page.goto("https://www.linkedin.com/my-items/posted-jobs/")
 
@@ -189,7 +98,8 @@ async def _execute_workflow(
         input_data["job_title"],
     )
     await page._page.keyboard.press("Tab")
-    await page.wait_for_timeout(5000)
+    # The title is committed once its typeahead has closed
+    await wait_for_element_gone(page, LISTBOX_OPTION_SELECTOR, timeout_ms=5000)
 
     try:
         await run_cached_action(
@@ -198,6 +108,7 @@ async def _execute_workflow(
     except Exception:
         print("Ignoring exception when clicking Post job button initially")
 
+    await wait_for_url(page, r"[?&]jobId=\d+", timeout_ms=20000)
     review_url = page._page.url
     job_id = parse_qs(urlparse(review_url).query).get("jobId", [""])[0]
 
@@ -208,12 +119,22 @@ async def _execute_workflow(
         page, 'Click the "Edit job details" button. Set method=\'click\''
     )
 
+    await cached_actions.prefetch_actions(
+        page,
+        SELECTOR_CACHE,
+        [
+            'Locate the "Employee location" field',
+            "Locate the job description editor area",
+            'Click the "Continue" button on job details. Set method=\'click\'',
+        ],
+    )
+
     await observe_and_fill(
         page,
         'Locate the "Employee location" field',
         input_data["employee_location"],
     )
-    await page.wait_for_timeout(2000)
+    await wait_for_listbox_option(page, timeout_ms=5000)
     await page._page.keyboard.press("ArrowDown")
     await page._page.keyboard.press("Enter")
 
@@ -234,7 +155,7 @@ async def _execute_workflow(
     await run_cached_action(
         page, 'Click the "On Linkedin" dropdown. Set method=\'click\''
     )
-    await page.wait_for_timeout(500)
+    await wait_for_listbox_option(page, timeout_ms=500)
     await page._page.keyboard.press("ArrowDown")
     await page._page.keyboard.press("ArrowDown")
     await page._page.keyboard.press("Enter")
@@ -256,7 +177,7 @@ async def _execute_workflow(
     await run_cached_action(
         page, 'Click the "Continue" button on job settings. Set method=\'click\''
     )
-    await page.wait_for_timeout(10000)
+    await wait_for_element(page, QUALIFICATION_EDITOR_SELECTOR, timeout_ms=10000)
 
     qualification_editors = await observe_with_iframes(
         page,
@@ -319,34 +240,39 @@ async def _execute_workflow(
             await page._page.keyboard.type(input_data["card_postal_code"])
             break
         except Exception as card_error:
-            print(
-                "Card entry failed, inspect browser then press Enter to retry:",
-                card_error,
+            # Only this promotion waits; the rest of the batch keeps running
+            await wait_for_operator(
+                intervention_key("card", job_id),
+                f"Card entry failed for job {job_id} ({input_data['job_title']}), "
+                f"fix it in the browser then retry: {card_error}",
             )
-            input()
 
     await run_cached_action(
         page, 'Click the "Add card" button. Set method=\'click\''
     )
 
-    await run_cached_action(
-        page, 'Click the "Promote job" button. Set method=\'click\''
-    )
-
-    await page.wait_for_timeout(20000)
-    otp_result = get_latest_otp_from_hdfcbnk()
-    if not otp_result:
-        raise RuntimeError("No OTP found in recent messages")
-    _, otp_code = otp_result
-    await observe_and_fill(
-        page,
-        "Locate the one-time password input field",
-        otp_code,
-    )
+    async with OTP_LOCK:
+        # Note the newest SMS before clicking so only an OTP sent after the
+        # click is used
+        otp_waiter = get_otp_waiter()
+        otp_request = await otp_waiter.expect()
+        try:
+            await run_cached_action(
+                page, 'Click the "Promote job" button. Set method=\'click\''
+            )
+        except Exception:
+            otp_waiter.cancel(otp_request)
+            raise
+        otp_code = await otp_waiter.wait(otp_request)
+        await observe_and_fill(
+            page,
+            "Locate the one-time password input field",
+            otp_code,
+        )
 
-    await run_cached_action(
-        page, 'Click the "Submit" button to confirm the one-time password. Set method=\'click\''
-    )
+        await run_cached_action(
+            page, 'Click the "Submit" button to confirm the one-time password. Set method=\'click\''
+        )
 
     
 
@@ -367,24 +293,12 @@ async def run(stagehand: Any, input_data: dict[str, str]) -> dict[str, str]:
 async def run_with_stagehand(input_data: dict[str, str]) -> dict[str, str]:
     """Initialize Stagehand internally and execute the workflow."""
     validate_input(input_data)
-    stagehand_client = Stagehand(
-        StagehandConfig(
-            env="LOCAL",
-            local_browser_launch_options={
-                "cdp_url":"http://localhost:9222"
-            },            
-            model_api_key=os.environ.get("OPENAI_API_KEY", ""),
-            model_name="openrouter/google/gemini-2.5-flash-preview-09-2025",
-            model_client_options={
-                "api_base": os.environ.get("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1"),
-            }
-            
-        )
-    )
+    stagehand_client = Stagehand(stagehand_config())
     await stagehand_client.init()
     try:
         return await _execute_workflow(stagehand_client, input_data)
     finally:
+        report_observe_stats(stagehand_client.page)
         await stagehand_client.close()
 
 
@@ -416,6 +330,7 @@ def main() -> None:
         input_data = json.load(handle)
 
     output_data = asyncio.run(run_with_stagehand(input_data))
+    print(f"Selector cache stats: {SELECTOR_CACHE.stats()}")
     output_path = save_run_record(input_data, output_data)
     print(f"Saved workflow run to {output_path}")
 